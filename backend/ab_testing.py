@@ -0,0 +1,155 @@
+"""
+A/B Testing Service for KUMIA Elite Dashboard
+Sharded event counters and on-read significance analysis for campaign tests
+"""
+
+import math
+import random
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from pymongo import ASCENDING, UpdateOne
+
+VARIANTS = ("variant_a", "variant_b")
+EVENT_FIELDS = {"impression": "impressions", "conversion": "conversions"}
+
+DEFAULT_SHARDS = 16
+CONFIDENCE_Z = 1.96  # 95% two-sided
+SIGNIFICANCE_LEVEL = 0.05
+MIN_IMPRESSIONS_FOR_WINNER = 100
+
+# Ingestion is public (UserWebApp), so one request may only move the counters a little
+MAX_EVENT_COUNT = 10
+MAX_EVENT_BATCH = 100
+# Shard counts of recently seen tests
+KNOWN_TESTS_CACHE_SIZE = 1000
+
+
+class ABTestService:
+    def __init__(self, db, shards: int = DEFAULT_SHARDS):
+        self.db = db
+        self.counters = db.ab_test_counters
+        self.shards = shards
+        self._known_tests: "OrderedDict[str, int]" = OrderedDict()
+
+    async def ensure_indexes(self):
+        await self.counters.create_index([("test_id", ASCENDING)])
+
+    async def get_shard_count(self, test_id: str) -> Optional[int]:
+        """Shard count of an existing test, cached to keep ingestion write-only"""
+        if test_id in self._known_tests:
+            self._known_tests.move_to_end(test_id)
+            return self._known_tests[test_id]
+
+        test = await self.db.ab_tests.find_one({"id": test_id}, {"counter_shards": 1})
+        if not test:
+            return None
+
+        shards = test.get("counter_shards", self.shards)
+        self._known_tests[test_id] = shards
+        if len(self._known_tests) > KNOWN_TESTS_CACHE_SIZE:
+            self._known_tests.popitem(last=False)
+        return shards
+
+    # INGESTION
+    async def record_events(self, test_id: str, events: List[Dict[str, Any]]) -> int:
+        """Apply a batch of events as one $inc per variant on a random shard"""
+        shards = await self.get_shard_count(test_id)
+        if shards is None:
+            raise KeyError(test_id)
+
+        totals: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for event in events:
+            totals[event["variant"]][EVENT_FIELDS[event["event"]]] += event.get("count", 1)
+
+        operations = []
+        for variant, increments in totals.items():
+            shard = random.randrange(shards)
+            operations.append(UpdateOne(
+                {"_id": f"{test_id}:{variant}:{shard}"},
+                {
+                    "$inc": dict(increments),
+                    "$setOnInsert": {"test_id": test_id, "variant": variant, "shard": shard},
+                },
+                upsert=True,
+            ))
+
+        if operations:
+            await self.counters.bulk_write(operations, ordered=False)
+
+        return sum(sum(increments.values()) for increments in totals.values())
+
+    # RESULTS
+    async def get_totals(self, test_id: str) -> Dict[str, Dict[str, int]]:
+        """Sum the counter shards of every variant"""
+        totals = {variant: {"impressions": 0, "conversions": 0} for variant in VARIANTS}
+        async for shard in self.counters.find({"test_id": test_id}):
+            variant_totals = totals.setdefault(shard["variant"], {"impressions": 0, "conversions": 0})
+            variant_totals["impressions"] += shard.get("impressions", 0)
+            variant_totals["conversions"] += shard.get("conversions", 0)
+        return totals
+
+    async def get_results(self, test_id: str) -> Dict[str, Any]:
+        totals = await self.get_totals(test_id)
+        return analyze(totals)
+
+
+def wilson_interval(conversions: int, impressions: int, z: float = CONFIDENCE_Z) -> Tuple[float, float]:
+    """Wilson score interval for a conversion rate"""
+    if impressions == 0:
+        return 0.0, 0.0
+
+    p = conversions / impressions
+    denominator = 1 + z * z / impressions
+    center = (p + z * z / (2 * impressions)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / impressions + z * z / (4 * impressions * impressions)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def two_proportion_p_value(conv_a: int, n_a: int, conv_b: int, n_b: int) -> Optional[float]:
+    """Two-sided p-value of the pooled two-proportion z-test"""
+    if n_a == 0 or n_b == 0:
+        return None
+
+    pooled = (conv_a + conv_b) / (n_a + n_b)
+    std_error = math.sqrt(pooled * (1 - pooled) * (1 / n_a + 1 / n_b))
+    if std_error == 0:
+        return 1.0
+
+    z = (conv_a / n_a - conv_b / n_b) / std_error
+    return math.erfc(abs(z) / math.sqrt(2))
+
+
+def analyze(totals: Dict[str, Dict[str, int]]) -> Dict[str, Any]:
+    """Conversion rates, confidence intervals and winner for variant totals"""
+    results: Dict[str, Any] = {}
+    for variant, counts in totals.items():
+        impressions = counts["impressions"]
+        # Conversions can briefly lead impressions when events arrive out of order
+        conversions = min(counts["conversions"], impressions)
+        rate = conversions / impressions if impressions else 0.0
+        low, high = wilson_interval(conversions, impressions)
+        results[variant] = {
+            "impressions": impressions,
+            "conversions": counts["conversions"],
+            "rate": round(rate * 100, 2),
+            "confidence_interval": [round(low * 100, 2), round(high * 100, 2)],
+        }
+
+    a, b = totals["variant_a"], totals["variant_b"]
+    p_value = two_proportion_p_value(
+        min(a["conversions"], a["impressions"]), a["impressions"],
+        min(b["conversions"], b["impressions"]), b["impressions"],
+    )
+
+    winner = None
+    enough_data = min(a["impressions"], b["impressions"]) >= MIN_IMPRESSIONS_FOR_WINNER
+    if enough_data and p_value is not None and p_value < SIGNIFICANCE_LEVEL:
+        winner = "variant_a" if results["variant_a"]["rate"] > results["variant_b"]["rate"] else "variant_b"
+
+    results["p_value"] = round(p_value, 6) if p_value is not None else None
+    results["significant"] = winner is not None
+    results["winner"] = winner
+    results["computed_at"] = datetime.utcnow()
+    return results
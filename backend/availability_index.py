@@ -0,0 +1,229 @@
+"""
+Table Availability Index for KUMIA Elite Dashboard
+Per-day slot bitmaps per table, maintained incrementally as reservations change
+"""
+
+import os
+import threading
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+SLOT_MINUTES = int(os.environ.get("RESERVATION_SLOT_MINUTES", 15))
+DINING_DURATION_MINUTES = int(os.environ.get("DINING_DURATION_MINUTES", 90))
+
+INACTIVE_STATUSES = {"cancelled", "completed", "no_show"}
+
+
+def default_floor_plan() -> List[Dict[str, Any]]:
+    """Restaurant tables: 6 tables (2 persons), 12 tables (4 persons), 2 tables (6 persons)"""
+    tables = []
+
+    # Tables for 2 persons (tables 1-6)
+    for i in range(1, 7):
+        tables.append({"id": f"table_{i}", "number": i, "capacity": 2, "status": "available", "location": "main_floor"})
+
+    # Tables for 4 persons (tables 7-18)
+    for i in range(7, 19):
+        tables.append({"id": f"table_{i}", "number": i, "capacity": 4, "status": "available", "location": "main_floor"})
+
+    # Tables for 6 persons (tables 19-20)
+    for i in range(19, 21):
+        tables.append({"id": f"table_{i}", "number": i, "capacity": 6, "status": "available", "location": "terrace"})
+
+    return tables
+
+
+class AvailabilityIndex:
+    """
+    Each table gets one integer bitmap per day, bit i meaning slot i is taken.
+    A booking occupies the slots covering [time, time + dining duration), so
+    overlapping bookings (19:00 vs 19:30) are detected with a single AND.
+    """
+
+    def __init__(self, tables: Iterable[Dict[str, Any]], slot_minutes: int = SLOT_MINUTES, dining_minutes: int = DINING_DURATION_MINUTES):
+        self.slot_minutes = slot_minutes
+        self.dining_minutes = dining_minutes
+        self.slots_per_day = (24 * 60) // slot_minutes
+        self._lock = threading.Lock()
+        self._days: Dict[str, Dict[str, int]] = {}
+        self._bookings: Dict[str, Tuple[str, Tuple[str, ...], int]] = {}
+        self._table_bookings: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._loaded: set = set()
+        # Reservations booked or removed while their day was being read
+        self._loading: Dict[str, set] = {}
+        self.set_tables(tables)
+
+    def set_tables(self, tables: Iterable[Dict[str, Any]]):
+        # Smallest tables first so best-fit candidates come out in order
+        self.tables = sorted(
+            ({**table, "id": str(table["id"])} for table in tables),
+            key=lambda table: (table.get("capacity", 0), table.get("number", 0)),
+        )
+        self.tables_by_id = {table["id"]: table for table in self.tables}
+
+    # SLOT MATH
+    def slot_for(self, time: str) -> int:
+        hours, minutes = time.split(":")[:2]
+        return (int(hours) * 60 + int(minutes)) // self.slot_minutes
+
+    def window_mask(self, time: str, duration_minutes: Optional[int] = None) -> int:
+        start = self.slot_for(time)
+        # A 19:10 start sits 10 minutes into its slot, so 120 minutes run to 21:10
+        hours, minutes = time.split(":")[:2]
+        offset = (int(hours) * 60 + int(minutes)) % self.slot_minutes
+        duration = duration_minutes or self.dining_minutes
+        length = max(1, -(-(offset + duration) // self.slot_minutes))
+        end = min(start + length, self.slots_per_day)
+        return ((1 << (end - start)) - 1) << start
+
+    # LOADING
+    def has_day(self, date: str) -> bool:
+        return date in self._loaded
+
+    def begin_load(self, date: str):
+        """Call before reading a day's reservations so changes made meanwhile survive load_day()"""
+        with self._lock:
+            self._loading.setdefault(date, set())
+
+    def load_day(self, date: str, reservations: Iterable[Dict[str, Any]]):
+        """Load a day from its reservations; bookings made or removed since begin_load() win over them"""
+        with self._lock:
+            touched = self._loading.pop(date, set())
+            self._days.setdefault(date, {})
+            self._loaded.add(date)
+
+        for reservation in reservations:
+            if reservation.get("id") not in touched:
+                self.add_reservation(reservation)
+
+    def loaded_days(self) -> List[str]:
+        return list(self._loaded)
+
+    def drop_day(self, date: str):
+        with self._lock:
+            self._forget_day(date)
+            self._days.pop(date, None)
+            self._loaded.discard(date)
+
+    def _forget_day(self, date: str):
+        for reservation_id, (booked_date, table_ids, _) in list(self._bookings.items()):
+            if booked_date == date:
+                del self._bookings[reservation_id]
+                for table_id in table_ids:
+                    self._table_bookings.pop((date, table_id), None)
+
+    # INCREMENTAL MAINTENANCE
+    def add_reservation(self, reservation: Dict[str, Any]) -> bool:
+        """Mark a reservation's slots as taken; returns False if it overlapped"""
+        if reservation.get("status") in INACTIVE_STATUSES:
+            self.remove_reservation(reservation.get("id"), reservation.get("date"))
+            return True
+
+        reservation_id = reservation.get("id")
+        table_ids = tuple(reservation.get("table_ids") or [reservation.get("table_id")])
+        date, time = reservation.get("date"), reservation.get("time")
+        if not (reservation_id and all(table_ids) and date and time):
+            return True
+
+        mask = self.window_mask(time, reservation.get("duration_minutes"))
+        with self._lock:
+            previous = self._bookings.pop(reservation_id, None)
+            if previous:
+                self._touch(reservation_id, previous[0])
+                self._clear(reservation_id, *previous)
+
+            day = self._days.setdefault(date, {})
+            free = not any(day.get(table_id, 0) & mask for table_id in table_ids)
+            self._book(day, reservation_id, date, table_ids, mask)
+        return free
+
+    def try_book(self, reservation_id: str, table_ids: Iterable[str], date: str, time: str, duration_minutes: Optional[int] = None) -> bool:
+        """Atomically check-and-set the slots of one or more tables"""
+        table_ids = tuple(table_ids)
+        mask = self.window_mask(time, duration_minutes)
+        with self._lock:
+            day = self._days.setdefault(date, {})
+            if any(day.get(table_id, 0) & mask for table_id in table_ids):
+                return False
+            self._book(day, reservation_id, date, table_ids, mask)
+        return True
+
+    def restore(self, reservation_id: str, date: str, table_ids: Tuple[str, ...], mask: int):
+        """Put back a booking returned by get_booking()"""
+        with self._lock:
+            self._book(self._days.setdefault(date, {}), reservation_id, date, tuple(table_ids), mask)
+
+    def _book(self, day: Dict[str, int], reservation_id: str, date: str, table_ids: Tuple[str, ...], mask: int):
+        self._touch(reservation_id, date)
+        for table_id in table_ids:
+            day[table_id] = day.get(table_id, 0) | mask
+            self._table_bookings.setdefault((date, table_id), {})[reservation_id] = mask
+        self._bookings[reservation_id] = (date, table_ids, mask)
+
+    def remove_reservation(self, reservation_id: Optional[str], date: Optional[str] = None):
+        with self._lock:
+            booking = self._bookings.pop(reservation_id, None)
+            if booking:
+                self._touch(reservation_id, booking[0])
+                self._clear(reservation_id, *booking)
+            elif date:
+                self._touch(reservation_id, date)
+            else:
+                # Not indexed, so any day being read may still list it
+                for touched in self._loading.values():
+                    touched.add(reservation_id)
+
+    def _touch(self, reservation_id: str, date: str):
+        touched = self._loading.get(date)
+        if touched is not None:
+            touched.add(reservation_id)
+
+    def _clear(self, reservation_id: str, date: str, table_ids: Tuple[str, ...], mask: int):
+        # Rebuild each table's bitmap so bookings that overlapped each other
+        # keep their slots when only one of them goes away
+        day = self._days.setdefault(date, {})
+        for table_id in table_ids:
+            table_bookings = self._table_bookings.get((date, table_id), {})
+            table_bookings.pop(reservation_id, None)
+            remaining = 0
+            for booked_mask in table_bookings.values():
+                remaining |= booked_mask
+            day[table_id] = remaining
+
+    # QUERIES
+    def is_free(self, table_id: str, date: str, time: str, duration_minutes: Optional[int] = None) -> bool:
+        mask = self.window_mask(time, duration_minutes)
+        return not (self._days.get(date, {}).get(table_id, 0) & mask)
+
+    def free_tables(self, date: str, time: str, guests: int = 1, duration_minutes: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Tables seating at least `guests` with no booking overlapping the window"""
+        mask = self.window_mask(time, duration_minutes)
+        day = self._days.get(date, {})
+        return [
+            table for table in self.tables
+            if table.get("capacity", 0) >= guests and not (day.get(table["id"], 0) & mask)
+        ]
+
+    def get_booking(self, reservation_id: str) -> Optional[Tuple[str, Tuple[str, ...], int]]:
+        """(date, table_ids, mask) of an indexed reservation"""
+        return self._bookings.get(reservation_id)
+
+    def booked_times(self, date: str, table_id: str) -> List[str]:
+        """Start times ("HH:MM") of the table's booked slots on a day"""
+        bitmap = self.day_bitmap(date, table_id)
+        times = []
+        for slot in range(self.slots_per_day):
+            if bitmap >> slot & 1:
+                minutes = slot * self.slot_minutes
+                times.append(f"{minutes // 60:02d}:{minutes % 60:02d}")
+        return times
+
+    def day_bitmap(self, date: str, table_id: str) -> int:
+        return self._days.get(date, {}).get(table_id, 0)
+
+    def occupancy(self, date: str) -> Dict[str, List[int]]:
+        """Booked slot numbers per table, for debugging and publication"""
+        day = self._days.get(date, {})
+        return {
+            table_id: [slot for slot in range(self.slots_per_day) if bitmap >> slot & 1]
+            for table_id, bitmap in day.items() if bitmap
+        }
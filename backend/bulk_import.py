@@ -0,0 +1,362 @@
+"""
+Bulk Import for KUMIA Elite Dashboard
+Streaming CSV/JSON/NDJSON imports of menu items and customers, upserted in batches
+"""
+
+import asyncio
+import codecs
+import csv
+import io
+import json
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from models import Customer, MenuItem
+
+# Rows validated and written per bulk_write
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", 1000))
+# Larger uploads are imported by a background job
+IMPORT_INLINE_MAX_BYTES = int(os.environ.get("IMPORT_INLINE_MAX_BYTES", 1024 * 1024))
+# Row errors kept in a report; later ones are only counted
+MAX_REPORTED_ERRORS = 1000
+READ_CHUNK_SIZE = 64 * 1024
+
+FORMATS = ("csv", "json", "ndjson")
+
+
+class ImportFileError(ValueError):
+    """The upload cannot be imported at all (unknown dataset or format, unreadable file)"""
+
+
+@dataclass(frozen=True)
+class ImportSpec:
+    collection: str
+    model: type
+    # Upsert key (menu rows without an id get a new one, i.e. are always inserted)
+    key: str
+    # Stored lower-cased and trimmed, so the key matches however it was typed
+    normalize_key: bool = False
+    # Enforced by a unique index, so concurrent imports cannot duplicate a key
+    unique_key: bool = False
+
+
+IMPORTS = {
+    "menu": ImportSpec(collection="menu_items", model=MenuItem, key="id"),
+    "customers": ImportSpec(collection="customers", model=Customer, key="email", normalize_key=True, unique_key=True),
+}
+
+# Server error code of a unique index violation
+DUPLICATE_KEY = 11000
+
+
+async def ensure_key_index(db, spec: ImportSpec):
+    """Index the upsert key; a unique key is normalized in stored documents first"""
+    collection = db[spec.collection]
+    if not spec.unique_key:
+        await collection.create_index([(spec.key, ASCENDING)])
+        return
+
+    indexes = await collection.index_information()
+    existing = [(name, info) for name, info in indexes.items() if info["key"] == [(spec.key, ASCENDING)]]
+    if any(info.get("unique") for _, info in existing):
+        return
+
+    if spec.normalize_key:
+        # Keys written before they were normalized, e.g. "Ana@Mail.com "
+        async for document in collection.find({spec.key: {"$regex": r"[A-Z]|^\s|\s$"}}, {"_id": 1, spec.key: 1}):
+            await collection.update_one({"_id": document["_id"]}, {"$set": {spec.key: document[spec.key].strip().lower()}})
+    for name, _ in existing:
+        await collection.drop_index(name)
+    try:
+        await collection.create_index(
+            [(spec.key, ASCENDING)], unique=True,
+            partialFilterExpression={spec.key: {"$type": "string"}},
+        )
+    except OperationFailure as e:
+        print(f"⚠️ {spec.collection}.{spec.key} has duplicates; merge them to enforce uniqueness: {e}")
+        await collection.create_index([(spec.key, ASCENDING)])
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    name = (filename or "").lower()
+    for export_format, suffixes in (("ndjson", (".ndjson", ".jsonl")), ("json", (".json",)), ("csv", (".csv",))):
+        if name.endswith(suffixes):
+            return export_format
+    content_type = (content_type or "").lower()
+    if "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    if "json" in content_type:
+        return "json"
+    if "csv" in content_type:
+        return "csv"
+    raise ImportFileError("Cannot tell the file format; name it .csv, .json or .ndjson or pass format=")
+
+
+# ROW READERS (file object -> (row number, row or parse error))
+def _csv_value(value: str) -> Any:
+    value = value.strip()
+    if not value:
+        return None
+    # Lists and objects can be given as JSON inside a cell
+    if value[0] in "[{":
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return value
+
+
+def read_csv(binary) -> Iterator[Tuple[int, Any]]:
+    text = io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(text)
+    for row in reader:
+        values = {name.strip(): _csv_value(value) for name, value in row.items() if name and isinstance(value, str)}
+        # Blank cells mean "not given", so updates leave those fields alone
+        yield reader.line_num, {name: value for name, value in values.items() if value is not None}
+
+
+def read_ndjson(binary) -> Iterator[Tuple[int, Any]]:
+    for number, line in enumerate(io.TextIOWrapper(binary, encoding="utf-8-sig"), start=1):
+        if line.strip():
+            try:
+                yield number, json.loads(line)
+            except ValueError as e:
+                yield number, ImportFileError(f"Invalid JSON: {e}")
+
+
+def read_json(binary) -> Iterator[Tuple[int, Any]]:
+    """Items of a top-level JSON array, decoded one at a time instead of loading the whole document"""
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer, position, number, started = "", 0, 0, False
+    while True:
+        chunk = binary.read(READ_CHUNK_SIZE)
+        buffer = buffer[position:] + text.decode(chunk, final=not chunk)
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != "[":
+                    raise ImportFileError("A JSON import must be an array of objects")
+                started, position = True, position + 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if not chunk:
+                    raise ImportFileError(f"Invalid JSON after item {number}")
+                break  # item continues in the next chunk
+            number, position = number + 1, end
+            yield number, item
+        if not chunk:
+            if started:
+                raise ImportFileError("Unterminated JSON array")
+            return
+
+
+READERS = {"csv": read_csv, "ndjson": read_ndjson, "json": read_json}
+
+
+class ImportReport:
+    def __init__(self):
+        self.total_rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed_rows = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def error(self, row: int, message: str, key: Any = None):
+        self.failed_rows += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "key": key, "error": message})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total_rows": self.total_rows,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed_rows": self.failed_rows,
+            "errors": self.errors,
+            "errors_truncated": self.failed_rows > len(self.errors),
+        }
+
+
+class BulkImporter:
+    """
+    Rows are read from the upload, validated against the model and written
+    with one unordered bulk_write of upserts per IMPORT_BATCH_SIZE rows.
+    Reading and validation run in a worker thread, a batch at a time, so
+    neither the event loop nor memory depend on the file size.
+
+    An upsert only $sets the columns the row actually has; model defaults
+    (new id, points, created_at...) are applied with $setOnInsert, so
+    re-importing a partial file never resets existing fields.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.jobs = db.import_jobs
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._listeners: Dict[str, List[Callable]] = {}
+
+    async def ensure_indexes(self):
+        """Upserts look rows up by their key; without these every row is a collection scan"""
+        for spec in IMPORTS.values():
+            await ensure_key_index(self.db, spec)
+            if spec.key != "id":
+                await self.db[spec.collection].create_index([("id", ASCENDING)])
+        await self.jobs.create_index([("user_id", ASCENDING), ("created_at", ASCENDING)])
+
+    def add_listener(self, dataset: str, listener: Callable):
+        """Awaited after an import into the dataset wrote anything, e.g. to invalidate caches"""
+        self._listeners.setdefault(dataset, []).append(listener)
+
+    # VALIDATION
+    def _operation(self, spec: ImportSpec, row: Any) -> Tuple[Any, UpdateOne]:
+        if not isinstance(row, dict):
+            raise ValueError("Row must be an object")
+        fields = spec.model.model_fields
+        unknown = sorted(set(row) - set(fields))
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+        # The model fills in a new id and the other defaults
+        document = spec.model.model_validate(row).model_dump()
+        key = document[spec.key]
+        if spec.normalize_key:
+            key = document[spec.key] = str(key).strip().lower()
+
+        # An existing document keeps its id even when matched on another key,
+        # and every write moves the version on like any other update
+        given = {name for name in row if name not in (spec.key, "id", "version")}
+        now = datetime.utcnow()
+        update = {
+            "$set": {name: document[name] for name in given},
+            "$setOnInsert": {name: value for name, value in document.items()
+                             if name not in given and name not in (spec.key, "version")},
+            "$inc": {"version": 1},
+        }
+        if "updated_at" in fields and "updated_at" not in given:
+            update["$set"]["updated_at"] = now
+            update["$setOnInsert"].pop("updated_at", None)
+        if not update["$set"]:
+            del update["$set"]
+        return key, UpdateOne({spec.key: key}, update, upsert=True)
+
+    def _next_batch(self, spec: ImportSpec, rows: Iterator[Tuple[int, Any]], report: ImportReport):
+        """Validated operations of the next batch (last row wins for a repeated key), or None at the end"""
+        operations: Dict[Any, Tuple[int, Any, UpdateOne]] = {}
+        count = 0
+        try:
+            for number, row in rows:
+                report.total_rows += 1
+                count += 1
+                if isinstance(row, Exception):
+                    report.error(number, str(row))
+                else:
+                    try:
+                        key, operation = self._operation(spec, row)
+                        operations[key] = (number, key, operation)
+                    except ValidationError as e:
+                        details = "; ".join(f"{'.'.join(map(str, error['loc'])) or 'row'}: {error['msg']}" for error in e.errors())
+                        report.error(number, details, row.get(spec.key) if isinstance(row, dict) else None)
+                    except ValueError as e:
+                        report.error(number, str(e), row.get(spec.key) if isinstance(row, dict) else None)
+                if count >= IMPORT_BATCH_SIZE:
+                    break
+        except (ImportFileError, UnicodeDecodeError, csv.Error) as e:
+            # The rest of the file is unreadable; the rows before it are still written
+            message = "File is not valid UTF-8" if isinstance(e, UnicodeDecodeError) else str(e)
+            report.error(report.total_rows + 1, message)
+            count += 1
+        return list(operations.values()) if count else None
+
+    # IMPORTING
+    async def run(self, dataset: str, binary, import_format: str, job_id: Optional[str] = None) -> Dict[str, Any]:
+        spec = IMPORTS[dataset]
+        collection = self.db[spec.collection]
+        report = ImportReport()
+        rows = READERS[import_format](binary)
+
+        while True:
+            batch = await asyncio.to_thread(self._next_batch, spec, rows, report)
+            if batch is None:
+                break
+            if batch:
+                await self._write(collection, batch, report)
+            if job_id:
+                await self.jobs.update_one({"id": job_id}, {"$set": {"progress": report.as_dict()}})
+
+        if report.inserted or report.updated:
+            for listener in self._listeners.get(dataset, []):
+                result = listener()
+                if asyncio.iscoroutine(result):
+                    await result
+        return report.as_dict()
+
+    async def _write(self, collection, batch: List[Tuple[int, Any, UpdateOne]], report: ImportReport, retry: bool = True):
+        try:
+            result = await collection.bulk_write([operation for _, _, operation in batch], ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            conflicts = []
+            for error in details.get("writeErrors", []):
+                number, key, operation = batch[error["index"]]
+                if retry and error.get("code") == DUPLICATE_KEY:
+                    # Another import inserted the key first; the retry updates it
+                    conflicts.append((number, key, operation))
+                else:
+                    report.error(number, error.get("errmsg", "write failed"), key)
+            if conflicts:
+                await self._write(collection, conflicts, report, retry=False)
+        report.inserted += details.get("nUpserted", 0)
+        report.updated += details.get("nMatched", 0)
+
+    # BACKGROUND JOBS
+    async def start_job(self, dataset: str, path: str, import_format: str, filename: str, user_id: str) -> Dict[str, Any]:
+        """Import a file saved to disk in the background; the file is deleted when the job ends"""
+        job = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "dataset": dataset,
+            "filename": filename,
+            "format": import_format,
+            "status": "queued",
+            "created_at": datetime.utcnow(),
+        }
+        await self.jobs.insert_one(dict(job))
+        task = asyncio.create_task(self._run_job(job["id"], dataset, path, import_format))
+        self._tasks[job["id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job["id"], None))
+        return job
+
+    async def _run_job(self, job_id: str, dataset: str, path: str, import_format: str):
+        await self.jobs.update_one({"id": job_id}, {"$set": {"status": "running", "started_at": datetime.utcnow()}})
+        try:
+            with open(path, "rb") as binary:
+                report = await self.run(dataset, binary, import_format, job_id)
+            await self.jobs.update_one({"id": job_id}, {
+                "$set": {"status": "completed", "report": report, "finished_at": datetime.utcnow()},
+                "$unset": {"progress": ""},
+            })
+        except Exception as e:
+            print(f"❌ Import job {job_id} failed: {e}")
+            await self.jobs.update_one({"id": job_id}, {"$set": {"status": "failed", "error": str(e), "finished_at": datetime.utcnow()}})
+        finally:
+            os.unlink(path)
+
+    async def get_job(self, job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        return await self.jobs.find_one({"id": job_id, "user_id": user_id}, {"_id": 0})
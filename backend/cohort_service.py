@@ -0,0 +1,290 @@
+"""
+Cohort Service for KUMIA Elite Dashboard
+Monthly acquisition cohorts, retention curves and customer lifetime value, cached per month
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from pymongo import ASCENDING
+
+# Months of cohorts shown by default (the retention matrix is months x months)
+COHORT_MONTHS = 24
+
+# Closed months never change; the current one is recomputed at most this often
+CURRENT_PERIOD_TTL = timedelta(seconds=int(os.environ.get("COHORT_REFRESH_SECONDS", "600")))
+
+# Cohorts whose month-1 retention makes up the dashboard retention rate
+RETENTION_WINDOW = 12
+
+COHORT_TOTAL_FIELDS = {"customers": 0, "total_spent": 0.0, "total_orders": 0}
+
+
+def month_key(value: datetime) -> str:
+    return f"{value.year:04d}-{value.month:02d}"
+
+
+def month_start(key: str) -> datetime:
+    year, month = key.split("-")
+    return datetime(int(year), int(month), 1)
+
+
+def add_months(key: str, months: int) -> str:
+    start = month_start(key)
+    index = start.year * 12 + start.month - 1 + months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def month_range(key: str) -> Dict[str, datetime]:
+    """Mongo range filter for the calendar month"""
+    return {"$gte": month_start(key), "$lt": month_start(add_months(key, 1))}
+
+
+def cohort_of(customer: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Acquisition month of a customer (the month of their first visit)"""
+    first_visit = customer.get("first_visit") if customer else None
+    return month_key(first_visit) if isinstance(first_visit, datetime) else None
+
+
+def _percentage(part: float, whole: float) -> float:
+    return round(100 * part / whole, 1) if whole else 0.0
+
+
+class CohortService:
+    """
+    Customers are grouped by the month of their first visit. Two small
+    collections hold everything the reports need, so no report ever scans
+    the full history:
+
+    - cohort_totals: per cohort, its size, lifetime spend and orders. Customer
+      writes adjust them incrementally; a missing cohort is aggregated from
+      its own first_visit range only.
+    - cohort_periods: per calendar month, how many customers of each cohort
+      were active (an activity, a first or a last visit in that month) and
+      what their orders were worth. A closed month is computed once from
+      that month's activities and kept; only the current month is
+      recomputed, at most every CURRENT_PERIOD_TTL.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.customers = db.customers
+        self.activities = db.customer_activities
+        self.totals = db.cohort_totals
+        self.periods = db.cohort_periods
+
+    async def ensure_indexes(self):
+        """Create the indexes that keep every cohort aggregation to one month of data"""
+        await self.customers.create_index([("first_visit", ASCENDING)])
+        # Joined on by every period's $lookup
+        await self.customers.create_index([("id", ASCENDING)])
+        await self.customers.create_index([("last_visit", ASCENDING)])
+        await self.activities.create_index([("timestamp", ASCENDING)])
+
+    # COHORT TOTALS
+    async def apply_customer_change(self, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]):
+        """Incrementally adjust cohort totals when a customer is written"""
+        deltas: Dict[str, Dict[str, float]] = {}
+        for customer, sign in ((before, -1), (after, 1)):
+            cohort = cohort_of(customer)
+            if cohort is None:
+                continue
+            delta = deltas.setdefault(cohort, dict.fromkeys(COHORT_TOTAL_FIELDS, 0))
+            delta["customers"] += sign
+            delta["total_spent"] += sign * (customer.get("total_spent") or 0)
+            delta["total_orders"] += sign * (customer.get("total_orders") or 0)
+
+        # Only adjust totals that were already materialized; a missing cohort
+        # will be aggregated from scratch on first read
+        for cohort, delta in deltas.items():
+            delta = {name: value for name, value in delta.items() if value}
+            if delta:
+                await self.totals.update_one({"_id": cohort}, {"$inc": delta})
+
+        # Editing visit history changes months that are already closed
+        current = month_key(datetime.utcnow())
+        rewritten = [
+            month for field in ("first_visit", "last_visit")
+            for month in self._rewritten_months(before, after, field)
+            if month < current
+        ]
+        if rewritten:
+            await self.periods.delete_many({"_id": {"$gte": min(rewritten)}})
+
+    @staticmethod
+    def _rewritten_months(before, after, field: str) -> List[str]:
+        """Months whose cached period no longer holds after `field` changed"""
+        old = before.get(field) if before else None
+        new = after.get(field) if after else None
+        if old == new:
+            return []
+        if field == "last_visit" and isinstance(old, datetime) and isinstance(new, datetime) and new >= old:
+            # A new visit: the earlier month still saw the customer
+            return []
+        return [month_key(value) for value in (old, new) if isinstance(value, datetime)]
+
+    async def invalidate(self, periods: bool = True):
+        """Drop cached totals (and periods), e.g. after a bulk import; each is recomputed on its next read"""
+        await self.totals.delete_many({})
+        if periods:
+            await self.periods.delete_many({})
+
+    async def cohort_totals(self, cohorts: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Size, lifetime spend and orders of each cohort"""
+        totals = {cohort: dict(COHORT_TOTAL_FIELDS) for cohort in cohorts}
+        async for doc in self.totals.find({"_id": {"$in": cohorts}}):
+            totals[doc["_id"]].update({name: doc.get(name, 0) for name in COHORT_TOTAL_FIELDS})
+            totals[doc["_id"]]["_cached"] = True
+
+        missing = [cohort for cohort in cohorts if not totals[cohort].pop("_cached", False)]
+        if missing:
+            pipeline = [
+                {"$match": {"$or": [{"first_visit": month_range(cohort)} for cohort in missing]}},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m", "date": "$first_visit"}},
+                    "customers": {"$sum": 1},
+                    "total_spent": {"$sum": {"$ifNull": ["$total_spent", 0]}},
+                    "total_orders": {"$sum": {"$ifNull": ["$total_orders", 0]}},
+                }},
+            ]
+            async for doc in self.customers.aggregate(pipeline):
+                totals[doc["_id"]].update({name: doc[name] for name in COHORT_TOTAL_FIELDS})
+            for cohort in missing:
+                await self.totals.replace_one({"_id": cohort}, {"_id": cohort, **totals[cohort]}, upsert=True)
+        return totals
+
+    # MONTHLY PERIODS
+    async def periods_for(self, months: List[str], now: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+        """Per-cohort activity of each calendar month, computing only missing or expired months"""
+        now = now or datetime.utcnow()
+        periods = {}
+        async for doc in self.periods.find({"_id": {"$in": months}}):
+            if doc.get("final") or now - doc["computed_at"] < CURRENT_PERIOD_TTL:
+                periods[doc["_id"]] = doc
+        for month in months:
+            if month not in periods:
+                periods[month] = await self._compute_period(month, now)
+        return periods
+
+    async def _compute_period(self, month: str, now: datetime) -> Dict[str, Any]:
+        months = month_range(month)
+        start, end = months["$gte"], months["$lt"]
+        in_month = lambda field: {"$and": [{"$gte": [field, start]}, {"$lt": [field, end]}]}
+        is_order = {"$eq": ["$activity_type", "order"]}
+
+        cohorts: Dict[str, Dict[str, Any]] = {}
+        activity_pipeline = [
+            {"$match": {"timestamp": months}},
+            {"$group": {
+                "_id": "$user_id",
+                "revenue": {"$sum": {"$cond": [is_order, {"$ifNull": ["$activity_data.amount", 0]}, 0]}},
+                "orders": {"$sum": {"$cond": [is_order, 1, 0]}},
+            }},
+            {"$lookup": {"from": "customers", "localField": "_id", "foreignField": "id", "as": "customer"}},
+            {"$unwind": "$customer"},
+            {"$match": {"customer.first_visit": {"$type": "date"}}},
+            {"$project": {
+                "cohort": {"$dateToString": {"format": "%Y-%m", "date": "$customer.first_visit"}},
+                "revenue": 1,
+                "orders": 1,
+                "visited": {"$or": [in_month("$customer.first_visit"), in_month("$customer.last_visit")]},
+            }},
+            {"$group": {
+                "_id": "$cohort",
+                "active": {"$sum": 1},
+                "visited": {"$sum": {"$cond": ["$visited", 1, 0]}},
+                "revenue": {"$sum": "$revenue"},
+                "orders": {"$sum": "$orders"},
+            }},
+        ]
+        async for doc in self.activities.aggregate(activity_pipeline):
+            cohorts[doc["_id"]] = {
+                # Customers who also visited are counted again below
+                "active": doc["active"] - doc["visited"],
+                "revenue": round(doc["revenue"], 2),
+                "orders": doc["orders"],
+            }
+
+        visit_pipeline = [
+            {"$match": {"$or": [{"first_visit": months}, {"last_visit": months}]}},
+            {"$group": {"_id": {"$dateToString": {"format": "%Y-%m", "date": "$first_visit"}}, "visited": {"$sum": 1}}},
+        ]
+        async for doc in self.customers.aggregate(visit_pipeline):
+            cell = cohorts.setdefault(doc["_id"], {"active": 0, "revenue": 0.0, "orders": 0})
+            cell["active"] += doc["visited"]
+
+        by_source = {}
+        source_pipeline = [
+            {"$match": {"timestamp": months, "activity_type": "order"}},
+            {"$group": {"_id": "$source", "revenue": {"$sum": {"$ifNull": ["$activity_data.amount", 0]}}}},
+        ]
+        async for doc in self.activities.aggregate(source_pipeline):
+            by_source[doc["_id"] or "unknown"] = round(doc["revenue"], 2)
+
+        period = {
+            "_id": month,
+            "cohorts": cohorts,
+            "revenue_by_source": by_source,
+            # A month that had already ended when computed is never recomputed
+            "final": end <= now,
+            "computed_at": now,
+        }
+        await self.periods.replace_one({"_id": month}, period, upsert=True)
+        return period
+
+    # REPORTS
+    async def first_activity_month(self) -> Optional[str]:
+        first = await self.activities.find_one({}, {"timestamp": 1}, sort=[("timestamp", ASCENDING)])
+        return month_key(first["timestamp"]) if first and isinstance(first.get("timestamp"), datetime) else None
+
+    async def cohort_report(self, months: int = COHORT_MONTHS, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        One row per acquisition cohort of the last `months` months:
+        retention[k] is the % of the cohort active k months after acquisition,
+        revenue_per_customer[k] the cumulative order revenue per customer by then.
+        """
+        now = now or datetime.utcnow()
+        current = month_key(now)
+        keys = [add_months(current, offset) for offset in range(1 - months, 1)]
+        totals = await self.cohort_totals(keys)
+        periods = await self.periods_for(keys, now)
+
+        rows = []
+        for index, cohort in enumerate(keys):
+            total = totals[cohort]
+            size = total["customers"]
+            retention, revenue_per_customer = [], []
+            cumulative = 0.0
+            for month in keys[index:]:
+                cell = periods[month]["cohorts"].get(cohort, {})
+                cumulative += cell.get("revenue", 0)
+                retention.append(_percentage(cell.get("active", 0), size))
+                revenue_per_customer.append(round(cumulative / size, 2) if size else 0.0)
+            rows.append({
+                "cohort": cohort,
+                "customers": size,
+                "total_spent": round(total["total_spent"], 2),
+                "total_orders": total["total_orders"],
+                "clv_to_date": round(total["total_spent"] / size, 2) if size else 0.0,
+                "average_ticket": round(total["total_spent"] / total["total_orders"], 2) if total["total_orders"] else 0.0,
+                "retention": retention,
+                "revenue_per_customer": revenue_per_customer,
+            })
+        return {
+            "months": keys,
+            "cohorts": rows,
+            "revenue_by_source": {month: periods[month]["revenue_by_source"] for month in keys},
+        }
+
+    @staticmethod
+    def month_one_retention(rows: List[Dict[str, Any]]) -> Optional[float]:
+        """Customer-weighted % of a cohort that came back the month after acquisition; None without customers"""
+        returned = sum(row["customers"] * row["retention"][1] / 100 for row in rows if len(row["retention"]) > 1)
+        size = sum(row["customers"] for row in rows if len(row["retention"]) > 1)
+        return _percentage(returned, size) if size else None
+
+    async def retention_rate(self, now: Optional[datetime] = None) -> Optional[float]:
+        """Month-1 retention of the last RETENTION_WINDOW cohorts whose month-1 is over"""
+        report = await self.cohort_report(RETENTION_WINDOW + 2, now)
+        return self.month_one_retention(report["cohorts"][:-2])
@@ -0,0 +1,76 @@
+"""
+Core for KUMIA Elite Dashboard
+Configuration, database and authentication shared by the API routers
+"""
+
+from fastapi import HTTPException, Depends
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from motor.motor_asyncio import AsyncIOMotorClient
+from typing import Optional
+from datetime import datetime, timedelta
+import os
+import logging
+import jwt
+from passlib.context import CryptContext
+from pathlib import Path
+from dotenv import load_dotenv
+
+from models import User
+from query_monitor import query_monitor
+
+# Logging setup
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("server")
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# MongoDB connection (commands are monitored per request)
+mongo_url = os.environ['MONGO_URL']
+client = AsyncIOMotorClient(mongo_url, event_listeners=[query_monitor])
+db = client[os.environ['DB_NAME']]
+
+# Security
+security = HTTPBearer()
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+SECRET_KEY = os.environ.get("SECRET_KEY", "your-secret-key-here")
+ALGORITHM = "HS256"
+
+# OpenAI setup
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
+
+# Restaurant configuration
+RESTAURANT_CONFIG = {
+    "name": os.environ.get("RESTAURANT_NAME", "IL MANDORLA SMOKEHOUSE"),
+    "logo": os.environ.get("RESTAURANT_LOGO", "https://images.app.goo.gl/HySig5BgebwJZG6B9"),
+    "brand_color_primary": os.environ.get("BRAND_COLOR_PRIMARY", "#FF6B35"),
+    "brand_color_secondary": os.environ.get("BRAND_COLOR_SECONDARY", "#FFFFFF"),
+    "menu_highlights": ["Asado de Tira Premium", "Brisket Smokehouse", "Pulled Pork"],
+    "ai_personality": "Warm, professional, knowledgeable about smokehouse cuisine",
+    "automation_preferences": ["Birthday campaigns", "post-visit feedback", "loyalty upgrades"]
+}
+
+# Authentication functions
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    to_encode = data.copy()
+    if expires_delta:
+        expire = datetime.utcnow() + expires_delta
+    else:
+        expire = datetime.utcnow() + timedelta(minutes=15)
+    to_encode.update({"exp": expire})
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return encoded_jwt
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    try:
+        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        email: str = payload.get("sub")
+        if email is None:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        user = await db.users.find_one({"email": email})
+        if user is None:
+            raise HTTPException(status_code=401, detail="User not found")
+        return User(**user)
+    except jwt.JWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
@@ -0,0 +1,391 @@
+"""
+Credit Ledger for KUMIA Elite Dashboard
+Double-entry credit accounting with cached per-user balances
+"""
+
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+# Credits granted when an account is first opened (matches the old demo balance)
+INITIAL_CREDIT_GRANT = float(os.environ.get("INITIAL_CREDIT_GRANT", 1250))
+
+# Holds not settled or released in time (e.g. the worker crashed) are released by the sweeper
+CREDIT_HOLD_TTL = timedelta(seconds=int(os.environ.get("CREDIT_HOLD_TTL_SECONDS", 3600)))
+HOLD_SWEEP_INTERVAL_SECONDS = 60
+
+# Server error codes meaning "transactions need a replica set"
+TRANSACTIONS_UNSUPPORTED_CODES = {20, 263}
+
+
+class InsufficientCreditsError(Exception):
+    def __init__(self, user_id: str, required: float):
+        super().__init__(f"Insufficient credits for user {user_id}: {required} required")
+        self.user_id = user_id
+        self.required = required
+
+
+class InvalidCreditAmountError(ValueError):
+    def __init__(self, amount: float):
+        super().__init__(f"Credit amount must be positive, got {amount}")
+        self.amount = amount
+
+
+class CreditLedger:
+    """
+    Every movement is a transaction of ledger legs that sum to zero. The user's
+    side of the books is mirrored into a single credit_balances doc, keyed by
+    user id, which is updated in the same transaction as the ledger insert.
+    Amounts are rounded to cents before they touch either side, so the
+    balance and the entries cannot drift apart.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.ledger = db.credit_ledger
+        self.balances = db.credit_balances
+        self.reservations = db.credit_reservations
+        self._transactions_supported: Optional[bool] = None
+        self._sweeper: Optional[asyncio.Task] = None
+
+    async def ensure_indexes(self):
+        await self.ledger.create_index([("user_id", ASCENDING), ("created_at", DESCENDING)])
+        await self.ledger.create_index([("transaction_id", ASCENDING)])
+        await self.ledger.create_index(
+            [("idempotency_key", ASCENDING), ("leg", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"idempotency_key": {"$exists": True}},
+        )
+        await self.reservations.create_index([("id", ASCENDING)], unique=True)
+        await self.reservations.create_index([("status", ASCENDING), ("expires_at", ASCENDING)])
+
+    # BALANCES
+    async def get_balance(self, user_id: str) -> Dict[str, Any]:
+        """Single _id lookup on the cached balance doc"""
+        balance = await self.balances.find_one({"_id": user_id})
+        if balance is None or not balance.get("granted"):
+            balance = await self._open_account(user_id)
+        return self._format_balance(balance)
+
+    async def _open_account(self, user_id: str) -> Dict[str, Any]:
+        """Create the balance doc and post the initial grant; safe to re-run until `granted` is set"""
+        try:
+            await self.balances.insert_one({
+                "_id": user_id,
+                "available": 0.0,
+                "reserved": 0.0,
+                "granted": False,
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow(),
+            })
+        except DuplicateKeyError:
+            pass  # Opened concurrently by another request, or an earlier grant failed
+
+        if INITIAL_CREDIT_GRANT > 0:
+            # The idempotency key makes a retried grant a replay once it has been posted
+            await self._post(
+                user_id,
+                kind="grant",
+                legs=[("system:grants", -INITIAL_CREDIT_GRANT), (self._account(user_id, "available"), INITIAL_CREDIT_GRANT)],
+                available_delta=INITIAL_CREDIT_GRANT,
+                idempotency_key=f"grant:{user_id}",
+            )
+        return await self.balances.find_one_and_update(
+            {"_id": user_id}, {"$set": {"granted": True}}, return_document=ReturnDocument.AFTER
+        )
+
+    async def _ensure_account(self, user_id: str):
+        balance = await self.balances.find_one({"_id": user_id}, {"granted": 1})
+        if balance is None or not balance.get("granted"):
+            await self._open_account(user_id)
+
+    @staticmethod
+    def _positive(amount: float) -> float:
+        # `not amount > 0` also rejects NaN
+        if not amount > 0:
+            raise InvalidCreditAmountError(amount)
+        return round(amount, 2)
+
+    @staticmethod
+    def _format_balance(balance: Dict[str, Any]) -> Dict[str, Any]:
+        available = round(balance.get("available", 0.0), 2)
+        reserved = round(balance.get("reserved", 0.0), 2)
+        return {
+            "user_id": balance["_id"],
+            "current_balance": available,
+            "reserved": reserved,
+            "currency": "credits",
+            "last_updated": balance.get("updated_at"),
+        }
+
+    @staticmethod
+    def _account(user_id: str, bucket: str) -> str:
+        return f"user:{user_id}:{bucket}"
+
+    # MOVEMENTS
+    async def purchase(self, user_id: str, amount: float, reference: str, idempotency_key: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """Credit purchased credits; returns (balance, replayed)"""
+        amount = self._positive(amount)
+        await self._ensure_account(user_id)
+        return await self._post(
+            user_id,
+            kind="purchase",
+            legs=[("system:purchases", -amount), (self._account(user_id, "available"), amount)],
+            available_delta=amount,
+            idempotency_key=f"purchase:{user_id}:{idempotency_key}" if idempotency_key else None,
+            reference=reference,
+        )
+
+    async def reserve(self, user_id: str, amount: float, reference: str) -> str:
+        """Hold credits for a pending generation; returns the reservation id"""
+        amount = self._positive(amount)
+        await self._ensure_account(user_id)
+        reservation_id = str(uuid.uuid4())
+        await self._post(
+            user_id,
+            kind="reserve",
+            legs=[(self._account(user_id, "available"), -amount), (self._account(user_id, "reserved"), amount)],
+            available_delta=-amount,
+            reserved_delta=amount,
+            require_available=amount,
+            idempotency_key=f"reserve:{reservation_id}",
+            reference=reference,
+        )
+        try:
+            await self.reservations.insert_one({
+                "id": reservation_id,
+                "user_id": user_id,
+                "amount": amount,
+                "reference": reference,
+                "status": "held",
+                "created_at": datetime.utcnow(),
+                "expires_at": datetime.utcnow() + CREDIT_HOLD_TTL,
+            })
+        except BaseException:
+            # Without its reservation doc the hold could never be released
+            await self._post(
+                user_id,
+                kind="release",
+                legs=[(self._account(user_id, "reserved"), -amount), (self._account(user_id, "available"), amount)],
+                available_delta=amount,
+                reserved_delta=-amount,
+                idempotency_key=f"release:{reservation_id}",
+                reference=reference,
+            )
+            raise
+        return reservation_id
+
+    async def settle(self, reservation_id: str, actual_amount: Optional[float] = None) -> bool:
+        """Charge a held reservation, returning any unused credits"""
+        reservation = await self._close_reservation(reservation_id, "settled")
+        if not reservation:
+            return False
+
+        user_id, held = reservation["user_id"], reservation["amount"]
+        charged = held if actual_amount is None else round(min(actual_amount, held), 2)
+        unused = round(held - charged, 2)
+        legs = [(self._account(user_id, "reserved"), -held), ("system:usage", charged)]
+        if unused > 0:
+            legs.append((self._account(user_id, "available"), unused))
+
+        await self._post(
+            user_id,
+            kind="settle",
+            legs=legs,
+            available_delta=unused,
+            reserved_delta=-held,
+            idempotency_key=f"settle:{reservation_id}",
+            reference=reservation.get("reference"),
+        )
+        return True
+
+    async def release(self, reservation_id: str) -> bool:
+        """Return a held reservation to the available balance"""
+        reservation = await self._close_reservation(reservation_id, "released")
+        if not reservation:
+            return False
+
+        user_id, held = reservation["user_id"], reservation["amount"]
+        await self._post(
+            user_id,
+            kind="release",
+            legs=[(self._account(user_id, "reserved"), -held), (self._account(user_id, "available"), held)],
+            available_delta=held,
+            reserved_delta=-held,
+            idempotency_key=f"release:{reservation_id}",
+            reference=reservation.get("reference"),
+        )
+        return True
+
+    async def release_expired(self, now: Optional[datetime] = None) -> int:
+        """Release holds past their expiry; returns how many were released"""
+        now = now or datetime.utcnow()
+        expired = await self.reservations.find(
+            {"status": "held", "expires_at": {"$lte": now}}, {"_id": 0, "id": 1}
+        ).to_list(None)
+        released = 0
+        for reservation in expired:
+            if await self.release(reservation["id"]):
+                released += 1
+        if released:
+            print(f"⚠️ Released {released} expired credit holds")
+        return released
+
+    def start_sweeper(self):
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def stop_sweeper(self):
+        if self._sweeper:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+    async def _sweep(self):
+        while True:
+            try:
+                await self.release_expired()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Credit hold sweeper error: {e}")
+            await asyncio.sleep(HOLD_SWEEP_INTERVAL_SECONDS)
+
+    async def _close_reservation(self, reservation_id: str, status: str) -> Optional[Dict[str, Any]]:
+        # Only the first settle/release of a reservation wins
+        return await self.reservations.find_one_and_update(
+            {"id": reservation_id, "status": "held"},
+            {"$set": {"status": status, "closed_at": datetime.utcnow()}},
+        )
+
+    async def get_entries(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        user_accounts = [self._account(user_id, "available"), self._account(user_id, "reserved")]
+        return await self.ledger.find(
+            {"user_id": user_id, "account": {"$in": user_accounts}},
+            {"_id": 0},
+        ).sort("created_at", DESCENDING).limit(limit).to_list(limit)
+
+    async def rebuild_balance(self, user_id: str) -> Dict[str, Any]:
+        """Recompute the cached balance from the ledger (repair tool)"""
+        totals = {"available": 0.0, "reserved": 0.0}
+        pipeline = [
+            {"$match": {"user_id": user_id}},
+            {"$group": {"_id": "$account", "total": {"$sum": "$amount"}}},
+        ]
+        async for row in self.ledger.aggregate(pipeline):
+            bucket = row["_id"].rsplit(":", 1)[-1]
+            if row["_id"].startswith(f"user:{user_id}:") and bucket in totals:
+                totals[bucket] = row["total"]
+
+        balance = await self.balances.find_one_and_update(
+            {"_id": user_id},
+            {"$set": {**totals, "updated_at": datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return self._format_balance(balance)
+
+    # POSTING
+    async def _post(
+        self,
+        user_id: str,
+        kind: str,
+        legs: List[Tuple[str, float]],
+        available_delta: float = 0.0,
+        reserved_delta: float = 0.0,
+        require_available: float = 0.0,
+        idempotency_key: Optional[str] = None,
+        reference: Optional[str] = None,
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Append ledger legs and update the cached balance atomically"""
+        transaction_id = str(uuid.uuid4())
+        now = datetime.utcnow()
+        entries = []
+        for index, (account, amount) in enumerate(legs):
+            entry = {
+                "transaction_id": transaction_id,
+                "leg": index,
+                "user_id": user_id,
+                "account": account,
+                "amount": round(amount, 2),
+                "kind": kind,
+                "reference": reference,
+                "created_at": now,
+            }
+            if idempotency_key:
+                entry["idempotency_key"] = idempotency_key
+            entries.append(entry)
+
+        balance_filter: Dict[str, Any] = {"_id": user_id}
+        if require_available:
+            balance_filter["available"] = {"$gte": round(require_available, 2)}
+        balance_update = {
+            # Rounded like the legs, so the cached balance matches the ledger
+            "$inc": {"available": round(available_delta, 2), "reserved": round(reserved_delta, 2)},
+            "$set": {"updated_at": now},
+        }
+
+        try:
+            if self._transactions_supported is not False:
+                try:
+                    balance = await self._post_in_transaction(entries, balance_filter, balance_update)
+                    self._transactions_supported = True
+                except OperationFailure as e:
+                    if e.code not in TRANSACTIONS_UNSUPPORTED_CODES:
+                        raise
+                    self._transactions_supported = False
+                    print("⚠️ MongoDB transactions unavailable, using compensating credit writes")
+                    balance = await self._post_sequential(entries, balance_filter, balance_update)
+            else:
+                balance = await self._post_sequential(entries, balance_filter, balance_update)
+        except DuplicateKeyError:
+            # Idempotent replay: the original transaction already applied
+            return self._format_balance(await self.balances.find_one({"_id": user_id})), True
+
+        if balance is None:
+            raise InsufficientCreditsError(user_id, require_available)
+        return self._format_balance(balance), False
+
+    async def _post_in_transaction(self, entries, balance_filter, balance_update):
+        async with await self.db.client.start_session() as session:
+            async with session.start_transaction():
+                await self._insert_entries(entries, session=session)
+                balance = await self.balances.find_one_and_update(
+                    balance_filter, balance_update,
+                    return_document=ReturnDocument.AFTER, session=session,
+                )
+                if balance is None:
+                    await session.abort_transaction()
+                return balance
+
+    async def _post_sequential(self, entries, balance_filter, balance_update):
+        # Standalone servers: guard the balance first, then record the legs,
+        # compensating the balance if the legs turn out to be a replay
+        balance = await self.balances.find_one_and_update(
+            balance_filter, balance_update, return_document=ReturnDocument.AFTER,
+        )
+        if balance is None:
+            return None
+
+        try:
+            await self._insert_entries(entries)
+        except DuplicateKeyError:
+            await self.balances.update_one(
+                {"_id": balance_filter["_id"]},
+                {"$inc": {field: -delta for field, delta in balance_update["$inc"].items()}},
+            )
+            raise
+        return balance
+
+    async def _insert_entries(self, entries, session=None):
+        try:
+            await self.ledger.insert_many(entries, session=session)
+        except BulkWriteError as e:
+            if any(error.get("code") == 11000 for error in e.details.get("writeErrors", [])):
+                raise DuplicateKeyError("Duplicate credit ledger idempotency key")
+            raise
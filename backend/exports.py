@@ -0,0 +1,263 @@
+"""
+Exports for KUMIA Elite Dashboard
+Streams collections as CSV or Parquet straight from a Motor cursor, in constant memory
+"""
+
+import asyncio
+import csv
+import io
+import os
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, get_args, get_origin, Union
+
+from fast_json import dumps
+from models import Customer, Feedback, Reservation
+
+# pyarrow (which pulls in numpy) is imported by the first Parquet export, not at server start
+pa = pq = None
+
+# Documents fetched per cursor round trip; each batch becomes one CSV chunk or one Parquet row group
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 5000))
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class ExportError(ValueError):
+    """Invalid export request (unknown dataset, column, filter or format)"""
+
+
+@dataclass(frozen=True)
+class ExportSpec:
+    collection: str
+    model: type
+    # Filterable by equality (comma-separated values match any) and, for numbers and dates, <field>_gte / <field>_lte
+    filterable: Tuple[str, ...]
+    # Stored fields that are not on the model but worth exporting
+    extra_columns: Dict[str, type] = field(default_factory=dict)
+    # Left out unless asked for explicitly
+    hidden_columns: Tuple[str, ...] = ()
+
+    def column_types(self) -> Dict[str, type]:
+        types = {name: _base_type(info.annotation) for name, info in self.model.model_fields.items()}
+        return {**types, **self.extra_columns}
+
+    def default_columns(self) -> List[str]:
+        return [name for name in self.column_types() if name not in self.hidden_columns]
+
+
+EXPORTS = {
+    "customers": ExportSpec(
+        collection="customers", model=Customer,
+        filterable=("nft_level", "points", "total_orders", "total_spent", "first_visit", "last_visit", "created_at"),
+    ),
+    "feedback": ExportSpec(
+        collection="feedback", model=Feedback,
+        filterable=("customer_id", "rating", "is_approved", "created_at"),
+        hidden_columns=("media_base64",),
+    ),
+    "reservations": ExportSpec(
+        collection="reservations", model=Reservation,
+        # Dashboard and UserWebApp reservations store these instead of phone/email
+        extra_columns={"customer_email": str, "whatsapp_phone": str, "table_id": str, "source": str, "special_notes": str},
+        filterable=("customer_id", "status", "date", "table_id", "source", "created_at"),
+    ),
+}
+
+
+def _base_type(annotation: Any) -> type:
+    """int for Optional[int]; dict/list annotations collapse to their container"""
+    if get_origin(annotation) is Union:
+        annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+    origin = get_origin(annotation)
+    if origin is not None:
+        return origin
+    return annotation if isinstance(annotation, type) else str
+
+
+def _coerce(kind: type, value: Any) -> Any:
+    """A stored value as the column's type; values that cannot be converted become None"""
+    if value is None:
+        return None
+    try:
+        if kind is datetime:
+            if isinstance(value, datetime):
+                return value
+            if isinstance(value, date):
+                return datetime(value.year, value.month, value.day)
+            return datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(tzinfo=None)
+        if kind is bool:
+            return value if isinstance(value, bool) else str(value).lower() in ("1", "true", "yes")
+        if kind in (int, float):
+            return kind(value)
+    except (TypeError, ValueError):
+        return None
+    if isinstance(value, (dict, list)):
+        return dumps(value).decode()
+    return str(value)
+
+
+def build_query(spec: ExportSpec, params: Dict[str, str]) -> Dict[str, Any]:
+    """MongoDB filter from query parameters such as status=confirmed,completed or points_gte=100"""
+    types = spec.column_types()
+    query: Dict[str, Any] = {}
+    for name, raw in params.items():
+        field_name, operator = name, None
+        for suffix in ("_gte", "_lte"):
+            if name.endswith(suffix) and name[:-len(suffix)] in spec.filterable:
+                field_name, operator = name[:-len(suffix)], f"${suffix[1:]}"
+        if field_name not in spec.filterable:
+            raise ExportError(f"Cannot filter {spec.collection} by '{name}'; filterable: {', '.join(spec.filterable)}")
+
+        kind = types[field_name]
+        if operator:
+            if kind not in (int, float, datetime):
+                raise ExportError(f"'{name}' needs a numeric or date field")
+            bound = _coerce(kind, raw)
+            if bound is None:
+                raise ExportError(f"Invalid value for '{name}': {raw!r}")
+            # Some documents store dates as ISO strings; those are compared as given
+            bounds = [bound, raw] if kind is datetime else [bound]
+            condition = {"$or": [{field_name: {operator: value}} for value in bounds]}
+            query.setdefault("$and", []).append(condition)
+        else:
+            values = [_coerce(kind, value) if kind is not datetime else value for value in raw.split(",")]
+            if any(value is None for value in values):
+                raise ExportError(f"Invalid value for '{name}': {raw!r}")
+            query[field_name] = values[0] if len(values) == 1 else {"$in": values}
+    return query
+
+
+def select_columns(spec: ExportSpec, columns: Optional[str]) -> List[str]:
+    if not columns:
+        return spec.default_columns()
+    selected = [name.strip() for name in columns.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in spec.column_types()]
+    if unknown:
+        raise ExportError(f"Unknown columns for {spec.collection}: {', '.join(unknown)}")
+    return selected
+
+
+async def _batches(db, spec: ExportSpec, query: Dict[str, Any], columns: List[str]) -> AsyncIterator[List[Dict[str, Any]]]:
+    projection = {"_id": 0, **{name: 1 for name in columns}}
+    # _id order uses the default index and keeps the cursor stable while documents are being added
+    cursor = db[spec.collection].find(query, projection).sort("_id", 1).batch_size(EXPORT_BATCH_SIZE)
+    batch = []
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# CSV
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return dumps(value).decode()
+    return value
+
+
+async def stream_csv(db, spec: ExportSpec, query: Dict[str, Any], columns: List[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # The BOM makes Excel read the file as UTF-8 (names with accents)
+    buffer.write("\ufeff")
+    writer.writerow(columns)
+    async for batch in _batches(db, spec, query, columns):
+        for document in batch:
+            writer.writerow([_csv_value(document.get(name)) for name in columns])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+# PARQUET
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands what the Parquet writer wrote so far to the response"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def _load_pyarrow():
+    global pa, pq
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:  # Parquet exports are unavailable without pyarrow
+            raise ExportError("Parquet exports need pyarrow installed")
+        pa, pq = pyarrow, pyarrow.parquet
+
+
+def _arrow_type(kind: type):
+    return {
+        str: pa.string(), int: pa.int64(), float: pa.float64(), bool: pa.bool_(), datetime: pa.timestamp("ms"),
+    }.get(kind, pa.string())
+
+
+def _encode_batch(writer, sink: _ChunkSink, schema, kinds: Dict[str, type], columns: List[str], batch: List[Dict[str, Any]]) -> bytes:
+    """Arrow arrays, compression and the Parquet write for one batch; CPU-bound, run off the event loop"""
+    arrays = [pa.array([_coerce(kinds[name], document.get(name)) for document in batch], type=schema.field(name).type)
+              for name in columns]
+    writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+    return sink.drain()
+
+
+async def stream_parquet(db, spec: ExportSpec, query: Dict[str, Any], columns: List[str]) -> AsyncIterator[bytes]:
+    _load_pyarrow()
+    types = spec.column_types()
+    kinds = {name: types[name] if types[name] in (str, int, float, bool, datetime) else str for name in columns}
+    schema = pa.schema([(name, _arrow_type(kinds[name])) for name in columns])
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        async for batch in _batches(db, spec, query, columns):
+            yield await asyncio.to_thread(_encode_batch, writer, sink, schema, kinds, columns, batch)
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_stream(db, dataset: str, export_format: str, params: Dict[str, str], columns: Optional[str] = None):
+    """Validates the request up front (so errors are a 400, not a broken download) and returns the byte stream"""
+    spec = EXPORTS.get(dataset)
+    if spec is None:
+        raise ExportError(f"Unknown export '{dataset}'; available: {', '.join(EXPORTS)}")
+    if export_format not in FORMATS:
+        raise ExportError(f"Unknown format '{export_format}'; available: {', '.join(FORMATS)}")
+    if export_format == "parquet":
+        _load_pyarrow()
+
+    selected = select_columns(spec, columns)
+    query = build_query(spec, params)
+    writer = stream_csv if export_format == "csv" else stream_parquet
+    return writer(db, spec, query, selected)
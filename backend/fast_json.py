@@ -0,0 +1,72 @@
+"""
+Fast JSON for KUMIA Elite Dashboard
+orjson serialization and validation-free model construction for trusted database reads
+"""
+
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Tuple, Type
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj: Any) -> Any:
+    # datetime, date, UUID and dataclasses are handled natively by orjson
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(warnings=False)
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson. Returning one from an endpoint skips
+    FastAPI's response_model validation and jsonable_encoder pass, so it is
+    meant for data that is already trusted (our own database documents);
+    response_model is still declared on the route for the OpenAPI schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+@lru_cache(maxsize=None)
+def _field_plan(model: Type[BaseModel]) -> Tuple[Tuple[str, Any, bool], ...]:
+    # (name, static default, has a static default); fields built by a
+    # default_factory (ids, timestamps) have none
+    return tuple(
+        (name, None if field.is_required() else field.default, field.default_factory is None)
+        for name, field in model.model_fields.items()
+    )
+
+
+def shape_many(model: Type[BaseModel], documents: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Shape stored documents like `model` for serialization, without building
+    model instances: only the model's fields are kept (dropping `_id`) and
+    missing ones get their static defaults. A missing field whose default
+    comes from a factory stays absent rather than getting a made-up id or
+    timestamp on every read. Nothing is validated or coerced, which is what
+    makes it fast; on pydantic 2 model_construct() is slower than
+    validating, so it is not used here.
+    """
+    plan = _field_plan(model)
+    return [
+        {name: document[name] if name in document else default
+         for name, default, static in plan if static or name in document}
+        for document in documents
+    ]
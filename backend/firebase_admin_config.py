@@ -7,12 +7,26 @@ import os
 import json
 import firebase_admin
 from firebase_admin import credentials, firestore, auth
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable
+from availability_index import AvailabilityIndex, default_floor_plan
+from firestore_mirror import FirestoreMirror
+from request_metrics import track
 
 class FirebaseAdminService:
+    # Methods that always go to Firestore (mirror reads are timed only when they fall back)
+    FIRESTORE_METHODS = (
+        'track_customer_activity', 'create_reservation', 'cancel_reservation',
+        'sync_menu_to_userwebapp', 'publish_menu_delta', 'get_customer_insights',
+    )
+    
     def __init__(self):
         self.db = None
         self.app = None
+        self.availability: Optional[AvailabilityIndex] = None
+        self.mirror: Optional[FirestoreMirror] = None
+        self._activity_watch = None
+        # Called with "menu" or "promotions" when the published content changes
+        self.on_public_change: Optional[Callable[[str], None]] = None
         self._initialize_firebase()
     
     def _initialize_firebase(self):
@@ -93,9 +107,18 @@ class FirebaseAdminService:
             return None
         
         try:
-            # Add to reservations collection
-            doc_ref = self.db.collection('operations').document('reservations').collection('active').add(reservation_data)
-            reservation_id = doc_ref[1].id
+            # Add to reservations collection, keeping the Dashboard id when given
+            active_ref = self.db.collection('operations').document('reservations').collection('active')
+            if reservation_data.get('id'):
+                reservation_id = reservation_data['id']
+                active_ref.document(reservation_id).set(reservation_data)
+            else:
+                reservation_id = active_ref.add(reservation_data)[1].id
+            
+            # Keep the availability index in step with the new booking
+            date = reservation_data.get('date')
+            if self.availability and date and self.availability.has_day(date):
+                self.availability.add_reservation({**reservation_data, 'id': reservation_id})
             
             # Track customer activity
             if reservation_data.get('customer_id'):
@@ -117,32 +140,80 @@ class FirebaseAdminService:
             print(f"❌ Error creating reservation: {e}")
             return None
     
+    def get_reservation(self, reservation_id: str) -> Optional[Dict[str, Any]]:
+        """Active reservation by id, from the mirror when it is live"""
+        if not self.db:
+            return None
+        if self.mirror and self.mirror.is_ready('reservations'):
+            return self.mirror['reservations'].get(reservation_id)
+        
+        with track('firestore'):
+            doc = self.db.collection('operations').document('reservations').collection('active').document(reservation_id).get()
+        return doc.to_dict() if doc.exists else None
+    
+    def cancel_reservation(self, reservation_id: str) -> bool:
+        """Cancel reservation and free its table slots"""
+        if not self.db:
+            return False
+        
+        try:
+            self.db.collection('operations').document('reservations').collection('active').document(reservation_id).update({
+                'status': 'cancelled',
+                'cancelled_at': firestore.SERVER_TIMESTAMP
+            })
+            
+            if self.availability:
+                self.availability.remove_reservation(reservation_id)
+            
+            print(f"✅ Reservation cancelled: {reservation_id}")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Error cancelling reservation: {e}")
+            return False
+    
     # TABLE MANAGEMENT
-    def get_table_availability(self, date: str, time: str) -> List[Dict[str, Any]]:
+    def get_availability_index(self) -> AvailabilityIndex:
+        """Availability index over the Firestore floor plan, built on first use"""
+        if self.availability is None:
+            if self.mirror and self.mirror.is_ready('tables'):
+                tables = self.mirror['tables'].values()
+            else:
+                tables_ref = self.db.collection('operations').document('tables').collection('restaurant_tables')
+                with track('firestore'):
+                    tables = [{**table.to_dict(), 'id': table.id} for table in tables_ref.get()]
+            self.availability = AvailabilityIndex(tables or default_floor_plan())
+        return self.availability
+    
+    def _load_availability_day(self, date: str):
+        # Served from the reservations mirror when it is live; otherwise one
+        # Firestore query per day. Afterwards the day is kept current by the
+        # listener and create_reservation / cancel_reservation
+        self.availability.begin_load(date)
+        if self.mirror and self.mirror.is_ready('reservations'):
+            reservations = [res for res in self.mirror['reservations'].values() if res.get('date') == date]
+        else:
+            reservations_ref = self.db.collection('operations').document('reservations').collection('active')
+            with track('firestore'):
+                reservations = [{**res.to_dict(), 'id': res.id} for res in reservations_ref.where('date', '==', date).get()]
+        self.availability.load_day(date, reservations)
+    
+    def get_day_availability(self, date: str) -> AvailabilityIndex:
+        """Availability index with the given day loaded"""
+        index = self.get_availability_index()
+        if not index.has_day(date):
+            self._load_availability_day(date)
+        return index
+    
+    def get_table_availability(self, date: str, time: str, guests: int = 1) -> List[Dict[str, Any]]:
         """Get available tables for specific date/time"""
         if not self.db:
             return []
         
         try:
-            # Get all tables
-            tables_ref = self.db.collection('operations').document('tables').collection('restaurant_tables')
-            tables = tables_ref.get()
-            
-            # Get reservations for the date
-            reservations_ref = self.db.collection('operations').document('reservations').collection('active')
-            reservations_query = reservations_ref.where('date', '==', date).where('time', '==', time)
-            reserved_tables = [res.to_dict().get('table_id') for res in reservations_query.get()]
+            index = self.get_day_availability(date)
             
-            # Filter available tables
-            available_tables = []
-            for table in tables:
-                table_data = table.to_dict()
-                if table.id not in reserved_tables:
-                    table_data['id'] = table.id
-                    table_data['status'] = 'available'
-                    available_tables.append(table_data)
-            
-            return available_tables
+            return [{**table, 'status': 'available'} for table in index.free_tables(date, time, guests)]
             
         except Exception as e:
             print(f"❌ Error getting table availability: {e}")
@@ -169,6 +240,40 @@ class FirebaseAdminService:
             print(f"❌ Error syncing menu: {e}")
             return False
     
+    def publish_menu_delta(self, upserts: Dict[str, Dict[str, Any]], removals: List[str], manifest: Dict[str, Any]) -> bool:
+        """Write changed menu item docs, delete removed ones, then swap the manifest"""
+        if not self.db:
+            return False
+        
+        try:
+            menu_ref = self.db.collection('public').document('menu')
+            items_ref = menu_ref.collection('items')
+            writes = [(items_ref.document(item_id), item) for item_id, item in upserts.items()]
+            writes += [(items_ref.document(item_id), None) for item_id in removals]
+            
+            # Batches hold at most 500 writes; the manifest goes last so readers
+            # never see a manifest pointing at items that are not written yet
+            for start in range(0, len(writes), 500):
+                batch = self.db.batch()
+                for ref, item in writes[start:start + 500]:
+                    if item is None:
+                        batch.delete(ref)
+                    else:
+                        batch.set(ref, item)
+                batch.commit()
+            
+            menu_ref.set({
+                **manifest,
+                'item_count': len(manifest['manifest']),
+                'last_updated': firestore.SERVER_TIMESTAMP,
+                'updated_by': 'menu_publisher'
+            }, merge=True)
+            return True
+            
+        except Exception as e:
+            print(f"❌ Error publishing menu delta: {e}")
+            return False
+    
     # MARKETING INTELLIGENCE
     def get_customer_insights(self, user_id: str) -> Dict[str, Any]:
         """Get comprehensive customer insights for marketing decisions"""
@@ -227,24 +332,65 @@ class FirebaseAdminService:
         
         return min(score / 10, 10.0)  # Normalize to 0-10 scale
     
+    # PUBLIC CONTENT (served from the mirror)
+    def get_public_menu(self) -> Optional[List[Dict[str, Any]]]:
+        """Menu items as last published to the UserWebApp, or None if not mirrored"""
+        if not (self.mirror and self.mirror.is_ready('public_menu') and self.mirror.is_ready('public_menu_items')):
+            return None
+        
+        menu = self.mirror['public_menu'].get('menu') or {}
+        if 'manifest' in menu:
+            items = self.mirror['public_menu_items']
+            return [items.get(entry['id']) for entry in menu['manifest'] if items.get(entry['id']) is not None]
+        return (menu.get('menu_data') or {}).get('items')
+    
+    def get_public_promotions(self) -> Optional[Dict[str, Any]]:
+        """Promotions as last published to the UserWebApp, or None if not mirrored"""
+        if not (self.mirror and self.mirror.is_ready('public_promotions')):
+            return None
+        return (self.mirror['public_promotions'].get('promotions') or {}).get('promotions')
+    
     # REAL-TIME SYNC UTILITIES
     def setup_realtime_listeners(self):
-        """Setup real-time listeners for bidirectional sync"""
-        if not self.db:
+        """Setup real-time listeners for bidirectional sync and the local mirror"""
+        if not self.db or self.mirror:
             return
         
         try:
             # Listen to UserWebApp activities
-            self.db.collection('customer_activities').on_snapshot(self._on_activity_change)
+            self._activity_watch = self.db.collection('customer_activities').on_snapshot(self._on_activity_change)
             
-            # Listen to reservation changes
-            self.db.collection('operations').document('reservations').collection('active').on_snapshot(self._on_reservation_change)
+            # Hot collections mirrored in memory
+            operations = self.db.collection('operations')
+            public = self.db.collection('public')
+            self.mirror = FirestoreMirror()
+            self.mirror.register('tables', operations.document('tables').collection('restaurant_tables'),
+                                 on_change=self._on_table_change, on_resync=self._on_tables_resync)
+            self.mirror.register('reservations', operations.document('reservations').collection('active'),
+                                 on_change=self._on_reservation_change, on_resync=self._on_reservations_resync)
+            for name, ref, content in (
+                ('public_menu', public.document('menu'), 'menu'),
+                ('public_menu_items', public.document('menu').collection('items'), 'menu'),
+                ('public_promotions', public.document('promotions'), 'promotions'),
+            ):
+                self.mirror.register(name, ref,
+                                     on_change=lambda *change, content=content: self._on_public_change(content),
+                                     on_resync=lambda content=content: self._on_public_change(content))
+            self.mirror.start()
             
             print("✅ Real-time listeners configured")
             
         except Exception as e:
             print(f"❌ Error setting up listeners: {e}")
     
+    def stop_realtime_listeners(self):
+        if self.mirror:
+            self.mirror.stop()
+            self.mirror = None
+        if self._activity_watch:
+            self._activity_watch.unsubscribe()
+            self._activity_watch = None
+    
     def _on_activity_change(self, docs, changes, read_time):
         """Handle real-time activity changes"""
         for change in changes:
@@ -252,16 +398,45 @@ class FirebaseAdminService:
                 activity = change.document.to_dict()
                 print(f"📊 New customer activity: {activity.get('activity_type')} by {activity.get('user_id')}")
     
-    def _on_reservation_change(self, docs, changes, read_time):
-        """Handle real-time reservation changes"""
-        for change in changes:
-            if change.type.name == 'ADDED':
-                reservation = change.document.to_dict()
-                print(f"📅 New reservation: {reservation.get('customer_name')} for {reservation.get('date')}")
+    def _on_reservation_change(self, change_type, reservation_id, reservation, previous):
+        """Keep loaded availability days in step with reservation changes"""
+        if not self.availability:
+            return
+        
+        if change_type == 'REMOVED':
+            self.availability.remove_reservation(reservation_id)
+        elif self.availability.has_day(reservation.get('date')):
+            self.availability.add_reservation({**reservation, 'id': reservation_id})
+        else:
+            # Moved to a day that is not loaded
+            self.availability.remove_reservation(reservation_id)
+    
+    def _on_reservations_resync(self):
+        # Days are reloaded lazily from the rebuilt mirror
+        if self.availability:
+            for date in self.availability.loaded_days():
+                self.availability.drop_day(date)
+    
+    def _on_table_change(self, change_type, table_id, table, previous):
+        self._on_tables_resync()
+    
+    def _on_tables_resync(self):
+        if self.availability:
+            self.availability.set_tables(self.mirror['tables'].values() or default_floor_plan())
+    
+    def _on_public_change(self, content: str):
+        if self.on_public_change:
+            self.on_public_change(content)
+    
+    def get_mirror_status(self) -> Dict[str, Any]:
+        return self.mirror.status() if self.mirror else {}
 
-# Initialize global Firebase service
-firebase_service = FirebaseAdminService()
+# Global firebase service, created on first use so importing this module stays cheap
+firebase_service: Optional[FirebaseAdminService] = None
 
 # Export for use in other modules
 def get_firebase_service():
-    return firebase_service
\ No newline at end of file
+    global firebase_service
+    if firebase_service is None:
+        firebase_service = FirebaseAdminService()
+    return firebase_service
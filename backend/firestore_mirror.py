@@ -0,0 +1,192 @@
+"""
+Firestore Mirror for KUMIA Elite Dashboard
+In-memory, versioned copies of hot Firestore collections kept current by real-time listeners
+"""
+
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable
+
+# How often listeners are checked for liveness and drift against Firestore
+MIRROR_CHECK_INTERVAL_SECONDS = float(os.environ.get("MIRROR_CHECK_INTERVAL_SECONDS", 300))
+
+# Called with (change_type, doc_id, data, previous) for every applied change
+ChangeCallback = Callable[[str, str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]], None]
+
+
+class MirroredCollection:
+    """
+    Local copy of one Firestore query or document.
+
+    The first snapshot from the listener is the full result set; later ones
+    carry only the changed documents, which are applied in place and bump
+    `version`. Every snapshot also lists the ids currently in the result set,
+    so each one doubles as a consistency check: if the applied changes do not
+    reproduce that set, or the listener skips back in time, the mirror is
+    rebuilt from the snapshot (a resync).
+    """
+
+    def __init__(self, name: str, ref, on_change: Optional[ChangeCallback] = None, on_resync: Optional[Callable[[], None]] = None):
+        self.name = name
+        self.ref = ref
+        self.on_change = on_change
+        self.on_resync = on_resync
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.version = 0
+        self.read_time = None
+        self.synced = False
+        self.resyncs = 0
+        self.last_event_at: Optional[datetime] = None
+        self._watch = None
+        self._lock = threading.Lock()
+
+    # LISTENER
+    def start(self):
+        self._watch = self.ref.on_snapshot(self._on_snapshot)
+
+    def stop(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    @property
+    def listening(self) -> bool:
+        return self._watch is not None and self._watch.is_active
+
+    def _on_snapshot(self, docs, changes, read_time):
+        snapshot = {doc.id: doc.to_dict() for doc in docs if doc.exists}
+        applied = []
+        resynced = False
+
+        with self._lock:
+            if not self.synced or (self.read_time and read_time and read_time < self.read_time):
+                resynced = self.synced
+                applied = self._replace(snapshot)
+            else:
+                for change in changes:
+                    doc_id = change.document.id
+                    previous = self.docs.get(doc_id)
+                    if change.type.name == 'REMOVED':
+                        self.docs.pop(doc_id, None)
+                        applied.append(('REMOVED', doc_id, None, previous))
+                    else:
+                        data = change.document.to_dict()
+                        self.docs[doc_id] = data
+                        applied.append((change.type.name, doc_id, data, previous))
+
+                if set(self.docs) != set(snapshot):
+                    print(f"⚠️ Mirror {self.name} drifted from its listener, resyncing")
+                    resynced = True
+                    applied = self._replace(snapshot)
+
+            self.version += 1
+            self.read_time = read_time
+            self.last_event_at = datetime.utcnow()
+
+        self._notify(applied, resynced)
+
+    def _replace(self, snapshot: Dict[str, Dict[str, Any]]) -> List[tuple]:
+        # Caller holds the lock
+        previous, self.docs = self.docs, dict(snapshot)
+        if self.synced:
+            self.resyncs += 1
+        self.synced = True
+        applied = [('ADDED', doc_id, data, previous.get(doc_id)) for doc_id, data in snapshot.items()]
+        applied += [('REMOVED', doc_id, None, data) for doc_id, data in previous.items() if doc_id not in snapshot]
+        return applied
+
+    def _notify(self, applied: List[tuple], resynced: bool):
+        try:
+            if resynced and self.on_resync:
+                self.on_resync()
+            elif self.on_change:
+                for change in applied:
+                    self.on_change(*change)
+        except Exception as e:
+            print(f"❌ Mirror {self.name} callback error: {e}")
+
+    # RESYNC
+    def resync(self):
+        """Reload from Firestore and resubscribe, e.g. after the listener dropped"""
+        self.stop()
+        result = self.ref.get()
+        docs = result if isinstance(result, list) else [result]
+        snapshot = {doc.id: doc.to_dict() for doc in docs if doc.exists}
+
+        with self._lock:
+            applied = self._replace(snapshot)
+            self.version += 1
+            self.last_event_at = datetime.utcnow()
+
+        print(f"🔄 Mirror {self.name} resynced ({len(snapshot)} docs)")
+        self._notify(applied, resynced=True)
+        self.start()
+
+    # READS
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        return self.docs.get(doc_id)
+
+    def values(self) -> List[Dict[str, Any]]:
+        return [{**data, 'id': doc_id} for doc_id, data in list(self.docs.items())]
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'documents': len(self.docs),
+            'synced': self.synced,
+            'listening': self.listening,
+            'resyncs': self.resyncs,
+            'last_event_at': self.last_event_at.isoformat() if self.last_event_at else None,
+        }
+
+
+class FirestoreMirror:
+    """Mirrors registered by name, with a background liveness check"""
+
+    def __init__(self, check_interval: float = MIRROR_CHECK_INTERVAL_SECONDS):
+        self.collections: Dict[str, MirroredCollection] = {}
+        self.check_interval = check_interval
+        self._stop = threading.Event()
+        self._checker: Optional[threading.Thread] = None
+
+    def register(self, name: str, ref, on_change: Optional[ChangeCallback] = None, on_resync: Optional[Callable[[], None]] = None) -> MirroredCollection:
+        mirrored = MirroredCollection(name, ref, on_change, on_resync)
+        self.collections[name] = mirrored
+        return mirrored
+
+    def __getitem__(self, name: str) -> MirroredCollection:
+        return self.collections[name]
+
+    def is_ready(self, name: str) -> bool:
+        mirrored = self.collections.get(name)
+        return bool(mirrored and mirrored.synced)
+
+    def start(self):
+        for mirrored in self.collections.values():
+            mirrored.start()
+        self._stop.clear()
+        self._checker = threading.Thread(target=self._check_loop, name="firestore-mirror-check", daemon=True)
+        self._checker.start()
+
+    def stop(self):
+        self._stop.set()
+        for mirrored in self.collections.values():
+            mirrored.stop()
+
+    def _check_loop(self):
+        while not self._stop.wait(self.check_interval):
+            self.check()
+
+    def check(self):
+        """Resync any mirror whose listener stopped streaming (a gap in events)"""
+        for mirrored in self.collections.values():
+            if mirrored.synced and not mirrored.listening:
+                print(f"⚠️ Mirror {mirrored.name} listener inactive, resyncing")
+                try:
+                    mirrored.resync()
+                except Exception as e:
+                    print(f"❌ Error resyncing mirror {mirrored.name}: {e}")
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: mirrored.status() for name, mirrored in self.collections.items()}
@@ -0,0 +1,136 @@
+"""
+Loop Watchdog for KUMIA Elite Dashboard
+Opt-in event-loop lag monitor that captures the stack and route of blocking calls
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from request_metrics import registry, request_for_task, route_for
+
+logger = logging.getLogger("server")
+
+# Set to a threshold in ms to run the watchdog with the app, e.g. LOOP_WATCHDOG_MS=100
+LOOP_WATCHDOG_MS = float(os.environ.get("LOOP_WATCHDOG_MS", 0))
+HEARTBEAT_SECONDS = 0.05
+RECENT_STALLS = 100
+# Innermost frames kept from a blocked stack
+STACK_FRAMES = 30
+
+LOOP_LAG = registry.histogram("event_loop_lag_seconds", "Delay of the event loop heartbeat past its schedule",
+                              buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+LOOP_STALLS = registry.counter("event_loop_stalls_total", "Callbacks blocking the event loop longer than LOOP_WATCHDOG_MS", ("route",))
+LOOP_BLOCKED = registry.counter("event_loop_blocked_seconds_total", "Time the event loop was blocked by stalls", ("route",))
+
+
+@dataclass
+class LoopStall:
+    duration_ms: float
+    route: str
+    request: str
+    stack: List[str] = field(default_factory=list)
+
+    def describe(self) -> str:
+        stack = "".join(self.stack) if self.stack else "  (blocked call finished before its stack could be captured)\n"
+        return f"Event loop blocked for {self.duration_ms:.0f} ms during {self.request}:\n{stack}"
+
+
+class LoopWatchdog:
+    """
+    A heartbeat task sleeps HEARTBEAT_SECONDS at a time on the event loop
+    and records how late it wakes up (the loop lag). A watcher thread checks
+    the heartbeat; once it is overdue by more than the threshold, the loop
+    thread is stuck in a callback, so the watcher grabs that thread's stack
+    and the request whose task is running. When the heartbeat resumes the
+    stall is logged with its duration and counted for the route.
+    """
+
+    def __init__(self, threshold_ms: float = LOOP_WATCHDOG_MS or 100, heartbeat_seconds: float = HEARTBEAT_SECONDS):
+        self.threshold = threshold_ms / 1000
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stalls: deque = deque(maxlen=RECENT_STALLS)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._last_beat = 0.0
+        # (heartbeat it was taken after, stack, request stats) of the stall in progress
+        self._capture = None
+
+    async def start(self):
+        if self._task:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watcher = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watcher.start()
+        print(f"✅ Event loop watchdog started ({self.threshold * 1000:.0f} ms threshold)")
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task:
+            # A stall that just ended may not have been seen by the heartbeat yet
+            lag = time.perf_counter() - self._last_beat - self.heartbeat_seconds
+            if lag >= self.threshold:
+                self._record_stall(self._last_beat, lag)
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def reset(self):
+        self.stalls.clear()
+
+    # LOOP SIDE
+    async def _heartbeat(self):
+        while True:
+            previous = self._last_beat
+            await asyncio.sleep(self.heartbeat_seconds)
+            now = time.perf_counter()
+            lag = max(0.0, now - previous - self.heartbeat_seconds)
+            self._last_beat = now
+            LOOP_LAG.observe(value=lag)
+            if lag >= self.threshold:
+                self._record_stall(previous, lag)
+
+    def _record_stall(self, beat: float, lag: float):
+        capture, self._capture = self._capture, None
+        stack, stats = [], None
+        if capture and capture[0] == beat:
+            _, stack, stats = capture
+
+        route = route_for(stats.scope) if stats else "background"
+        request = f"{stats.method} {stats.path}" if stats else "background work"
+        stall = LoopStall(duration_ms=lag * 1000, route=route, request=request, stack=stack)
+        self.stalls.append(stall)
+        LOOP_STALLS.inc(route)
+        LOOP_BLOCKED.inc(route, amount=lag)
+        logger.warning(f"🐌 {stall.describe()}")
+
+    # WATCHER THREAD
+    def _watch(self):
+        interval = max(0.005, self.threshold / 4)
+        while not self._stopped.wait(interval):
+            beat = self._last_beat
+            overdue = time.perf_counter() - beat - self.heartbeat_seconds
+            if overdue < self.threshold or (self._capture and self._capture[0] == beat):
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = traceback.format_stack(frame, limit=STACK_FRAMES) if frame else []
+            task = asyncio.tasks._current_tasks.get(self._loop)
+            self._capture = (beat, stack, request_for_task(task))
+
+
+loop_watchdog = LoopWatchdog()
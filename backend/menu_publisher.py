@@ -0,0 +1,166 @@
+"""
+Menu Publisher for KUMIA Elite Dashboard
+Debounced, diff-based publication of the menu to the UserWebApp
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+# Edits landing within this window are published together
+MENU_PUBLISH_DEBOUNCE_SECONDS = float(os.environ.get("MENU_PUBLISH_DEBOUNCE_SECONDS", 2.0))
+# A steady stream of edits still publishes at least this often
+MENU_PUBLISH_MAX_DELAY_SECONDS = float(os.environ.get("MENU_PUBLISH_MAX_DELAY_SECONDS", 10.0))
+
+PUBLICATION_ID = "public_menu"
+
+
+def item_hash(item: Dict[str, Any]) -> str:
+    canonical = json.dumps(item, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def menu_hash(manifest: List[Dict[str, str]]) -> str:
+    return hashlib.sha256("".join(f"{entry['id']}:{entry['hash']};" for entry in manifest).encode()).hexdigest()[:16]
+
+
+class MenuPublisher:
+    """
+    The menu is published as one Firestore doc per item under public/menu/items
+    plus a manifest on public/menu listing every item id with its content hash.
+
+    The manifest Firestore last confirmed is kept in Mongo (menu_publications)
+    and recorded only once the outbox relay delivers its delta. Each publish
+    diffs the current items against it and only writes the items whose hash
+    changed, deletes the ones that went away, and then swaps in the new
+    manifest. A delta that is still pending or was parked as failed may have
+    been partly applied, so the item ids it could have written are kept with
+    the queued version and deleted too when they go away. The delta is handed
+    to the sync outbox in the same transaction that records it as queued.
+    Publishes are serialized, so concurrent edits always end with the latest
+    state published.
+    """
+
+    def __init__(self, db, firebase, outbox, debounce_seconds: float = MENU_PUBLISH_DEBOUNCE_SECONDS, max_delay_seconds: float = MENU_PUBLISH_MAX_DELAY_SECONDS):
+        self.db = db
+        self.firebase = firebase
+        self.outbox = outbox
+        self.publications = db.menu_publications
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._first_requested: Optional[float] = None
+        self._waiting = False
+        self._lock = asyncio.Lock()
+        outbox.on_delivered("menu.delta", self._record_delivered)
+
+    # SCHEDULING
+    def schedule(self):
+        """Request a publish after the debounce window (trailing edge)"""
+        if not (self.firebase and self.firebase.db):
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self._first_requested is None:
+            self._first_requested = now
+        delay = min(self.debounce_seconds, max(0.0, self._first_requested + self.max_delay_seconds - now))
+
+        # Restart the window; a publish already in flight is left to finish
+        if self._waiting and self._task and not self._task.done():
+            self._task.cancel()
+        self._waiting = True
+        self._task = asyncio.create_task(self._publish_later(delay))
+
+    async def _publish_later(self, delay: float):
+        await asyncio.sleep(delay)
+        self._waiting = False
+        self._first_requested = None
+        try:
+            await self.publish()
+        except Exception as e:
+            print(f"❌ Error publishing menu: {e}")
+
+    async def flush(self):
+        """Publish pending edits now (shutdown)"""
+        if self._waiting and self._task and not self._task.done():
+            self._task.cancel()
+            self._waiting = False
+            self._first_requested = None
+            await self.publish()
+
+    # PUBLICATION
+    async def publish(self, items: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Publish the current menu (or the given items) as a delta"""
+        async with self._lock:
+            if items is None:
+                items = await self.db.menu_items.find({}, {"_id": 0}).to_list(None)
+
+            current = {str(item["id"]): item for item in items if item.get("id")}
+            manifest = [{"id": item_id, "hash": item_hash(item)} for item_id, item in current.items()]
+            new_hash = menu_hash(manifest)
+
+            delivered = await self.publications.find_one({"_id": PUBLICATION_ID}) or {}
+            queued = delivered.get("queued") or {}
+            pending = bool(queued) and await self.outbox.is_pending(queued["idempotency_key"])
+            latest = queued if pending else delivered
+            if latest.get("hash") == new_hash:
+                return {"published": False, "version": latest.get("version", 0), "hash": new_hash}
+
+            delivered_hashes = {entry["id"]: entry["hash"] for entry in delivered.get("manifest", [])}
+            upserts = {entry["id"]: current[entry["id"]] for entry in manifest if delivered_hashes.get(entry["id"]) != entry["hash"]}
+            removals = [item_id for item_id in {*delivered_hashes, *queued.get("item_ids", [])} if item_id not in current]
+            version = max(delivered.get("version", 0), queued.get("version", 0)) + 1
+            idempotency_key = f"menu.delta:{version}:{new_hash}"
+
+            async def record_queued(session):
+                await self.publications.update_one(
+                    {"_id": PUBLICATION_ID},
+                    {"$set": {"queued": {
+                        "version": version,
+                        "hash": new_hash,
+                        "idempotency_key": idempotency_key,
+                        # Removals stay listed until a delivery confirms them
+                        "item_ids": [*current, *removals],
+                        "queued_at": datetime.utcnow(),
+                    }}},
+                    upsert=True,
+                    session=session,
+                )
+
+            await self.outbox.write_with_event(
+                record_queued,
+                "menu.delta",
+                {
+                    "upserts": list(upserts.values()),
+                    "removals": removals,
+                    "manifest": {"version": version, "hash": new_hash, "manifest": manifest},
+                },
+                idempotency_key=idempotency_key,
+            )
+            print(f"✅ Menu v{version} queued: {len(upserts)} changed, {len(removals)} removed, {len(manifest)} total")
+            return {"published": True, "version": version, "hash": new_hash, "changed": len(upserts), "removed": len(removals)}
+
+    async def _record_delivered(self, payload: Dict[str, Any]):
+        """The relay confirmed a delta: its manifest is what Firestore has, unless a newer one already landed"""
+        manifest = payload["manifest"]
+        await self.publications.update_one(
+            {"_id": PUBLICATION_ID, "$or": [{"version": {"$exists": False}}, {"version": {"$lt": manifest["version"]}}]},
+            {"$set": {**manifest, "published_at": datetime.utcnow()}},
+        )
+        await self.publications.update_one(
+            {"_id": PUBLICATION_ID, "queued.version": manifest["version"]},
+            {"$unset": {"queued": ""}},
+        )
+
+    async def get_status(self) -> Dict[str, Any]:
+        publication = await self.publications.find_one({"_id": PUBLICATION_ID}, {"manifest": 0}) or {}
+        return {
+            "version": publication.get("version", 0),
+            "hash": publication.get("hash"),
+            "published_at": publication.get("published_at"),
+            "queued_version": (publication.get("queued") or {}).get("version"),
+            "pending": self._waiting,
+        }
@@ -0,0 +1,218 @@
+"""
+Models for KUMIA Elite Dashboard
+Request and document models shared by the API routers
+"""
+
+from pydantic import BaseModel, Field, field_serializer, field_validator
+from typing import List, Optional, Dict, Any
+from datetime import datetime
+import uuid
+
+class User(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    email: str
+    google_id: Optional[str] = None
+    picture: Optional[str] = None
+    role: str = "admin"  # admin, colaborador, superadmin
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    last_login: Optional[datetime] = None
+
+class GoogleAuthRequest(BaseModel):
+    code: str
+    redirect_uri: str
+
+class LoginRequest(BaseModel):
+    email: str
+    password: str
+
+class AIConversationRequest(BaseModel):
+    message: str
+    session_id: str
+    channel: str = "general"  # whatsapp, instagram, facebook, tiktok, general
+
+class AIConversationResponse(BaseModel):
+    response: str
+    session_id: str
+    channel: str
+
+class MenuItem(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    description: str
+    price: float
+    category: str
+    image_base64: Optional[str] = None
+    is_active: bool = True
+    popularity_score: float = 0.0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    version: int = 0  # incremented by every update, for If-Match
+
+def normalize_email(value: str) -> str:
+    """Customers are matched on email however it was typed"""
+    return value.strip().lower()
+
+class Customer(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    email: str
+    phone: Optional[str] = None
+    first_visit: datetime = Field(default_factory=datetime.utcnow)
+    last_visit: Optional[datetime] = None
+    birthday: Optional[datetime] = None
+    anniversary_date: Optional[datetime] = None
+    nft_level: str = "bronce"  # bronce, plata, oro, citizen_kumia
+    points: int = 0
+    referrals: int = 0
+    next_reward: Optional[str] = None
+    preferred_dish: Optional[str] = None
+    total_orders: int = 0
+    total_spent: float = 0.0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    version: int = 0
+
+    @field_validator("email")
+    @classmethod
+    def check_email(cls, value: str) -> str:
+        return normalize_email(value)
+
+def reservation_day(value: datetime) -> str:
+    """Reservations are stored by day (YYYY-MM-DD), like the ones booked from the UserWebApp"""
+    return value.strftime("%Y-%m-%d")
+
+class Reservation(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    customer_id: str
+    customer_name: str
+    date: datetime
+    time: str
+    guests: int
+    phone: str
+    email: str
+    status: str = "confirmed"  # confirmed, cancelled, completed
+    special_requests: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    version: int = 0
+
+    @field_serializer("date")
+    def store_day(self, value: datetime) -> str:
+        return reservation_day(value)
+
+class Feedback(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    customer_id: str
+    customer_name: str
+    rating: int
+    comment: str
+    media_base64: Optional[str] = None
+    media_type: Optional[str] = None  # image, video
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    is_approved: bool = True
+
+class AIAgent(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    channel: str  # whatsapp, instagram, facebook, tiktok
+    name: str
+    prompt: str
+    is_active: bool = True
+    api_key: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class NFTReward(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    description: str
+    image_base64: str
+    level: str  # bronce, plata, oro, citizen_kumia
+    points_required: int
+    attributes: Dict[str, Any] = {}
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class Integration(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    type: str  # google_oauth, openai, meta, tiktok, stripe
+    api_key: Optional[str] = None
+    api_secret: Optional[str] = None
+    is_active: bool = False
+    config: Dict[str, Any] = {}
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    version: int = 0
+
+class RestaurantSettings(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str = "IL MANDORLA SMOKEHOUSE"
+    address: str = ""
+    phone: str = ""
+    email: str = ""
+    opening_hours: Dict[str, str] = {}
+    voice_tone: str = "amigable y profesional"
+    category: str = "smokehouse"
+    special_events: List[str] = []
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class DashboardMetrics(BaseModel):
+    total_orders: int = 0
+    total_reservations: int = 0
+    total_customers: int = 0
+    total_points_delivered: int = 0
+    total_revenue: float = 0.0
+    avg_rating: float = 0.0
+    nfts_delivered: int = 0
+    active_ai_agents: int = 0
+
+# New models for enhanced reservation system
+class Table(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    number: int
+    capacity: int  # 2, 4, 6 persons
+    status: str = "available"  # available, occupied, reserved, maintenance
+    location: str = "main_floor"  # main_floor, terrace, private
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class NewReservationRequest(BaseModel):
+    customer_name: str
+    customer_email: str
+    whatsapp_phone: str
+    reservation_date: str  # YYYY-MM-DD format
+    reservation_time: str  # HH:MM format
+    guests: int = Field(ge=1, le=12)
+    table_id: Optional[str] = None
+    special_notes: Optional[str] = None
+    allergies: Optional[str] = None
+
+    @field_validator("reservation_date")
+    @classmethod
+    def check_date(cls, value: str) -> str:
+        datetime.strptime(value, "%Y-%m-%d")
+        return value
+
+    @field_validator("reservation_time")
+    @classmethod
+    def check_time(cls, value: str) -> str:
+        datetime.strptime(value, "%H:%M")
+        return value
+
+class TableAvailabilityRequest(BaseModel):
+    date: str  # YYYY-MM-DD
+    time: str  # HH:MM
+
+class CustomerActivityTrack(BaseModel):
+    user_id: str
+    activity_type: str  # login, menu_view, order, game_play, feedback, reservation, etc.
+    activity_data: Dict[str, Any] = {}
+    source: str = "userwebapp"
+
+class SyncMenuRequest(BaseModel):
+    menu_data: Dict[str, Any] = {}  # {"items": [...]} to publish instead of the stored menu
+    
+class SyncPromotionRequest(BaseModel):
+    promotion_data: Dict[str, Any]
+
+class BatchPatchRequest(BaseModel):
+    filter: Dict[str, Any]  # field: value, or a list of values to match any; {} matches every document
+    set: Dict[str, Any] = {}
+    inc: Dict[str, float] = {}
+    mul: Dict[str, float] = {}  # e.g. {"price": 1.05} for +5%
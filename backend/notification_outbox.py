@@ -0,0 +1,338 @@
+"""
+Notification Outbox for KUMIA Elite Dashboard
+Out-of-band delivery of reservation confirmations with retries and rate limits
+"""
+
+import asyncio
+import inspect
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError
+
+RESERVATION_CHANNELS = ("email", "whatsapp", "ai_conversation")
+
+# Messages per second each provider accepts from us
+DEFAULT_RATE_LIMITS = {"email": 10.0, "whatsapp": 5.0, "ai_conversation": 5.0}
+
+DEFAULT_WORKERS = 4
+MAX_ATTEMPTS = 5
+BASE_BACKOFF_SECONDS = 2
+SEND_LEASE = timedelta(minutes=2)
+IDLE_POLL_SECONDS = 1.0
+
+# Reservations booked this recently are checked for confirmations that were never queued
+RECONCILE_WINDOW = timedelta(days=1)
+RECONCILE_INTERVAL_SECONDS = 60
+
+
+class RateLimiter:
+    """Token bucket shared by the workers of one channel"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available now, without waiting"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def refund(self):
+        """Give back a token that was not used"""
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def wait_seconds(self) -> float:
+        """Time until the next token is available"""
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class StubTransport:
+    """Local transport that records and logs messages instead of sending them"""
+
+    def __init__(self, channel: str, fail_times: int = 0):
+        self.channel = channel
+        self.sent: List[Dict[str, Any]] = []
+        self.fail_times = fail_times
+
+    async def send(self, message: Dict[str, Any]):
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise ConnectionError(f"Stub {self.channel} transport failure")
+        self.sent.append(message)
+        print(f"📨 [{self.channel}] {message['dedupe_key']} → {message['payload'].get('customer_name')}")
+
+
+class SyncServiceTransport:
+    """Delivers through the KumiaSyncService confirmation senders"""
+
+    def __init__(self, sync_service, channel: str):
+        self.sync_service = sync_service
+        self.channel = channel
+
+    def send(self, message: Dict[str, Any]):
+        self.sync_service.send_confirmation(self.channel, message["payload"], message["reference_id"])
+
+
+def stub_transports() -> Dict[str, StubTransport]:
+    return {channel: StubTransport(channel) for channel in RESERVATION_CHANNELS}
+
+
+class NotificationOutbox:
+    """
+    Intents are written to notification_outbox with a deterministic _id
+    (kind:reference:channel), so enqueueing the same confirmation twice is a
+    no-op. A pool of workers leases due intents, sends them through the
+    channel transport and reschedules failures with exponential backoff.
+    A worker takes the channel's rate-limit token before it leases, and only
+    leases intents of channels that have one, so a throttled channel never
+    holds workers (and their leases) while the other channels wait.
+
+    Confirmations are normally queued in the booking's own transaction; when
+    that is not possible and queueing fails after the booking committed, the
+    reconciler queues them for recent reservations that have none.
+    """
+
+    def __init__(self, db, transports: Dict[str, Any], workers: int = DEFAULT_WORKERS, rate_limits: Optional[Dict[str, float]] = None, max_attempts: int = MAX_ATTEMPTS):
+        self.outbox = db.notification_outbox
+        self.reservations = db.reservations
+        self.transports = transports
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.limiters = {
+            channel: RateLimiter(rate)
+            for channel, rate in {**DEFAULT_RATE_LIMITS, **(rate_limits or {})}.items()
+        }
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._running = False
+        # Rotates the channel the next lease starts from
+        self._next_channel = 0
+
+    async def ensure_indexes(self):
+        await self.outbox.create_index([("status", ASCENDING), ("next_attempt_at", ASCENDING)])
+        await self.outbox.create_index([("channel", ASCENDING), ("status", ASCENDING), ("next_attempt_at", ASCENDING)])
+        await self.outbox.create_index([("reference_id", ASCENDING)])
+        await self.reservations.create_index([("created_at", ASCENDING)])
+
+    # ENQUEUE
+    async def enqueue(self, kind: str, reference_id: str, payload: Dict[str, Any], channels: Iterable[str], session=None) -> int:
+        """
+        Record one intent per channel; returns how many were new. Inside a
+        transaction (`session`) the caller wakes the workers after commit.
+        """
+        now = datetime.utcnow()
+        intents = [
+            {
+                "_id": f"{kind}:{reference_id}:{channel}",
+                "kind": kind,
+                "reference_id": reference_id,
+                "channel": channel,
+                "payload": payload,
+                "status": "pending",
+                "attempts": 0,
+                "next_attempt_at": now,
+                "created_at": now,
+            }
+            for channel in channels
+        ]
+        if not intents:
+            return 0
+
+        try:
+            result = await self.outbox.insert_many(intents, ordered=False, session=session)
+            inserted = len(result.inserted_ids)
+        except BulkWriteError as e:
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+            inserted = e.details.get("nInserted", 0)
+
+        if session is None:
+            self.wake()
+        return inserted
+
+    async def enqueue_reservation_confirmations(self, reservation_data: Dict[str, Any], session=None) -> int:
+        return await self.enqueue("reservation_confirmation", reservation_data["id"], reservation_data, RESERVATION_CHANNELS, session=session)
+
+    def wake(self):
+        self._wakeup.set()
+
+    async def reconcile_reservations(self) -> int:
+        """Queue confirmations for recently booked reservations that have none; returns how many"""
+        since = (datetime.utcnow() - RECONCILE_WINDOW).isoformat()
+        # Only bookings made through /reservations/new carry created_by
+        recent = await self.reservations.find(
+            {"created_at": {"$gte": since}, "created_by": {"$exists": True}, "status": "confirmed"},
+            {"_id": 0},
+        ).to_list(None)
+        if not recent:
+            return 0
+        queued = set(await self.outbox.distinct(
+            "reference_id",
+            {"kind": "reservation_confirmation", "reference_id": {"$in": [reservation["id"] for reservation in recent]}},
+        ))
+        missing = [reservation for reservation in recent if reservation["id"] not in queued]
+        for reservation in missing:
+            await self.enqueue_reservation_confirmations(reservation)
+            print(f"⚠️ Queued missing confirmations for reservation {reservation['id']}")
+        return len(missing)
+
+    # WORKERS
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._reconciler()))
+        print(f"✅ Notification outbox started with {self.workers} workers")
+
+    async def stop(self):
+        self._running = False
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, worker_id: int):
+        while self._running:
+            try:
+                message, idle_seconds = await self._lease_next()
+                if message is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), idle_seconds)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._deliver(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Notification worker {worker_id} error: {e}")
+                await asyncio.sleep(IDLE_POLL_SECONDS)
+
+    async def _reconciler(self):
+        while self._running:
+            try:
+                await self.reconcile_reservations()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Notification reconciler error: {e}")
+            await asyncio.sleep(RECONCILE_INTERVAL_SECONDS)
+
+    def _due(self, now: datetime) -> Dict[str, Any]:
+        return {
+            "$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                # Leases abandoned by a crashed worker
+                {"status": "sending", "lease_expires_at": {"$lte": now}},
+            ]
+        }
+
+    async def _lease_next(self) -> Tuple[Optional[Dict[str, Any]], float]:
+        """The next due intent of a channel with a rate-limit token (taken), or None and how long to idle"""
+        channels = sorted(await self.outbox.distinct("channel", self._due(datetime.utcnow())))
+        if not channels:
+            return None, IDLE_POLL_SECONDS
+        # Every channel with due intents gets its turn
+        start = self._next_channel % len(channels)
+        self._next_channel += 1
+        throttled = []
+        for channel in channels[start:] + channels[:start]:
+            limiter = self.limiters.get(channel)
+            if limiter and not limiter.try_acquire():
+                throttled.append(limiter)
+                continue
+            message = await self._lease(channel)
+            if message:
+                return message, 0.0
+            if limiter:
+                limiter.refund()
+        # Due intents are waiting for their channel's next token
+        return None, min([IDLE_POLL_SECONDS] + [limiter.wait_seconds() for limiter in throttled])
+
+    async def _lease(self, channel: str) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        return await self.outbox.find_one_and_update(
+            {"channel": channel, **self._due(now)},
+            {"$set": {"status": "sending", "lease_expires_at": now + SEND_LEASE}},
+            sort=[("next_attempt_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _deliver(self, message: Dict[str, Any]):
+        channel = message["channel"]
+        transport = self.transports.get(channel)
+        if transport is None:
+            await self._mark_failed(message, f"No transport for channel {channel}", final=True)
+            return
+
+        outgoing = {
+            "dedupe_key": message["_id"],
+            "kind": message["kind"],
+            "reference_id": message["reference_id"],
+            "payload": message["payload"],
+        }
+        try:
+            if inspect.iscoroutinefunction(transport.send):
+                await transport.send(outgoing)
+            else:
+                # Blocking SDK calls stay off the event loop
+                await asyncio.to_thread(transport.send, outgoing)
+        except Exception as e:
+            await self._mark_failed(message, str(e), final=message["attempts"] + 1 >= self.max_attempts)
+            return
+
+        await self.outbox.update_one(
+            {"_id": message["_id"]},
+            {
+                "$set": {"status": "sent", "sent_at": datetime.utcnow()},
+                "$inc": {"attempts": 1},
+                "$unset": {"lease_expires_at": ""},
+            },
+        )
+
+    async def _mark_failed(self, message: Dict[str, Any], error: str, final: bool):
+        attempts = message["attempts"] + 1
+        backoff = timedelta(seconds=BASE_BACKOFF_SECONDS * 2 ** (attempts - 1))
+        await self.outbox.update_one(
+            {"_id": message["_id"]},
+            {
+                "$set": {
+                    "status": "failed" if final else "pending",
+                    "last_error": error,
+                    "next_attempt_at": datetime.utcnow() + backoff,
+                },
+                "$inc": {"attempts": 1},
+                "$unset": {"lease_expires_at": ""},
+            },
+        )
+        print(f"⚠️ Notification {message['_id']} attempt {attempts} failed: {error}")
+
+    # INSPECTION
+    async def get_status(self, reference_id: str) -> List[Dict[str, Any]]:
+        return await self.outbox.find(
+            {"reference_id": reference_id},
+            {"payload": 0},
+        ).to_list(len(RESERVATION_CHANNELS) * 4)
+
+    async def get_stats(self) -> Dict[str, int]:
+        stats = {"pending": 0, "sending": 0, "sent": 0, "failed": 0}
+        async for row in self.outbox.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            stats[row["_id"]] = row["count"]
+        return stats
@@ -0,0 +1,259 @@
+"""
+Document Patching for KUMIA Elite Dashboard
+JSON Merge Patch and batch updates that write only changed fields, with optimistic concurrency
+"""
+
+import copy
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from pydantic import TypeAdapter, ValidationError
+
+from models import Customer, Integration, MenuItem, Reservation, normalize_email, reservation_day
+
+# Times a patch without If-Match is re-applied when another write wins the race
+PATCH_RETRIES = 5
+
+# Money fields changed by inc or mul are rounded in the same update (85000 * 1.05 is 89250.00000000001)
+MONEY_DECIMALS = 2
+
+
+class PatchError(ValueError):
+    """The patch cannot be applied (unknown or read-only field, invalid value)"""
+
+
+class VersionConflict(Exception):
+    """The document changed since the version the client read"""
+
+    def __init__(self, current_version: Optional[int]):
+        super().__init__(f"Document is at version {current_version}" if current_version is not None
+                         else "Document keeps changing")
+        self.current_version = current_version
+
+
+@dataclass(frozen=True)
+class PatchSpec:
+    collection: str
+    model: type
+    # Never changed by a patch
+    read_only: Tuple[str, ...] = ("id", "created_at", "version")
+    # Field validators of the model, applied to batch filter and set values too
+    normalizers: Tuple[Tuple[str, Callable[[Any], Any]], ...] = ()
+    # Amounts rounded to MONEY_DECIMALS after inc and mul
+    money: Tuple[str, ...] = ()
+
+
+PATCHES = {
+    "menu": PatchSpec(collection="menu_items", model=MenuItem, money=("price",)),
+    "customers": PatchSpec(collection="customers", model=Customer, normalizers=(("email", normalize_email),), money=("total_spent",)),
+    "reservations": PatchSpec(collection="reservations", model=Reservation, normalizers=(("date", reservation_day),)),
+    "integrations": PatchSpec(collection="integrations", model=Integration),
+}
+
+
+def merge_patch(target: Any, patch: Any) -> Any:
+    """RFC 7396: objects are merged recursively, null removes a member, anything else replaces"""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = dict(target) if isinstance(target, dict) else {}
+    for name, value in patch.items():
+        if value is None:
+            result.pop(name, None)
+        else:
+            result[name] = merge_patch(result.get(name), value)
+    return result
+
+
+def changes(before: Dict[str, Any], after: Dict[str, Any], prefix: str = "") -> Tuple[Dict[str, Any], List[str]]:
+    """$set and $unset paths turning `before` into `after`; nested objects are diffed member by member"""
+    set_fields: Dict[str, Any] = {}
+    unset_fields: List[str] = []
+    for name, value in after.items():
+        path = f"{prefix}{name}"
+        old = before.get(name)
+        if isinstance(value, dict) and isinstance(old, dict) and value and old:
+            nested_set, nested_unset = changes(old, value, f"{path}.")
+            set_fields.update(nested_set)
+            unset_fields.extend(nested_unset)
+        elif name not in before or old != value or type(old) is not type(value):
+            set_fields[path] = value
+    unset_fields.extend(f"{prefix}{name}" for name in before if name not in after)
+    return set_fields, unset_fields
+
+
+def check_member_names(patch: Dict[str, Any], prefix: str = "") -> None:
+    """Nested member names are written as $set paths, so they cannot hold '.' or start with '$'"""
+    for name, value in patch.items():
+        if "." in name or name.startswith("$"):
+            raise PatchError(f"Invalid member name '{prefix}{name}'; names cannot contain '.' or start with '$'")
+        if isinstance(value, dict):
+            check_member_names(value, f"{prefix}{name}.")
+
+
+def parse_if_match(header: Optional[str]) -> Optional[int]:
+    """Version from an If-Match header such as "3" or W/"3"; None when absent or *"""
+    if not header or header.strip() == "*":
+        return None
+    value = header.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise PatchError(f"Invalid If-Match header: {header!r}")
+
+
+def etag(document: Dict[str, Any]) -> str:
+    return f'"{document.get("version", 0)}"'
+
+
+def _validation_details(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, item['loc'])) or 'value'}: {item['msg']}" for item in error.errors())
+
+
+class DocumentPatcher:
+    """
+    A patch is merged into the stored document and the result validated
+    against the model, but only the paths that actually changed are written,
+    so changing a price never rewrites image_base64.
+
+    Every write increments the document's `version`. The update is
+    conditional on the version that was read, so two admins patching the
+    same document cannot silently overwrite each other: with If-Match the
+    loser gets a VersionConflict, without it the patch is re-applied to
+    the newer document (merge patches only name the fields they change).
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def _check_fields(self, spec: PatchSpec, names) -> None:
+        unknown = sorted(set(names) - set(spec.model.model_fields))
+        if unknown:
+            raise PatchError(f"Unknown fields: {', '.join(unknown)}")
+
+    def preview(self, spec: PatchSpec, current: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+        """The document the patch would produce from `current`, without writing it"""
+        return self._apply(spec, current, patch)
+
+    def _apply(self, spec: PatchSpec, current: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+        self._check_fields(spec, patch)
+        check_member_names(patch)
+        for name in spec.read_only:
+            if name in patch and patch[name] != current.get(name, 0 if name == "version" else None):
+                raise PatchError(f"'{name}' cannot be changed")
+
+        merged = merge_patch(current, patch)
+        try:
+            validated = spec.model.model_validate(merged).model_dump()
+        except ValidationError as e:
+            raise PatchError(_validation_details(e))
+
+        # Only the patched fields take the validated (coerced) value; everything
+        # else, including stored fields the model does not know, stays as it was
+        document = dict(current)
+        for name in patch:
+            document[name] = validated[name]
+        return document
+
+    async def patch(self, spec: PatchSpec, document_id: str, patch: Dict[str, Any],
+                    expected_version: Optional[int] = None) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """(before, after) of the patched document, or None if there is no such document"""
+        collection = self.db[spec.collection]
+        for _ in range(PATCH_RETRIES):
+            current = await collection.find_one({"id": document_id}, {"_id": 0})
+            if current is None:
+                return None
+            version = current.get("version", 0)
+            if expected_version is not None and version != expected_version:
+                raise VersionConflict(version)
+
+            document = self._apply(spec, current, patch)
+            set_fields, unset_fields = changes(current, document)
+            if not set_fields and not unset_fields:
+                return current, current
+            if "updated_at" in spec.model.model_fields and "updated_at" not in patch:
+                document["updated_at"] = set_fields["updated_at"] = datetime.utcnow()
+            document["version"] = version + 1
+
+            update: Dict[str, Any] = {"$set": set_fields, "$inc": {"version": 1}}
+            if unset_fields:
+                update["$unset"] = {path: "" for path in unset_fields}
+            # Documents written before versioning have no version field
+            guard = {"version": version} if "version" in current else {"version": {"$exists": False}}
+            result = await collection.update_one({"id": document_id, **guard}, update)
+            if result.matched_count:
+                # Nothing else wrote in between, so the stored document is exactly the merged one
+                return current, document
+            # Another write won the race; re-read and check or re-apply
+        raise VersionConflict(None)
+
+    # BATCH
+    def _field_value(self, spec: PatchSpec, name: str, value: Any) -> Any:
+        try:
+            value = TypeAdapter(spec.model.model_fields[name].annotation).validate_python(value)
+        except ValidationError as e:
+            raise PatchError(f"{name}: {_validation_details(e)}")
+        normalize = dict(spec.normalizers).get(name)
+        return normalize(value) if normalize and value is not None else value
+
+    def _numeric(self, spec: PatchSpec, name: str) -> type:
+        kind = spec.model.model_fields[name].annotation
+        if kind not in (int, float) or name in spec.read_only:
+            raise PatchError(f"'{name}' is not a numeric field")
+        return kind
+
+    def batch_update(self, spec: PatchSpec, filters: Dict[str, Any], set_fields: Dict[str, Any],
+                     inc: Dict[str, float], mul: Dict[str, float]) -> Tuple[Dict[str, Any], Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        """Validated (query, update) for one update_many, e.g. mul={"price": 1.05} where category is Carnes"""
+        self._check_fields(spec, list(filters) + list(set_fields) + list(inc) + list(mul))
+        named = list(set_fields) + list(inc) + list(mul)
+        if not named:
+            raise PatchError("Nothing to update; give set, inc or mul")
+        if len(named) != len(set(named)):
+            raise PatchError("A field can only be changed by one of set, inc and mul")
+
+        query: Dict[str, Any] = {}
+        for name, value in filters.items():
+            if isinstance(value, list):
+                query[name] = {"$in": [self._field_value(spec, name, item) for item in value]}
+            else:
+                query[name] = self._field_value(spec, name, value)
+
+        update: Dict[str, Any] = {"$inc": {"version": 1}}
+        if set_fields:
+            for name in set_fields:
+                if name in spec.read_only:
+                    raise PatchError(f"'{name}' cannot be changed")
+            update["$set"] = {name: self._field_value(spec, name, value) for name, value in set_fields.items()}
+        for name, amount in inc.items():
+            if self._numeric(spec, name) is int and amount != int(amount):
+                raise PatchError(f"'{name}' is an integer field; inc must be a whole number")
+            update["$inc"][name] = int(amount) if self._numeric(spec, name) is int else amount
+        for name, factor in mul.items():
+            if self._numeric(spec, name) is int:
+                raise PatchError(f"'{name}' is an integer field; use inc")
+            update.setdefault("$mul", {})[name] = factor
+        if "updated_at" in spec.model.model_fields and "updated_at" not in set_fields:
+            update.setdefault("$set", {})["updated_at"] = datetime.utcnow()
+        rounded = [name for name in list(inc) + list(mul) if name in spec.money]
+        return query, (self._rounding_pipeline(update, rounded) if rounded else update)
+
+    @staticmethod
+    def _rounding_pipeline(update: Dict[str, Any], rounded: List[str]) -> List[Dict[str, Any]]:
+        """The same update as an aggregation pipeline, so money fields are $round-ed as they are computed"""
+        stage: Dict[str, Any] = {name: {"$literal": value} for name, value in update.get("$set", {}).items()}
+        for name, amount in update["$inc"].items():
+            stage[name] = {"$add": [{"$ifNull": [f"${name}", 0]}, amount]}
+        for name, factor in update.get("$mul", {}).items():
+            stage[name] = {"$multiply": [{"$ifNull": [f"${name}", 0]}, factor]}
+        for name in rounded:
+            stage[name] = {"$round": [stage[name], MONEY_DECIMALS]}
+        return [{"$set": stage}]
+
+    async def batch_patch(self, spec: PatchSpec, filters: Dict[str, Any], set_fields: Dict[str, Any],
+                          inc: Dict[str, float], mul: Dict[str, float]) -> Dict[str, int]:
+        query, update = self.batch_update(spec, filters, set_fields, inc, mul)
+        result = await self.db[spec.collection].update_many(query, update)
+        return {"matched": result.matched_count, "modified": result.modified_count}
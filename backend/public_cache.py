@@ -0,0 +1,177 @@
+"""
+Public Response Cache for KUMIA Elite Dashboard
+Pre-rendered, pre-compressed responses for the unauthenticated UserWebApp endpoints
+"""
+
+import asyncio
+import gzip
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, Callable, Awaitable, Optional, Set
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from fast_json import dumps
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
+
+# Browsers and CDNs may reuse a response this long without revalidating
+PUBLIC_CACHE_MAX_AGE_SECONDS = int(os.environ.get("PUBLIC_CACHE_MAX_AGE_SECONDS", 60))
+# Upper bound on staleness for changes made by other workers (no local invalidation)
+PUBLIC_CACHE_TTL_SECONDS = float(os.environ.get("PUBLIC_CACHE_TTL_SECONDS", 30))
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 512
+# Levels for rendering on every publish; the maximum ones cost seconds on large bodies for a few % smaller output
+GZIP_LEVEL = 6
+BROTLI_QUALITY = int(os.environ.get("PUBLIC_CACHE_BROTLI_QUALITY", 5))
+
+
+@dataclass
+class RenderedResponse:
+    body: bytes
+    gzip: Optional[bytes]
+    br: Optional[bytes]
+    etag: str
+    rendered_at: float  # when rendering started
+
+
+def render(data: Any) -> RenderedResponse:
+    """JSON body and its compressed variants; CPU-bound, run off the event loop"""
+    body = dumps(data)
+    compress = len(body) >= MIN_COMPRESS_BYTES
+    return RenderedResponse(
+        body=body,
+        gzip=gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0) if compress else None,
+        br=brotli.compress(body, quality=BROTLI_QUALITY) if compress and brotli else None,
+        etag=hashlib.sha256(body).hexdigest()[:32],
+        rendered_at=time.monotonic(),
+    )
+
+
+class PublicResponseCache:
+    """
+    Each public endpoint registers a renderer that builds its payload. The
+    payload is rendered once to JSON bytes plus gzip/brotli variants and
+    served from memory with a strong ETag per encoding, so a visitor request
+    costs a dict lookup and never touches Mongo or Pydantic.
+
+    Write paths call invalidate() when the underlying data changes (Mongo
+    CRUD, or the Firestore mirror for content published to the UserWebApp);
+    the response is then re-rendered in the background while the previous
+    one keeps being served. Entries also expire after PUBLIC_CACHE_TTL_SECONDS
+    to pick up changes made through other workers.
+    """
+
+    def __init__(self, ttl_seconds: float = PUBLIC_CACHE_TTL_SECONDS, max_age_seconds: int = PUBLIC_CACHE_MAX_AGE_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.max_age_seconds = max_age_seconds
+        self._renderers: Dict[str, Callable[[], Awaitable[Any]]] = {}
+        self._entries: Dict[str, RenderedResponse] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._dirty: Set[str] = set()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._renders = 0
+
+    def register(self, key: str, renderer: Callable[[], Awaitable[Any]]):
+        self._renderers[key] = renderer
+        self._locks[key] = asyncio.Lock()
+
+    # PUBLICATION
+    async def publish(self, key: str) -> RenderedResponse:
+        """Render a response now; concurrent calls share one render"""
+        requested_at = time.monotonic()
+        async with self._locks[key]:
+            entry = self._entries.get(key)
+            if entry and entry.rendered_at >= requested_at:
+                return entry
+            started = time.monotonic()
+            entry = await asyncio.to_thread(render, await self._renderers[key]())
+            entry.rendered_at = started
+            self._entries[key] = entry
+            self._renders += 1
+            return entry
+
+    async def publish_all(self):
+        self._loop = asyncio.get_running_loop()
+        for key in self._renderers:
+            try:
+                await self.publish(key)
+            except Exception as e:
+                print(f"❌ Error rendering public response {key}: {e}")
+
+    def invalidate(self, key: str):
+        """Re-render after a data change; safe to call from listener threads"""
+        if key not in self._renderers or self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._refresh(key)
+        else:
+            self._loop.call_soon_threadsafe(self._refresh, key)
+
+    def _refresh(self, key: str):
+        task = self._refreshing.get(key)
+        if task and not task.done():
+            # The render in flight may predate the change, so run one more after it
+            self._dirty.add(key)
+            return
+        self._refreshing[key] = asyncio.create_task(self._refresh_loop(key))
+
+    async def _refresh_loop(self, key: str):
+        while True:
+            self._dirty.discard(key)
+            try:
+                await self.publish(key)
+            except Exception as e:
+                print(f"❌ Error rendering public response {key}: {e}")
+            if key not in self._dirty:
+                return
+
+    # SERVING
+    async def get(self, key: str) -> RenderedResponse:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        entry = self._entries.get(key)
+        if entry is None:
+            return await self.publish(key)
+        if time.monotonic() - entry.rendered_at > self.ttl_seconds:
+            self._refresh(key)
+        return entry
+
+    async def respond(self, key: str, request: Request) -> Response:
+        entry = await self.get(key)
+        accepted = request.headers.get("accept-encoding", "")
+
+        if entry.br and "br" in accepted:
+            body, encoding = entry.br, "br"
+        elif entry.gzip and "gzip" in accepted:
+            body, encoding = entry.gzip, "gzip"
+        else:
+            body, encoding = entry.body, None
+
+        etag = f'"{entry.etag}-{encoding}"' if encoding else f'"{entry.etag}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={self.max_age_seconds}, stale-while-revalidate={self.max_age_seconds * 5}",
+            "Vary": "Accept-Encoding",
+        }
+
+        # Weak comparison, proxies may have weakened the tag
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]):
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,162 @@
+"""
+Query Monitor for KUMIA Elite Dashboard
+MongoDB command monitoring: per-request round trips, slow-query log and N+1 detection
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Any, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from request_metrics import registry, record, current_request, add_request_listener, RequestStats
+
+logger = logging.getLogger("server")
+
+MONGO_SLOW_QUERY_MS = float(os.environ.get("MONGO_SLOW_QUERY_MS", 100))
+# A request making more round trips than this to one collection is flagged
+MONGO_N_PLUS_ONE_THRESHOLD = int(os.environ.get("MONGO_N_PLUS_ONE_THRESHOLD", 5))
+
+# Handshakes, auth and cursor housekeeping are not queries
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "buildInfo", "saslStart", "saslContinue", "endSessions", "killCursors"}
+# Driver-added fields that say nothing about the query
+NOISE_FIELDS = {"$db", "lsid", "$clusterTime", "txnNumber", "autocommit", "startTransaction", "$readPreference",
+                "readConcern", "writeConcern", "comment", "cursor", "batchSize", "ordered", "$queryOptions"}
+RECENT_SLOW_QUERIES = 100
+
+COMMANDS = registry.counter("mongo_commands_total", "MongoDB commands by collection", ("collection", "command"))
+COMMAND_TIME = registry.histogram("mongo_command_duration_seconds", "MongoDB command latency", ("command",))
+SLOW_QUERIES = registry.counter("mongo_slow_queries_total", "MongoDB commands slower than MONGO_SLOW_QUERY_MS", ("collection", "command"))
+N_PLUS_ONE = registry.counter("mongo_n_plus_one_total", "Requests with more round trips to one collection than MONGO_N_PLUS_ONE_THRESHOLD", ("route", "collection"))
+
+
+def _shape(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = []
+        for item in value:
+            shaped = _shape(item)
+            if shaped not in shapes:
+                shapes.append(shaped)
+        return shapes
+    return "?"
+
+
+def query_shape(command_name: str, command: Dict[str, Any]) -> str:
+    """The command with every value replaced by "?", e.g. find customers {"filter": {"email": "?"}}"""
+    shape = {}
+    for key, value in command.items():
+        if key == command_name or key in NOISE_FIELDS:
+            continue
+        if key == "documents":
+            shape[key] = f"<{len(value)} documents>"
+        else:
+            shape[key] = _shape(value)
+    return json.dumps(shape, default=str, separators=(",", ":"))
+
+
+def _collection(command_name: str, command: Dict[str, Any]) -> Optional[str]:
+    target = command.get(command_name)
+    if isinstance(target, str):
+        return target
+    return command.get("collection")  # getMore
+
+
+class QueryMonitor(monitoring.CommandListener):
+    """
+    Registered on the Motor client. Each command is charged to the request
+    that issued it (Motor runs commands with a copy of the caller's context),
+    commands slower than MONGO_SLOW_QUERY_MS are logged with their query
+    shape, and requests making more than MONGO_N_PLUS_ONE_THRESHOLD round
+    trips to a single collection are flagged as likely N+1 patterns.
+
+    Round trips are also aggregated per endpoint, which is what the query
+    budget tests check.
+    """
+
+    def __init__(self, slow_ms: float = MONGO_SLOW_QUERY_MS, n_plus_one_threshold: int = MONGO_N_PLUS_ONE_THRESHOLD):
+        self.slow_ms = slow_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self._pending: Dict[Tuple, Tuple[str, Optional[str], Dict[str, Any]]] = {}
+        self._endpoints: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._recent_slow: deque = deque(maxlen=RECENT_SLOW_QUERIES)
+        self._lock = threading.Lock()
+
+    # COMMAND LISTENER
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        self._pending[(event.connection_id, event.request_id)] = (
+            event.command_name, _collection(event.command_name, event.command), event.command
+        )
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+
+    def _finished(self, event):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending:
+            command_name, collection, command = pending
+            self.observe(command_name, collection, command, event.duration_micros / 1e6)
+
+    def observe(self, command_name: str, collection: Optional[str], command: Dict[str, Any], seconds: float):
+        record("mongo", seconds, collection)
+        COMMANDS.inc(collection or "", command_name)
+        COMMAND_TIME.observe(command_name, value=seconds)
+
+        if seconds * 1000 >= self.slow_ms:
+            stats = current_request()
+            request = f"{stats.method} {stats.path}" if stats else "background"
+            shape = query_shape(command_name, command)
+            SLOW_QUERIES.inc(collection or "", command_name)
+            self._recent_slow.append({"command": command_name, "collection": collection, "shape": shape,
+                                      "ms": round(seconds * 1000, 1), "request": request})
+            logger.warning(f"🐢 Slow MongoDB {command_name} on {collection} took {seconds * 1000:.0f} ms ({request}): {shape}")
+
+    # PER-REQUEST CHECKS
+    def on_request_end(self, method: str, route: str, status: int, stats: RequestStats):
+        queries = dict(stats.queries)
+        total = sum(queries.values())
+
+        with self._lock:
+            endpoint = self._endpoints.setdefault((method, route), {
+                "requests": 0, "queries": 0, "max_queries": 0, "max_per_collection": defaultdict(int),
+            })
+            endpoint["requests"] += 1
+            endpoint["queries"] += total
+            endpoint["max_queries"] = max(endpoint["max_queries"], total)
+            for collection, count in queries.items():
+                endpoint["max_per_collection"][collection] = max(endpoint["max_per_collection"][collection], count)
+
+        for collection, count in queries.items():
+            if count > self.n_plus_one_threshold:
+                N_PLUS_ONE.inc(route, collection)
+                logger.warning(f"🔁 Possible N+1: {method} {route} made {count} round trips to {collection} ({total} queries in total)")
+
+    # REPORTING
+    def report(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Round trips per endpoint since the last reset"""
+        with self._lock:
+            return {
+                endpoint: {**stats, "max_per_collection": dict(stats["max_per_collection"])}
+                for endpoint, stats in self._endpoints.items()
+            }
+
+    def recent_slow_queries(self) -> List[Dict[str, Any]]:
+        return list(self._recent_slow)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+        self._recent_slow.clear()
+
+
+query_monitor = QueryMonitor()
+add_request_listener(query_monitor.on_request_end)
@@ -0,0 +1,281 @@
+"""
+Request Metrics for KUMIA Elite Dashboard
+Per-route latency histograms, dependency time (Mongo, Firestore, LLM) and Prometheus exposition
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+DEPENDENCIES = ("mongo", "firestore", "llm")
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+# REGISTRY
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[Any, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.values: Dict[Tuple, float] = defaultdict(float)
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] += amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield f"{self.name}{_labels(self.labels, labels)} {value:g}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.values[labels] -= amount
+
+    def set(self, *labels, value: float):
+        self.values[labels] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # Per label set: [count per bucket (+Inf last), sum]
+        self.values: Dict[Tuple, list] = {}
+
+    def observe(self, *labels, value: float):
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def samples(self):
+        for labels, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                yield f"{self.name}_bucket{_labels(self.labels, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {total:g}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {cumulative}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, Any] = {}
+
+    def _register(self, metric):
+        # Modules are imported once per feature set, but keep re-registration idempotent
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUESTS = registry.counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+IN_FLIGHT = registry.gauge("http_requests_in_flight", "HTTP requests being served")
+LATENCY = registry.histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+RESPONSE_SIZE = registry.histogram("http_response_size_bytes", "HTTP response body size", ("method", "route"), SIZE_BUCKETS)
+DEPENDENCY_TIME = registry.histogram("http_request_dependency_seconds", "Time a request spent waiting on a dependency", ("route", "dependency"))
+DEPENDENCY_CALLS = registry.counter("http_request_dependency_calls_total", "Dependency calls made while serving requests", ("route", "dependency"))
+
+
+# PER-REQUEST DEPENDENCY TIME
+class RequestStats:
+    """Dependency calls made by one request; updated from executor threads too"""
+
+    def __init__(self, scope: Optional[Dict[str, Any]] = None):
+        self.scope = scope or {}
+        self.method = self.scope.get("method", "")
+        self.path = self.scope.get("path", "")
+        self.calls = dict.fromkeys(DEPENDENCIES, 0)
+        self.seconds = dict.fromkeys(DEPENDENCIES, 0.0)
+        # MongoDB round trips per collection
+        self.queries: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, dependency: str, seconds: float, collection: Optional[str] = None):
+        with self._lock:
+            self.calls[dependency] += 1
+            self.seconds[dependency] += seconds
+            if collection:
+                self.queries[collection] += 1
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+# Dependency being timed, so nested tracked calls are only counted once
+_tracking: ContextVar[Optional[str]] = ContextVar("tracking", default=None)
+
+
+def current_request() -> Optional[RequestStats]:
+    return _current_request.get()
+
+
+def record(dependency: str, seconds: float, collection: Optional[str] = None):
+    stats = _current_request.get()
+    if stats is not None:
+        stats.record(dependency, seconds, collection)
+
+
+# Requests being served, by the task serving them (for watchers on other threads)
+_active_requests: Dict[asyncio.Task, RequestStats] = {}
+
+
+def request_for_task(task: Optional[asyncio.Task]) -> Optional[RequestStats]:
+    return _active_requests.get(task) if task else None
+
+
+# Called with (method, route, status, stats) once each request is done
+_request_listeners: List[Callable[[str, str, int, RequestStats], None]] = []
+
+
+def add_request_listener(listener: Callable[[str, str, int, RequestStats], None]):
+    _request_listeners.append(listener)
+
+
+@contextmanager
+def track(dependency: str):
+    """Time a block (sync, or around an await) as a call to `dependency`"""
+    if _tracking.get() == dependency:
+        yield
+        return
+    token = _tracking.set(dependency)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(dependency, time.perf_counter() - started)
+        _tracking.reset(token)
+
+
+def _timed(method, dependency: str):
+    @functools.wraps(method)
+    def timed(*args, **kwargs):
+        with track(dependency):
+            return method(*args, **kwargs)
+    return timed
+
+
+def instrument(service, dependency: str, methods: Iterable[str]):
+    """Time the named methods of a (blocking) service object as `dependency` calls"""
+    for name in methods:
+        setattr(service, name, _timed(getattr(service, name), dependency))
+    return service
+
+
+# MIDDLEWARE
+_routes: Dict[Any, str] = {}
+
+
+def route_for(scope: Dict[str, Any]) -> str:
+    """Route template a request was routed to (set once routing is done)"""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED_ROUTE
+    if endpoint not in _routes:
+        for route in scope["app"].router.routes:
+            if getattr(route, "endpoint", None) is endpoint:
+                _routes[endpoint] = route.path
+                break
+        else:
+            _routes[endpoint] = UNMATCHED_ROUTE
+    return _routes[endpoint]
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware recording latency, status, response size and in-flight
+    requests per route template, plus the Mongo/Firestore/LLM time each
+    request spent. The breakdown is also returned in a Server-Timing header
+    so the browser can tell server time from network time.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current_request.set(stats)
+        task = asyncio.current_task()
+        _active_requests[task] = stats
+        started = time.perf_counter()
+        status, size = 500, 0
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - started
+                timings = ", ".join(f"{name};dur={stats.seconds[name] * 1000:.1f}" for name in DEPENDENCIES)
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", f"{timings}, total;dur={elapsed * 1000:.1f}".encode())]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            IN_FLIGHT.dec()
+            _current_request.reset(token)
+            _active_requests.pop(task, None)
+            elapsed = time.perf_counter() - started
+            method, route = scope["method"], route_for(scope)
+            REQUESTS.inc(method, route, str(status))
+            LATENCY.observe(method, route, value=elapsed)
+            RESPONSE_SIZE.observe(method, route, value=size)
+            for dependency in DEPENDENCIES:
+                if stats.calls[dependency]:
+                    DEPENDENCY_CALLS.inc(route, dependency, amount=stats.calls[dependency])
+                    DEPENDENCY_TIME.observe(route, dependency, value=stats.seconds[dependency])
+            for listener in _request_listeners:
+                listener(method, route, status, stats)
@@ -0,0 +1,325 @@
+"""
+Analytics Routes for KUMIA Elite Dashboard
+Dashboard metrics, ROI, customer, feedback and journey analytics
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from datetime import datetime, timedelta
+import os
+
+from core import db, get_current_user
+from cohort_service import COHORT_MONTHS, CohortService, add_months, month_key
+from models import User
+import sync_runtime
+
+router = APIRouter(prefix="/api")
+
+# Acquisition cohorts and retention (customer CRUD keeps the cohort totals current)
+cohort_service = CohortService(db)
+
+# Month KUMIA went live (YYYY-MM); defaults to the month of the first tracked activity
+KUMIA_LAUNCH_MONTH = os.environ.get("KUMIA_LAUNCH_MONTH")
+# Monthly cost of KUMIA, for the ROI multiplier; without it the multiplier is not reported
+KUMIA_MONTHLY_COST = float(os.environ["KUMIA_MONTHLY_COST"]) if os.environ.get("KUMIA_MONTHLY_COST") else None
+
+async def startup():
+    await cohort_service.ensure_indexes()
+
+async def _nps_score() -> float:
+    """NPS from feedback ratings: % promoters (4-5) minus % detractors (1-2)"""
+    pipeline = [{"$group": {
+        "_id": None,
+        "total": {"$sum": 1},
+        "promoters": {"$sum": {"$cond": [{"$gte": ["$rating", 4]}, 1, 0]}},
+        "detractors": {"$sum": {"$cond": [{"$lte": ["$rating", 2]}, 1, 0]}},
+    }}]
+    result = await db.feedback.aggregate(pipeline).to_list(1)
+    if not result or not result[0]["total"]:
+        return 0.0
+    return round((result[0]["promoters"] - result[0]["detractors"]) / result[0]["total"] * 100, 1)
+
+def _increase(before, after):
+    """% change; None when either side has no data"""
+    return round((after - before) / before * 100, 1) if before and after is not None else None
+
+# Dashboard metrics with ROI and advanced analytics
+@router.get("/dashboard/metrics")
+async def get_dashboard_metrics(current_user: User = Depends(get_current_user)):
+    """Get comprehensive dashboard metrics with ROI analytics"""
+    try:
+        # Basic metrics
+        metrics = {
+            "total_customers": await db.customers.count_documents({}),
+            "total_reservations": await db.reservations.count_documents({}),
+            "total_feedback": await db.feedback.count_documents({}),
+            "active_ai_agents": await db.ai_agents.count_documents({"is_active": True}),
+            "nfts_delivered": await db.nft_rewards.count_documents({}),
+        }
+        
+        # Calculate points
+        customers = await db.customers.find({}).to_list(1000)
+        metrics["total_points_delivered"] = sum(customer.get("points", 0) for customer in customers)
+        
+        # Calculate average rating
+        feedback_list = await db.feedback.find({}).to_list(1000)
+        if feedback_list:
+            metrics["avg_rating"] = sum(f.get("rating", 0) for f in feedback_list) / len(feedback_list)
+        else:
+            metrics["avg_rating"] = 0
+        
+        # Calculate revenue
+        metrics["total_revenue"] = sum(customer.get("total_spent", 0) for customer in customers)
+        
+        # Advanced ROI metrics
+        metrics["ai_conversions"] = await db.conversations.count_documents({})
+        metrics["total_audience"] = metrics["total_customers"] + (metrics["ai_conversions"] * 0.3)  # Estimated reach
+        
+        # ROI Analytics
+        current_month = datetime.utcnow().replace(day=1)
+        last_month = (current_month - timedelta(days=1)).replace(day=1)
+        
+        # Monthly comparisons
+        current_customers = await db.customers.count_documents({
+            "created_at": {"$gte": current_month}
+        })
+        last_customers = await db.customers.count_documents({
+            "created_at": {"$gte": last_month, "$lt": current_month}
+        })
+        
+        metrics["customer_growth"] = {
+            "current": current_customers,
+            "previous": last_customers,
+            "percentage": ((current_customers - last_customers) / max(last_customers, 1)) * 100
+        }
+        
+        # Channel performance
+        metrics["channel_performance"] = {
+            "whatsapp": await db.conversations.count_documents({"channel": "whatsapp"}),
+            "instagram": await db.conversations.count_documents({"channel": "instagram"}),
+            "facebook": await db.conversations.count_documents({"channel": "facebook"}),
+            "tiktok": await db.conversations.count_documents({"channel": "tiktok"}),
+            "general": await db.conversations.count_documents({"channel": "general"})
+        }
+        
+        # Engagement metrics
+        metrics["engagement_rate"] = (metrics["total_feedback"] / max(metrics["total_customers"], 1)) * 100
+        metrics["retention_rate"] = await cohort_service.retention_rate()
+        metrics["nps_score"] = await _nps_score()
+        
+        return metrics
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calculating metrics: {str(e)}")
+
+# ROI Analytics endpoint
+@router.get("/analytics/roi")
+async def get_roi_analytics(current_user: User = Depends(get_current_user)):
+    """
+    ROI from the acquisition cohorts: customers acquired since KUMIA went live
+    against those acquired in the COHORT_MONTHS before it
+    """
+    try:
+        now = datetime.utcnow()
+        report = await cohort_service.cohort_report(COHORT_MONTHS, now)
+        launch = KUMIA_LAUNCH_MONTH or await cohort_service.first_activity_month() or month_key(now)
+        before = [row for row in report["cohorts"] if row["cohort"] < launch]
+        after = [row for row in report["cohorts"] if row["cohort"] >= launch]
+
+        def ticket(rows):
+            orders = sum(row["total_orders"] for row in rows)
+            return round(sum(row["total_spent"] for row in rows) / orders, 2) if orders else None
+
+        def lifetime_value(rows):
+            customers = sum(row["customers"] for row in rows)
+            return round(sum(row["total_spent"] for row in rows) / customers, 2) if customers else None
+
+        # Order revenue tracked through KUMIA channels since launch
+        by_channel = {}
+        for month, sources in report["revenue_by_source"].items():
+            if month >= launch:
+                for source, revenue in sources.items():
+                    by_channel[source] = round(by_channel.get(source, 0) + revenue, 2)
+        last_closed = add_months(month_key(now), -1)
+        last_month_revenue = sum(report["revenue_by_source"].get(last_closed, {}).values())
+
+        # Only cohorts whose first month after acquisition is over
+        retention_before = cohort_service.month_one_retention([row for row in before if row["cohort"] < last_closed])
+        retention_after = cohort_service.month_one_retention([row for row in after if row["cohort"] < last_closed])
+        return {
+            "launch_month": launch,
+            "monthly_multiplier": round(last_month_revenue / KUMIA_MONTHLY_COST, 1) if KUMIA_MONTHLY_COST else None,
+            "average_ticket": {
+                "before_kumia": ticket(before),
+                "after_kumia": ticket(after),
+                "increase_percentage": _increase(ticket(before), ticket(after))
+            },
+            "attributed_revenue": {
+                "total": round(sum(by_channel.values()), 2),
+                "by_channel": by_channel
+            },
+            "customer_lifetime_value": {
+                "before": lifetime_value(before),
+                "after": lifetime_value(after),
+                "increase": _increase(lifetime_value(before), lifetime_value(after))
+            },
+            "retention_improvement": {
+                "before": retention_before,
+                "after": retention_after,
+                "increase": round(retention_after - retention_before, 1) if None not in (retention_before, retention_after) else None
+            }
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calculating ROI: {str(e)}")
+
+@router.get("/analytics/cohorts")
+async def get_cohort_analytics(
+    months: int = Query(COHORT_MONTHS, ge=2, le=120),
+    current_user: User = Depends(get_current_user)
+):
+    """Monthly acquisition cohorts with retention curves and lifetime value to date"""
+    return await cohort_service.cohort_report(months)
+
+# Enhanced customer analytics
+@router.get("/analytics/customers")
+async def get_customer_analytics(current_user: User = Depends(get_current_user)):
+    """Get detailed customer analytics"""
+    try:
+        customers = await db.customers.find({}).to_list(1000)
+        
+        # Segment customers
+        segments = {
+            "ambassador": [],
+            "recurrent": [],
+            "new": [],
+            "inactive": []
+        }
+        
+        for customer in customers:
+            visit_count = customer.get("visit_count", 0)
+            total_spent = customer.get("total_spent", 0)
+            
+            if total_spent > 10000 and visit_count > 10:
+                segments["ambassador"].append(customer)
+            elif visit_count > 3:
+                segments["recurrent"].append(customer)
+            elif visit_count <= 1:
+                segments["new"].append(customer)
+            else:
+                segments["inactive"].append(customer)
+        
+        # Calculate segment metrics
+        analytics = {
+            "total_customers": len(customers),
+            "segments": {
+                "ambassador": {
+                    "count": len(segments["ambassador"]),
+                    "percentage": (len(segments["ambassador"]) / len(customers)) * 100 if customers else 0,
+                    "avg_spent": sum(c.get("total_spent", 0) for c in segments["ambassador"]) / len(segments["ambassador"]) if segments["ambassador"] else 0
+                },
+                "recurrent": {
+                    "count": len(segments["recurrent"]),
+                    "percentage": (len(segments["recurrent"]) / len(customers)) * 100 if customers else 0,
+                    "avg_spent": sum(c.get("total_spent", 0) for c in segments["recurrent"]) / len(segments["recurrent"]) if segments["recurrent"] else 0
+                },
+                "new": {
+                    "count": len(segments["new"]),
+                    "percentage": (len(segments["new"]) / len(customers)) * 100 if customers else 0,
+                    "avg_spent": sum(c.get("total_spent", 0) for c in segments["new"]) / len(segments["new"]) if segments["new"] else 0
+                },
+                "inactive": {
+                    "count": len(segments["inactive"]),
+                    "percentage": (len(segments["inactive"]) / len(customers)) * 100 if customers else 0,
+                    "avg_spent": sum(c.get("total_spent", 0) for c in segments["inactive"]) / len(segments["inactive"]) if segments["inactive"] else 0
+                }
+            }
+        }
+        
+        return analytics
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calculating customer analytics: {str(e)}")
+
+# Feedback analytics with AI insights
+@router.get("/analytics/feedback")
+async def get_feedback_analytics(current_user: User = Depends(get_current_user)):
+    """Get feedback analytics with AI insights"""
+    try:
+        feedback_list = await db.feedback.find({}).to_list(1000)
+        
+        # Calculate rating distribution
+        rating_distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+        sentiment_analysis = {"positive": 0, "neutral": 0, "negative": 0}
+        
+        for feedback in feedback_list:
+            rating = feedback.get("rating", 0)
+            if rating in rating_distribution:
+                rating_distribution[rating] += 1
+            
+            # Simple sentiment analysis based on rating
+            if rating >= 4:
+                sentiment_analysis["positive"] += 1
+            elif rating == 3:
+                sentiment_analysis["neutral"] += 1
+            else:
+                sentiment_analysis["negative"] += 1
+        
+        # Calculate NPS (Net Promoter Score)
+        total_responses = len(feedback_list)
+        promoters = rating_distribution[5] + rating_distribution[4]
+        detractors = rating_distribution[1] + rating_distribution[2]
+        nps = ((promoters - detractors) / total_responses * 100) if total_responses > 0 else 0
+        
+        # Generate keyword insights (mock)
+        keywords = [
+            {"word": "delicioso", "count": 45, "sentiment": "positive"},
+            {"word": "rápido", "count": 32, "sentiment": "positive"},
+            {"word": "calidad", "count": 28, "sentiment": "positive"},
+            {"word": "espera", "count": 15, "sentiment": "negative"},
+            {"word": "precio", "count": 12, "sentiment": "neutral"}
+        ]
+        
+        analytics = {
+            "total_feedback": total_responses,
+            "average_rating": sum(rating * count for rating, count in rating_distribution.items()) / total_responses if total_responses > 0 else 0,
+            "rating_distribution": rating_distribution,
+            "sentiment_analysis": sentiment_analysis,
+            "nps_score": nps,
+            "keywords": keywords,
+            "trends": {
+                "weekly_growth": 8.7,
+                "response_rate": 34.2,
+                "satisfaction_trend": "increasing"
+            }
+        }
+        
+        return analytics
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calculating feedback analytics: {str(e)}")
+
+# CUSTOMER INSIGHTS & MARKETING INTELLIGENCE
+@router.get("/analytics/customer-journey/{user_id}")
+async def get_customer_journey(user_id: str, current_user: User = Depends(get_current_user)):
+    """Get comprehensive customer journey analytics for marketing decisions"""
+    try:
+        if sync_runtime.sync_service:
+            journey_data = sync_runtime.sync_service.get_customer_journey_analytics(user_id)
+            if journey_data:
+                return journey_data
+        
+        # Fallback: basic analytics from MongoDB
+        activities = await db.customer_activities.find({"user_id": user_id}).limit(50).to_list(50)
+        user_profile = await db.users.find_one({"id": user_id})
+        
+        return {
+            "customer_profile": user_profile,
+            "total_activities": len(activities),
+            "recent_activities": activities[:10],
+            "marketing_segment": "unknown",
+            "engagement_score": 0.0
+        }
+        
+    except Exception as e:
+        print(f"❌ Error getting customer journey: {e}")
+        raise HTTPException(status_code=500, detail=f"Error getting customer journey: {str(e)}")
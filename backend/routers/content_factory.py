@@ -0,0 +1,459 @@
+"""
+Content Factory Routes for KUMIA Elite Dashboard
+Video and image generation, cost estimates and credits
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, Response, Header
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+import os
+import uuid
+import asyncio
+import base64
+
+from core import db, logger, get_current_user
+from models import User
+from credit_ledger import CreditLedger, InsufficientCreditsError
+from request_metrics import track
+
+router = APIRouter(prefix="/api")
+
+# Content Factory credits
+credit_ledger = CreditLedger(db)
+
+# Longest video and largest image batch a request may ask for (and be charged for), as in the Content Factory form
+MAX_VIDEO_SECONDS = 30
+MAX_IMAGES_PER_REQUEST = 10
+
+# Request/Response models for Content Factory
+class VideoGenerationRequest(BaseModel):
+    prompt: str
+    model: str = "runwayml"  # runwayml, veo, pika
+    duration: int = Field(10, gt=0, le=MAX_VIDEO_SECONDS)  # seconds
+    style: str = "cinematica"
+    platform: str = "instagram"
+    branding_level: str = "alto"
+
+class ImageGenerationRequest(BaseModel):
+    prompt: str
+    style: str = "fotografico"
+    format: str = "post"  # post, carousel, story, banner
+    platform: str = "instagram"
+    count: int = Field(1, gt=0, le=MAX_IMAGES_PER_REQUEST)
+
+class CostEstimateRequest(BaseModel):
+    content_type: str  # video, image
+    duration: Optional[int] = Field(None, gt=0, le=MAX_VIDEO_SECONDS)
+    model: Optional[str] = None
+    count: Optional[int] = Field(1, gt=0, le=MAX_IMAGES_PER_REQUEST)
+    style: Optional[str] = "standard"
+
+# Content Factory Video Generation
+@router.post("/content-factory/video/generate")
+async def generate_video(request: VideoGenerationRequest, current_user: User = Depends(get_current_user)):
+    """
+    Generate AI videos using RunwayML, Google Veo, or Pika Labs
+    """
+    try:
+        # Calculate cost based on model and duration
+        model_pricing = {
+            "runwayml": 5,  # credits per second
+            "veo": 4.2,
+            "pika": 3.5
+        }
+        
+        estimated_cost = model_pricing.get(request.model, 5) * request.duration
+        
+        # Hold the credits until the job settles or fails
+        job_id = str(uuid.uuid4())
+        reservation_id = await credit_ledger.reserve(current_user.id, estimated_cost, f"content_generation:{job_id}")
+        
+        try:
+            job_data = await _start_video_job(job_id, reservation_id, request, estimated_cost, current_user)
+        except BaseException:
+            # The job never started, so nothing will settle the hold
+            await credit_ledger.release(reservation_id)
+            raise
+        
+        return {
+            "job_id": job_data["id"],
+            "status": "processing",
+            "estimated_cost": estimated_cost,
+            "estimated_time": "2-3 minutes",
+            "message": "Video generation started. Check status with job_id."
+        }
+        
+    except InsufficientCreditsError:
+        raise HTTPException(status_code=402, detail="Insufficient credits for video generation")
+    except Exception as e:
+        logger.error(f"Video generation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating video: {str(e)}")
+
+async def _start_video_job(job_id: str, reservation_id: str, request: VideoGenerationRequest, estimated_cost: float, current_user: User):
+    # Create generation job in database
+    job_data = {
+        "id": job_id,
+        "user_id": current_user.id,
+        "type": "video",
+        "status": "processing",
+        "model": request.model,
+        "prompt": request.prompt,
+        "duration": request.duration,
+        "style": request.style,
+        "platform": request.platform,
+        "estimated_cost": estimated_cost,
+        "credit_reservation_id": reservation_id,
+        "created_at": datetime.utcnow(),
+        "completed_at": None,
+        "result_url": None
+    }
+    
+    await db.content_generations.insert_one(job_data)
+    
+    # For now, return mock data (in production, this would trigger actual AI generation)
+    # Simulate processing time with background task
+    asyncio.create_task(simulate_video_generation(job_data["id"], reservation_id))
+    return job_data
+
+# Content Factory Image Generation
+@router.post("/content-factory/image/generate")
+async def generate_image(request: ImageGenerationRequest, current_user: User = Depends(get_current_user)):
+    """
+    Generate AI images using OpenAI DALL-E or Stable Diffusion
+    """
+    try:
+        # Calculate cost
+        base_cost = 2  # credits per image
+        style_multiplier = 1.5 if request.style in ["premium", "fotografico_premium"] else 1.0
+        estimated_cost = request.count * base_cost * style_multiplier
+        
+        # Hold the credits; only delivered images are charged
+        reservation_id = await credit_ledger.reserve(current_user.id, estimated_cost, f"image_generation:{uuid.uuid4()}")
+        
+        # Try to generate image using emergentintegrations
+        try:
+            # Initialize OpenAI image generator
+            api_key = os.environ.get("OPENAI_API_KEY")
+            if not api_key:
+                raise HTTPException(status_code=500, detail="OpenAI API key not configured")
+            
+            from emergentintegrations.llm.openai.image_generation import OpenAIImageGeneration
+            image_gen = OpenAIImageGeneration(api_key=api_key)
+            
+            # Generate images
+            with track("llm"):
+                images = await image_gen.generate_images(
+                    prompt=request.prompt,
+                    number_of_images=request.count
+                )
+            
+            # Convert images to base64
+            image_urls = []
+            for i, image_bytes in enumerate(images):
+                if image_bytes:
+                    image_base64 = base64.b64encode(image_bytes).decode('utf-8')
+                    # Store in database for retrieval
+                    image_data = {
+                        "id": str(uuid.uuid4()),
+                        "user_id": current_user.id,
+                        "type": "image", 
+                        "prompt": request.prompt,
+                        "format": request.format,
+                        "platform": request.platform,
+                        "image_data": image_base64,
+                        "created_at": datetime.utcnow()
+                    }
+                    result = await db.generated_images.insert_one(image_data)
+                    image_urls.append(f"/api/generated-image/{image_data['id']}")
+            
+            actual_cost = len(image_urls) * base_cost * style_multiplier
+            await credit_ledger.settle(reservation_id, actual_cost)
+            
+            return {
+                "status": "completed",
+                "images": image_urls,
+                "count": len(image_urls),
+                "cost": actual_cost,
+                "metadata": {
+                    "format": request.format,
+                    "platform": request.platform,
+                    "style": request.style
+                }
+            }
+            
+        except Exception as ai_error:
+            logger.warning(f"AI generation failed, using mock: {str(ai_error)}")
+            
+            # Mock images are not charged
+            await credit_ledger.release(reservation_id)
+            
+            # Fallback to mock data if AI generation fails
+            job_data = {
+                "id": str(uuid.uuid4()),
+                "user_id": current_user.id,
+                "type": "image",
+                "status": "completed",
+                "prompt": request.prompt,
+                "format": request.format,
+                "platform": request.platform,
+                "count": request.count,
+                "estimated_cost": estimated_cost,
+                "created_at": datetime.utcnow(),
+                "completed_at": datetime.utcnow()
+            }
+            
+            await db.content_generations.insert_one(job_data)
+            
+            # Return mock image URLs
+            mock_images = [f"/api/mock-image/{i+1}?job_id={job_data['id']}" for i in range(request.count)]
+            
+            return {
+                "status": "completed",
+                "images": mock_images,
+                "count": request.count,
+                "cost": 0,
+                "metadata": {
+                    "format": request.format,
+                    "platform": request.platform,
+                    "style": request.style
+                }
+            }
+        
+    except InsufficientCreditsError:
+        raise HTTPException(status_code=402, detail="Insufficient credits for image generation")
+    except Exception as e:
+        logger.error(f"Image generation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating image: {str(e)}")
+
+# Get generated image by ID
+@router.get("/generated-image/{image_id}")
+async def get_generated_image(image_id: str):
+    """
+    Retrieve generated image by ID
+    """
+    try:
+        image_doc = await db.generated_images.find_one({"id": image_id})
+        if not image_doc:
+            raise HTTPException(status_code=404, detail="Image not found")
+        
+        # Return image as base64 data URL
+        image_data = image_doc["image_data"]
+        return Response(
+            content=base64.b64decode(image_data),
+            media_type="image/png"
+        )
+        
+    except Exception as e:
+        logger.error(f"Error retrieving image: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error retrieving image")
+
+# Mock image endpoint for fallback
+@router.get("/mock-image/{image_num}")
+async def get_mock_image(image_num: int, job_id: str = None):
+    """
+    Return mock image for testing
+    """
+    import cv2
+    import numpy as np
+    
+    # Create a simple colored rectangle as mock image
+    img = np.random.randint(0, 255, (400, 400, 3), dtype=np.uint8)
+    _, buffer = cv2.imencode('.png', img)
+    
+    return Response(
+        content=buffer.tobytes(),
+        media_type="image/png"
+    )
+
+# Cost estimation endpoint
+@router.post("/content-factory/cost-estimate")
+async def estimate_cost(request: CostEstimateRequest, current_user: User = Depends(get_current_user)):
+    """
+    Calculate estimated cost for content generation
+    """
+    try:
+        if request.content_type == "video":
+            model_pricing = {
+                "runwayml": 5,
+                "veo": 4.2,
+                "pika": 3.5
+            }
+            duration = request.duration or 10
+            credits = model_pricing.get(request.model, 5) * duration
+            
+        elif request.content_type == "image":
+            base_cost = 2
+            style_multiplier = 1.5 if request.style == "premium" else 1.0
+            credits = request.count * base_cost * style_multiplier
+            
+        else:
+            raise HTTPException(status_code=400, detail="Invalid content type")
+        
+        usd_cost = credits * 0.1  # $0.10 per credit
+        
+        return {
+            "credits": credits,
+            "usd_cost": round(usd_cost, 2),
+            "content_type": request.content_type,
+            "parameters": request.dict()
+        }
+        
+    except Exception as e:
+        logger.error(f"Cost estimation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error estimating cost: {str(e)}")
+
+# Job status endpoint
+@router.get("/content-factory/job/{job_id}")
+async def get_job_status(job_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Check status of content generation job
+    """
+    try:
+        job = await db.content_generations.find_one({"id": job_id})
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        
+        return {
+            "job_id": job["id"],
+            "status": job["status"],
+            "type": job["type"],
+            "created_at": job["created_at"],
+            "completed_at": job.get("completed_at"),
+            "result_url": job.get("result_url"),
+            "cost": job.get("estimated_cost", 0)
+        }
+        
+    except Exception as e:
+        logger.error(f"Job status error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving job status: {str(e)}")
+
+# Credit management endpoints
+@router.get("/credits/balance")
+async def get_credit_balance(current_user: User = Depends(get_current_user)):
+    """
+    Get user's credit balance
+    """
+    try:
+        return await credit_ledger.get_balance(current_user.id)
+        
+    except Exception as e:
+        logger.error(f"Credit balance error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving credit balance: {str(e)}")
+
+@router.post("/credits/purchase")
+async def purchase_credits(
+    request: dict,
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key")
+):
+    """
+    Purchase credits (simulation)
+    """
+    try:
+        credit_amount = request.get("amount", 500)
+        package_cost = request.get("cost", 50)
+        idempotency_key = idempotency_key or request.get("idempotency_key")
+        
+        if not isinstance(credit_amount, (int, float)) or credit_amount <= 0:
+            raise HTTPException(status_code=400, detail="Credit amount must be positive")
+        
+        # Simulate credit purchase
+        purchase_data = {
+            "id": str(uuid.uuid4()),
+            "user_id": current_user.id,
+            "credits_purchased": credit_amount,
+            "cost_usd": package_cost,
+            "status": "completed",
+            "payment_method": "credit_card",
+            "idempotency_key": idempotency_key,
+            "created_at": datetime.utcnow()
+        }
+        
+        balance, replayed = await credit_ledger.purchase(
+            current_user.id, credit_amount, purchase_data["id"], idempotency_key
+        )
+        
+        if replayed:
+            original = await db.credit_purchases.find_one(
+                {"user_id": current_user.id, "idempotency_key": idempotency_key}
+            )
+            if original:
+                purchase_data = original
+        else:
+            await db.credit_purchases.insert_one(purchase_data)
+        
+        return {
+            "purchase_id": purchase_data["id"],
+            "credits_added": purchase_data["credits_purchased"],
+            "new_balance": balance["current_balance"],
+            "status": "completed",
+            "replayed": replayed,
+            "message": f"Successfully purchased {purchase_data['credits_purchased']} credits for ${purchase_data['cost_usd']}"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Credit purchase error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error purchasing credits: {str(e)}")
+
+@router.get("/credits/ledger")
+async def get_credit_ledger(limit: int = 50, current_user: User = Depends(get_current_user)):
+    """
+    Get the most recent credit ledger entries for the user's account
+    """
+    try:
+        entries = await credit_ledger.get_entries(current_user.id, min(max(limit, 1), 500))
+        return {"user_id": current_user.id, "entries": entries}
+        
+    except Exception as e:
+        logger.error(f"Credit ledger error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving credit ledger: {str(e)}")
+
+async def simulate_video_generation(job_id: str, reservation_id: Optional[str] = None):
+    """
+    Simulate video generation process
+    """
+    try:
+        # Wait for "processing" time
+        await asyncio.sleep(10)  # 10 seconds for demo
+        
+        # Update job status to completed
+        await db.content_generations.update_one(
+            {"id": job_id},
+            {
+                "$set": {
+                    "status": "completed",
+                    "completed_at": datetime.utcnow(),
+                    "result_url": f"/api/generated-video/{job_id}"
+                }
+            }
+        )
+        
+        if reservation_id:
+            await credit_ledger.settle(reservation_id)
+        
+    except Exception as e:
+        logger.error(f"Video simulation error: {str(e)}")
+        if reservation_id:
+            await credit_ledger.release(reservation_id)
+        # Update status to failed
+        await db.content_generations.update_one(
+            {"id": job_id},
+            {
+                "$set": {
+                    "status": "failed",
+                    "completed_at": datetime.utcnow(),
+                    "error": str(e)
+                }
+            }
+        )
+
+
+async def startup():
+    await credit_ledger.ensure_indexes()
+    credit_ledger.start_sweeper()
+
+async def shutdown():
+    await credit_ledger.stop_sweeper()
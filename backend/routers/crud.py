@@ -0,0 +1,435 @@
+"""
+CRUD Routes for KUMIA Elite Dashboard
+Menu, customers, reservations, feedback, agents, rewards, integrations and settings
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, Body, Header
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from core import db, get_current_user, RESTAURANT_CONFIG
+from models import User, MenuItem, Customer, Reservation, Feedback, AIAgent, NFTReward, Integration, RestaurantSettings, BatchPatchRequest
+from sync_runtime import menu_publisher, public_cache, table_assigner, availability_for_day
+from table_assignment import reservation_slot
+from fast_json import FastJSONResponse, shape_many
+from patching import DocumentPatcher, PatchError, VersionConflict, PATCHES, etag, parse_if_match
+from search_index import SEARCHES
+from bulk_import import IMPORTS, ensure_key_index
+# Customer and menu writes keep these routers' counts and indexes current; their
+# index setup and background builds only run when the feature is enabled
+from routers.marketing import segment_service
+from routers.search import search_service
+from routers.analytics import cohort_service
+
+router = APIRouter(prefix="/api")
+
+document_patcher = DocumentPatcher(db)
+
+async def startup():
+    # One customer per email, whichever path writes it
+    await ensure_key_index(db, IMPORTS["customers"])
+
+def _duplicate(resource: str, error: DuplicateKeyError) -> HTTPException:
+    fields = ", ".join((error.details or {}).get("keyValue", {})) or "unique key"
+    return HTTPException(status_code=409, detail=f"{fields} already in use by another of the {resource}")
+
+# JSON Merge Patch (application/merge-patch+json) and batch patches
+async def _merge_patch(resource: str, document_id: str, patch: Dict[str, Any], if_match: Optional[str],
+                       read_version: Optional[int] = None):
+    """read_version pins the patch to the document the caller read when there is no If-Match"""
+    spec = PATCHES[resource]
+    try:
+        expected_version = parse_if_match(if_match)
+        if expected_version is None:
+            expected_version = read_version
+        result = await document_patcher.patch(spec, document_id, patch, expected_version)
+    except VersionConflict as e:
+        headers = {"ETag": f'"{e.current_version}"'} if e.current_version is not None else None
+        raise HTTPException(status_code=412, detail=f"{e}; reload it and retry", headers=headers)
+    except PatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except DuplicateKeyError as e:
+        raise _duplicate(resource, e)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"{resource} '{document_id}' not found")
+    return result
+
+def _patched_response(model, document: Dict[str, Any]) -> FastJSONResponse:
+    return FastJSONResponse(shape_many(model, [document])[0], headers={"ETag": etag(document)})
+
+async def _batch_patch(resource: str, request: BatchPatchRequest) -> Dict[str, int]:
+    try:
+        return await document_patcher.batch_patch(PATCHES[resource], request.filter, request.set, request.inc, request.mul)
+    except PatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except DuplicateKeyError as e:
+        raise _duplicate(resource, e)
+
+async def _bump_version(collection, document_id: str, document: Dict[str, Any]) -> Optional[int]:
+    """Full update (PUT) of a versioned document; returns the new version"""
+    updated = await collection.find_one_and_update(
+        {"id": document_id}, {"$set": document, "$inc": {"version": 1}},
+        projection={"version": 1}, return_document=ReturnDocument.AFTER
+    )
+    return updated["version"] if updated else None
+
+# Third-party API credentials management
+@router.post("/integrations/credentials")
+async def save_integration_credentials(
+    integration_data: dict,
+    current_user: User = Depends(get_current_user)
+):
+    """Save third-party API credentials securely"""
+    try:
+        # Update or create integration credentials
+        await db.integrations.update_one(
+            {"type": integration_data["type"], "user_id": current_user.id},
+            {
+                "$set": {
+                    **integration_data,
+                    "user_id": current_user.id,
+                    "created_at": datetime.utcnow(),
+                    "status": "active"
+                }
+            },
+            upsert=True
+        )
+        
+        return {"success": True, "message": f"Credentials for {integration_data['type']} saved successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error saving credentials: {str(e)}")
+
+@router.get("/integrations/credentials")
+async def get_integration_credentials(current_user: User = Depends(get_current_user)):
+    """Get all configured integrations for the current user"""
+    try:
+        integrations = await db.integrations.find({"user_id": current_user.id}).to_list(100)
+        
+        # Remove sensitive data before returning
+        safe_integrations = []
+        for integration in integrations:
+            safe_integration = {
+                "type": integration.get("type"),
+                "name": integration.get("name"),
+                "status": integration.get("status"),
+                "created_at": integration.get("created_at"),
+                "has_credentials": bool(integration.get("api_key") or integration.get("credentials"))
+            }
+            safe_integrations.append(safe_integration)
+        
+        return safe_integrations
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving integrations: {str(e)}")
+
+@router.post("/integrations/test-connection")
+async def test_integration_connection(
+    integration_type: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Test connection to third-party integration"""
+    try:
+        integration = await db.integrations.find_one({
+            "type": integration_type,
+            "user_id": current_user.id
+        })
+        
+        if not integration:
+            raise HTTPException(status_code=404, detail="Integration not found")
+        
+        # Mock connection test - in production, this would actually test the API
+        connection_tests = {
+            "meta_business": {"status": "success", "message": "WhatsApp, Instagram, Facebook connected"},
+            "google_reviews": {"status": "success", "message": "Google My Business API connected"},
+            "whatsapp_business": {"status": "success", "message": "WhatsApp Business API connected"},
+            "openai": {"status": "success", "message": "OpenAI API connected"},
+            "gemini": {"status": "success", "message": "Google Gemini API connected"}
+        }
+        
+        return connection_tests.get(integration_type, {"status": "success", "message": "Connection test passed"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error testing connection: {str(e)}")
+
+# Restaurant configuration endpoint
+@router.get("/restaurant/config")
+async def get_restaurant_config(current_user: User = Depends(get_current_user)):
+    """Get restaurant configuration"""
+    return RESTAURANT_CONFIG
+
+# Menu management
+@router.get("/menu", response_model=List[MenuItem])
+async def get_menu(current_user: User = Depends(get_current_user)):
+    menu_items = await db.menu_items.find({}).to_list(1000)
+    return FastJSONResponse(shape_many(MenuItem, menu_items))
+
+@router.post("/menu", response_model=MenuItem)
+async def create_menu_item(item: MenuItem, current_user: User = Depends(get_current_user)):
+    item_dict = item.dict()
+    await db.menu_items.insert_one(item_dict)
+    search_service.upsert("menu", item_dict)
+    menu_publisher.schedule()
+    public_cache.invalidate("menu")
+    return item
+
+@router.put("/menu/{item_id}", response_model=MenuItem)
+async def update_menu_item(item_id: str, item: MenuItem, current_user: User = Depends(get_current_user)):
+    item.updated_at = datetime.utcnow()
+    item_dict = item.dict(exclude={"version"})
+    version = await _bump_version(db.menu_items, item_id, item_dict)
+    if version is not None:
+        item.version = version
+        search_service.remove("menu", item_id)
+        search_service.upsert("menu", item_dict)
+    menu_publisher.schedule()
+    public_cache.invalidate("menu")
+    return item
+
+@router.patch("/menu/{item_id}", response_model=MenuItem)
+async def patch_menu_item(item_id: str, patch: Dict[str, Any] = Body(...), if_match: Optional[str] = Header(None),
+                          current_user: User = Depends(get_current_user)):
+    before, after = await _merge_patch("menu", item_id, patch, if_match)
+    if after is not before:
+        search_service.upsert("menu", after)
+        menu_publisher.schedule()
+        public_cache.invalidate("menu")
+    return _patched_response(MenuItem, after)
+
+@router.patch("/menu")
+async def batch_patch_menu(request: BatchPatchRequest, current_user: User = Depends(get_current_user)):
+    result = await _batch_patch("menu", request)
+    if result["modified"]:
+        if set(request.set) & set(SEARCHES["menu"].fields):
+            search_service.schedule_build("menu")
+        menu_publisher.schedule()
+        public_cache.invalidate("menu")
+    return result
+
+@router.delete("/menu/{item_id}")
+async def delete_menu_item(item_id: str, current_user: User = Depends(get_current_user)):
+    await db.menu_items.delete_one({"id": item_id})
+    search_service.remove("menu", item_id)
+    menu_publisher.schedule()
+    public_cache.invalidate("menu")
+    return {"message": "Item deleted successfully"}
+
+# Customer management
+@router.get("/customers", response_model=List[Customer])
+async def get_customers(current_user: User = Depends(get_current_user)):
+    customers = await db.customers.find({}).to_list(1000)
+    return FastJSONResponse(shape_many(Customer, customers))
+
+@router.post("/customers", response_model=Customer)
+async def create_customer(customer: Customer, current_user: User = Depends(get_current_user)):
+    customer_dict = customer.dict()
+    try:
+        await db.customers.insert_one(customer_dict)
+    except DuplicateKeyError as e:
+        raise _duplicate("customers", e)
+    search_service.upsert("customers", customer_dict)
+    await segment_service.apply_customer_change(None, customer_dict)
+    await cohort_service.apply_customer_change(None, customer_dict)
+    return customer
+
+@router.put("/customers/{customer_id}", response_model=Customer)
+async def update_customer(customer_id: str, customer: Customer, current_user: User = Depends(get_current_user)):
+    customer_dict = customer.dict(exclude={"version"})
+    try:
+        previous = await db.customers.find_one_and_update({"id": customer_id}, {"$set": customer_dict, "$inc": {"version": 1}})
+    except DuplicateKeyError as e:
+        raise _duplicate("customers", e)
+    if previous:
+        customer.version = previous.get("version", 0) + 1
+        search_service.remove("customers", customer_id)
+        search_service.upsert("customers", customer_dict)
+        await segment_service.apply_customer_change(previous, customer_dict)
+        await cohort_service.apply_customer_change(previous, customer_dict)
+    return customer
+
+@router.patch("/customers/{customer_id}", response_model=Customer)
+async def patch_customer(customer_id: str, patch: Dict[str, Any] = Body(...), if_match: Optional[str] = Header(None),
+                         current_user: User = Depends(get_current_user)):
+    before, after = await _merge_patch("customers", customer_id, patch, if_match)
+    if after is not before:
+        search_service.upsert("customers", after)
+        await segment_service.apply_customer_change(before, after)
+        await cohort_service.apply_customer_change(before, after)
+    return _patched_response(Customer, after)
+
+@router.patch("/customers")
+async def batch_patch_customers(request: BatchPatchRequest, current_user: User = Depends(get_current_user)):
+    result = await _batch_patch("customers", request)
+    if result["modified"]:
+        # Points may have moved customers between levels; recount on next read
+        await segment_service.invalidate_counts()
+        await cohort_service.invalidate(periods=bool(set(request.set) & {"first_visit", "last_visit"}))
+        if set(request.set) & set(SEARCHES["customers"].fields):
+            search_service.schedule_build("customers")
+    return result
+
+# Reservations
+# Fields that decide which table slots a reservation holds
+SLOT_FIELDS = ("date", "time", "table_id", "table_ids", "duration_minutes", "status")
+
+async def _move_slot(reservation_id: str, before: Dict[str, Any], after: Dict[str, Any]):
+    """Move the index slots and table claims along with an edit; 409 if the new slot is taken"""
+    old, new = reservation_slot(before), reservation_slot(after)
+    if old == new:
+        return
+    if new is None:
+        await table_assigner.release(await availability_for_day(old[1]), reservation_id)
+        return
+    try:
+        moved = await table_assigner.move(await availability_for_day(new[1]), reservation_id, *new)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not moved:
+        raise HTTPException(status_code=409, detail="La mesa no está disponible en ese horario")
+
+async def _undo_move(reservation_id: str, moved: Dict[str, Any], original: Dict[str, Any]):
+    # The edit was not stored, so the reservation goes back to its old slot
+    try:
+        await _move_slot(reservation_id, moved, original)
+    except HTTPException:
+        print(f"⚠️ Reservation {reservation_id} could not get its previous slot back")
+
+@router.get("/reservations", response_model=List[Reservation])
+async def get_reservations(current_user: User = Depends(get_current_user)):
+    reservations = await db.reservations.find({}).to_list(1000)
+    return FastJSONResponse(shape_many(Reservation, reservations))
+
+@router.post("/reservations", response_model=Reservation)
+async def create_reservation(reservation: Reservation, current_user: User = Depends(get_current_user)):
+    reservation_dict = reservation.dict()
+    await db.reservations.insert_one(reservation_dict)
+    return reservation
+
+@router.put("/reservations/{reservation_id}", response_model=Reservation)
+async def update_reservation(reservation_id: str, reservation: Reservation, current_user: User = Depends(get_current_user)):
+    reservation_dict = reservation.dict(exclude={"version"})
+    current = await db.reservations.find_one({"id": reservation_id}, {"_id": 0})
+    updated = {**current, **reservation_dict} if current else None
+    if current:
+        await _move_slot(reservation_id, current, updated)
+    try:
+        reservation.version = await _bump_version(db.reservations, reservation_id, reservation_dict) or reservation.version
+    except BaseException:
+        if current:
+            await _undo_move(reservation_id, updated, current)
+        raise
+    return reservation
+
+@router.patch("/reservations/{reservation_id}", response_model=Reservation)
+async def patch_reservation(reservation_id: str, patch: Dict[str, Any] = Body(...), if_match: Optional[str] = Header(None),
+                            current_user: User = Depends(get_current_user)):
+    current = await db.reservations.find_one({"id": reservation_id}, {"_id": 0})
+    if current is None:
+        raise HTTPException(status_code=404, detail=f"reservations '{reservation_id}' not found")
+    try:
+        preview = document_patcher.preview(PATCHES["reservations"], current, patch)
+    except PatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if reservation_slot(preview) == reservation_slot(current):
+        _, after = await _merge_patch("reservations", reservation_id, patch, if_match)
+        return _patched_response(Reservation, after)
+
+    # The new slot is claimed first, for exactly the version that was read
+    await _move_slot(reservation_id, current, preview)
+    try:
+        _, after = await _merge_patch("reservations", reservation_id, patch, if_match, current.get("version", 0))
+    except BaseException:
+        await _undo_move(reservation_id, preview, current)
+        raise
+    return _patched_response(Reservation, after)
+
+@router.patch("/reservations")
+async def batch_patch_reservations(request: BatchPatchRequest, current_user: User = Depends(get_current_user)):
+    moved = sorted(set(request.set) & set(SLOT_FIELDS))
+    if moved:
+        raise HTTPException(status_code=422, detail=f"{', '.join(moved)} move table slots; patch reservations one at a time")
+    return await _batch_patch("reservations", request)
+
+# Feedback management
+@router.get("/feedback", response_model=List[Feedback])
+async def get_feedback(current_user: User = Depends(get_current_user)):
+    feedback_list = await db.feedback.find({}).to_list(1000)
+    return FastJSONResponse(shape_many(Feedback, feedback_list))
+
+@router.post("/feedback", response_model=Feedback)
+async def create_feedback(feedback: Feedback, current_user: User = Depends(get_current_user)):
+    feedback_dict = feedback.dict()
+    await db.feedback.insert_one(feedback_dict)
+    return feedback
+
+# AI Agents management
+@router.get("/ai-agents", response_model=List[AIAgent])
+async def get_ai_agents(current_user: User = Depends(get_current_user)):
+    agents = await db.ai_agents.find({}).to_list(1000)
+    return FastJSONResponse(shape_many(AIAgent, agents))
+
+@router.post("/ai-agents", response_model=AIAgent)
+async def create_ai_agent(agent: AIAgent, current_user: User = Depends(get_current_user)):
+    agent_dict = agent.dict()
+    await db.ai_agents.insert_one(agent_dict)
+    return agent
+
+@router.put("/ai-agents/{agent_id}", response_model=AIAgent)
+async def update_ai_agent(agent_id: str, agent: AIAgent, current_user: User = Depends(get_current_user)):
+    agent.updated_at = datetime.utcnow()
+    agent_dict = agent.dict()
+    await db.ai_agents.update_one({"id": agent_id}, {"$set": agent_dict})
+    return agent
+
+# NFT Rewards
+@router.get("/nft-rewards", response_model=List[NFTReward])
+async def get_nft_rewards(current_user: User = Depends(get_current_user)):
+    rewards = await db.nft_rewards.find({}).to_list(1000)
+    return FastJSONResponse(shape_many(NFTReward, rewards))
+
+@router.post("/nft-rewards", response_model=NFTReward)
+async def create_nft_reward(reward: NFTReward, current_user: User = Depends(get_current_user)):
+    reward_dict = reward.dict()
+    await db.nft_rewards.insert_one(reward_dict)
+    return reward
+
+# Integrations
+@router.get("/integrations", response_model=List[Integration])
+async def get_integrations(current_user: User = Depends(get_current_user)):
+    integrations = await db.integrations.find({}).to_list(1000)
+    return FastJSONResponse(shape_many(Integration, integrations))
+
+@router.post("/integrations", response_model=Integration)
+async def create_integration(integration: Integration, current_user: User = Depends(get_current_user)):
+    integration_dict = integration.dict()
+    await db.integrations.insert_one(integration_dict)
+    return integration
+
+@router.put("/integrations/{integration_id}", response_model=Integration)
+async def update_integration(integration_id: str, integration: Integration, current_user: User = Depends(get_current_user)):
+    integration_dict = integration.dict(exclude={"version"})
+    integration.version = await _bump_version(db.integrations, integration_id, integration_dict) or integration.version
+    return integration
+
+@router.patch("/integrations/{integration_id}", response_model=Integration)
+async def patch_integration(integration_id: str, patch: Dict[str, Any] = Body(...), if_match: Optional[str] = Header(None),
+                            current_user: User = Depends(get_current_user)):
+    _, after = await _merge_patch("integrations", integration_id, patch, if_match)
+    return _patched_response(Integration, after)
+
+# Restaurant Settings
+@router.get("/settings", response_model=RestaurantSettings)
+async def get_settings(current_user: User = Depends(get_current_user)):
+    settings = await db.settings.find_one({})
+    if not settings:
+        default_settings = RestaurantSettings()
+        await db.settings.insert_one(default_settings.dict())
+        return default_settings
+    return RestaurantSettings(**settings)
+
+@router.put("/settings", response_model=RestaurantSettings)
+async def update_settings(settings: RestaurantSettings, current_user: User = Depends(get_current_user)):
+    settings.updated_at = datetime.utcnow()
+    settings_dict = settings.dict()
+    await db.settings.update_one({}, {"$set": settings_dict}, upsert=True)
+    public_cache.invalidate("restaurant_info")
+    return settings
@@ -0,0 +1,47 @@
+"""
+Export Routes for KUMIA Elite Dashboard
+Full CSV/Parquet downloads of customers, feedback and reservations
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import datetime
+
+from core import db, get_current_user
+from models import User
+from exports import export_stream, ExportError, EXPORTS, FORMATS
+
+router = APIRouter(prefix="/api")
+
+# Query parameters that are not filters
+RESERVED_PARAMS = {"format", "columns"}
+
+@router.get("/exports/{dataset}")
+async def export_dataset(
+    dataset: str,
+    request: Request,
+    format: str = "csv",
+    columns: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Stream a whole collection as CSV or Parquet, e.g.
+    /api/exports/customers?format=parquet&columns=id,name,email&nft_level=oro,plata&points_gte=100
+
+    Other query parameters filter server side: field=value (comma-separated
+    values match any) and field_gte / field_lte for numbers and dates.
+    """
+    if dataset not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export '{dataset}'; available: {', '.join(EXPORTS)}")
+    filters = {name: value for name, value in request.query_params.items() if name not in RESERVED_PARAMS}
+    try:
+        stream = export_stream(db, dataset, format, filters, columns)
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filename = f"{dataset}-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(stream, media_type=FORMATS[format], headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Cache-Control": "no-store",
+    })
@@ -0,0 +1,87 @@
+"""
+Import Routes for KUMIA Elite Dashboard
+Bulk CSV/JSON/NDJSON imports of menu items and customers
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from typing import Optional
+import asyncio
+import shutil
+import tempfile
+
+from core import db, get_current_user
+from models import User
+from sync_runtime import menu_publisher, public_cache
+from fast_json import FastJSONResponse
+from bulk_import import BulkImporter, ImportFileError, IMPORTS, FORMATS, IMPORT_INLINE_MAX_BYTES, detect_format
+from routers.marketing import segment_service
+from routers.search import search_service
+from routers.analytics import cohort_service
+
+router = APIRouter(prefix="/api")
+
+bulk_importer = BulkImporter(db)
+# Same side effects as the single-record endpoints, once per import
+bulk_importer.add_listener("menu", menu_publisher.schedule)
+bulk_importer.add_listener("menu", lambda: public_cache.invalidate("menu"))
+bulk_importer.add_listener("customers", segment_service.invalidate_counts)
+bulk_importer.add_listener("customers", cohort_service.invalidate)
+bulk_importer.add_listener("menu", lambda: search_service.schedule_build("menu"))
+bulk_importer.add_listener("customers", lambda: search_service.schedule_build("customers"))
+
+async def startup():
+    await bulk_importer.ensure_indexes()
+
+def _save_upload(upload) -> str:
+    with tempfile.NamedTemporaryFile(prefix="kumia-import-", delete=False) as saved:
+        shutil.copyfileobj(upload, saved)
+        return saved.name
+
+@router.post("/imports/{dataset}")
+async def import_dataset(
+    dataset: str,
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    background: Optional[bool] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Upsert menu items (by id) or customers (by email) from a CSV, JSON array
+    or NDJSON upload. Only the columns present are written to existing records.
+
+    Files up to IMPORT_INLINE_MAX_BYTES are imported right away and the report
+    returned; larger ones (or background=true) become a job to poll at
+    /api/imports/jobs/{job_id}.
+    """
+    if dataset not in IMPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown import '{dataset}'; available: {', '.join(IMPORTS)}")
+    try:
+        import_format = format or detect_format(file.filename, file.content_type)
+    except ImportFileError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if import_format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{import_format}'; available: {', '.join(FORMATS)}")
+
+    if background is None:
+        background = (file.size or 0) > IMPORT_INLINE_MAX_BYTES
+    if not background:
+        report = await bulk_importer.run(dataset, file.file, import_format)
+        return {"status": "completed", "dataset": dataset, "report": report}
+
+    # The upload is closed with the request, so the job reads its own copy
+    path = await asyncio.to_thread(_save_upload, file.file)
+    job = await bulk_importer.start_job(dataset, path, import_format, file.filename, current_user.id)
+    return FastJSONResponse({
+        "job_id": job["id"],
+        "status": job["status"],
+        "dataset": dataset,
+        "status_url": f"/api/imports/jobs/{job['id']}",
+    }, status_code=202)
+
+@router.get("/imports/jobs/{job_id}")
+async def get_import_job(job_id: str, current_user: User = Depends(get_current_user)):
+    """Status, progress and final report of a background import"""
+    job = await bulk_importer.get_job(job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
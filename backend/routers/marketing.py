@@ -0,0 +1,320 @@
+"""
+Marketing Routes for KUMIA Elite Dashboard
+Campaigns, audience segments and A/B tests
+"""
+
+from fastapi import APIRouter, HTTPException, Depends
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+import uuid
+
+from core import db, logger, get_current_user
+from models import User
+from ab_testing import ABTestService, MAX_EVENT_COUNT, MAX_EVENT_BATCH
+from segment_service import SegmentService
+
+router = APIRouter(prefix="/api")
+
+# A/B test counters
+ab_test_service = ABTestService(db)
+
+# Marketing audience segmentation (customer CRUD keeps the counts current)
+segment_service = SegmentService(db)
+
+class CampaignRequest(BaseModel):
+    title: str
+    description: str
+    target_level: str
+    channels: List[str]
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
+# Campaign management endpoints
+@router.post("/marketing/campaigns")
+async def create_campaign(request: CampaignRequest, current_user: User = Depends(get_current_user)):
+    """
+    Create new marketing campaign
+    """
+    try:
+        campaign_data = {
+            "id": str(uuid.uuid4()),
+            "user_id": current_user.id,
+            "title": request.title,
+            "description": request.description,
+            "target_level": request.target_level,
+            "channels": request.channels,
+            "start_date": request.start_date or datetime.utcnow(),
+            "end_date": request.end_date,
+            "status": "active",
+            "created_at": datetime.utcnow()
+        }
+        
+        await db.marketing_campaigns.insert_one(campaign_data)
+        
+        return {
+            "campaign_id": campaign_data["id"],
+            "status": "created",
+            "message": f"Campaign '{request.title}' created successfully"
+        }
+        
+    except Exception as e:
+        logger.error(f"Campaign creation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error creating campaign: {str(e)}")
+
+@router.post("/marketing/campaigns/segmented")
+async def create_segmented_campaign(request: CampaignRequest, current_user: User = Depends(get_current_user)):
+    """
+    Create segmented marketing campaign for specific customer levels
+    """
+    try:
+        # Audience size from the cached segment-cardinality table
+        estimated_reach = await segment_service.get_estimated_reach(request.target_level)
+        
+        # Calculate expected conversion based on segment
+        conversion_rates = {
+            "explorador": "65%",
+            "destacado": "78%", 
+            "estrella": "85%",
+            "leyenda": "95%",
+            "todos": "72%",
+            "inactivos": "45%"
+        }
+        
+        expected_conversion = conversion_rates.get(request.target_level.lower(), "70%")
+        
+        campaign_data = {
+            "id": str(uuid.uuid4()),
+            "user_id": current_user.id,
+            "title": request.title,
+            "description": request.description,
+            "target_level": request.target_level,
+            "channels": request.channels,
+            "start_date": request.start_date or datetime.utcnow(),
+            "end_date": request.end_date,
+            "status": "active",
+            "campaign_type": "segmented",
+            "estimated_reach": estimated_reach,
+            "expected_conversion": expected_conversion,
+            "audience_status": "materializing",
+            "created_at": datetime.utcnow()
+        }
+        
+        await db.marketing_campaigns.insert_one(campaign_data)
+        
+        # Member list is written to campaign_audiences off the request path
+        segment_service.schedule_materialization(campaign_data["id"], request.target_level)
+        
+        return {
+            "campaign_id": campaign_data["id"],
+            "status": "created",
+            "target_segment": request.target_level,
+            "estimated_reach": estimated_reach,
+            "expected_conversion": expected_conversion,
+            "audience_status": "materializing",
+            "message": f"Segmented campaign '{request.title}' created for {request.target_level} segment"
+        }
+        
+    except Exception as e:
+        logger.error(f"Segmented campaign creation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error creating segmented campaign: {str(e)}")
+
+@router.get("/marketing/segments")
+async def get_segment_counts(current_user: User = Depends(get_current_user)):
+    """
+    Get audience size for every customer segment
+    """
+    try:
+        return await segment_service.get_all_counts()
+        
+    except Exception as e:
+        logger.error(f"Segment count error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving segment counts: {str(e)}")
+
+@router.get("/marketing/campaigns/{campaign_id}/audience")
+async def get_campaign_audience(campaign_id: str, chunk: int = 0, current_user: User = Depends(get_current_user)):
+    """
+    Get one materialized audience chunk of a segmented campaign
+    """
+    try:
+        campaign = await db.marketing_campaigns.find_one({"id": campaign_id, "user_id": current_user.id})
+        if not campaign:
+            raise HTTPException(status_code=404, detail="Campaign not found")
+        
+        audience_chunk = await db.campaign_audiences.find_one(
+            {"campaign_id": campaign_id, "chunk": chunk}, {"_id": 0}
+        )
+        
+        return {
+            "campaign_id": campaign_id,
+            "audience_status": campaign.get("audience_status"),
+            "audience_size": campaign.get("audience_size"),
+            "total_chunks": campaign.get("audience_chunks"),
+            "chunk": chunk,
+            "members": audience_chunk["members"] if audience_chunk else []
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Campaign audience error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving campaign audience: {str(e)}")
+
+@router.get("/marketing/campaigns")
+async def get_campaigns(current_user: User = Depends(get_current_user)):
+    """
+    Get all marketing campaigns for current user
+    """
+    try:
+        campaigns = await db.marketing_campaigns.find({"user_id": current_user.id}).to_list(100)
+        return campaigns
+        
+    except Exception as e:
+        logger.error(f"Campaign retrieval error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving campaigns: {str(e)}")
+
+# Campaign lifecycle management
+@router.post("/marketing/campaigns/{campaign_id}/activate")
+async def activate_campaign(campaign_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Activate a campaign
+    """
+    try:
+        result = await db.marketing_campaigns.update_one(
+            {"id": campaign_id, "user_id": current_user.id},
+            {
+                "$set": {
+                    "status": "active",
+                    "activated_at": datetime.utcnow()
+                }
+            }
+        )
+        
+        if result.modified_count == 0:
+            raise HTTPException(status_code=404, detail="Campaign not found")
+        
+        return {
+            "campaign_id": campaign_id,
+            "status": "activated",
+            "message": "Campaign activated successfully"
+        }
+        
+    except Exception as e:
+        logger.error(f"Campaign activation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error activating campaign: {str(e)}")
+
+@router.post("/marketing/campaigns/{campaign_id}/deactivate")
+async def deactivate_campaign(campaign_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Deactivate a campaign
+    """
+    try:
+        result = await db.marketing_campaigns.update_one(
+            {"id": campaign_id, "user_id": current_user.id},
+            {
+                "$set": {
+                    "status": "inactive",
+                    "deactivated_at": datetime.utcnow()
+                }
+            }
+        )
+        
+        if result.modified_count == 0:
+            raise HTTPException(status_code=404, detail="Campaign not found")
+        
+        return {
+            "campaign_id": campaign_id,
+            "status": "deactivated", 
+            "message": "Campaign deactivated successfully"
+        }
+        
+    except Exception as e:
+        logger.error(f"Campaign deactivation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error deactivating campaign: {str(e)}")
+
+# A/B Testing endpoints
+@router.post("/marketing/ab-test")
+async def create_ab_test(request: dict, current_user: User = Depends(get_current_user)):
+    """
+    Create A/B test campaign
+    """
+    try:
+        ab_test_data = {
+            "id": str(uuid.uuid4()),
+            "user_id": current_user.id,
+            "name": request.get("name", "A/B Test"),
+            "variant_a": request.get("variant_a", {}),
+            "variant_b": request.get("variant_b", {}),
+            "traffic_split": request.get("traffic_split", "50% / 50%"),
+            "duration_days": request.get("duration_days", 7),
+            "primary_metric": request.get("primary_metric", "conversion_rate"),
+            "status": "active",
+            "counter_shards": ab_test_service.shards,
+            "created_at": datetime.utcnow()
+        }
+        
+        await db.ab_tests.insert_one(ab_test_data)
+        
+        return {
+            "ab_test_id": ab_test_data["id"],
+            "status": "created",
+            "message": f"A/B test '{ab_test_data['name']}' created successfully"
+        }
+        
+    except Exception as e:
+        logger.error(f"A/B test creation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error creating A/B test: {str(e)}")
+
+class ABTestEvent(BaseModel):
+    variant: str = Field(pattern="^variant_[ab]$")
+    event: str = Field(pattern="^(impression|conversion)$")
+    count: int = Field(default=1, ge=1, le=MAX_EVENT_COUNT)
+
+class ABTestEventBatch(BaseModel):
+    events: List[ABTestEvent] = Field(min_length=1, max_length=MAX_EVENT_BATCH)
+
+@router.post("/marketing/ab-test/{test_id}/events")
+async def track_ab_test_events(test_id: str, batch: ABTestEventBatch):
+    """
+    Ingest impression/conversion events for an A/B test
+    """
+    try:
+        recorded = await ab_test_service.record_events(test_id, [event.dict() for event in batch.events])
+        return {"success": True, "recorded": recorded}
+        
+    except KeyError:
+        raise HTTPException(status_code=404, detail="A/B test not found")
+    except Exception as e:
+        logger.error(f"A/B test event error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error recording A/B test events: {str(e)}")
+
+@router.get("/marketing/ab-test/{test_id}/results")
+async def get_ab_test_results(test_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Get conversion rates, confidence intervals and winner of an A/B test
+    """
+    try:
+        ab_test = await db.ab_tests.find_one({"id": test_id, "user_id": current_user.id})
+        if not ab_test:
+            raise HTTPException(status_code=404, detail="A/B test not found")
+        
+        results = await ab_test_service.get_results(test_id)
+        
+        return {
+            "ab_test_id": test_id,
+            "name": ab_test.get("name"),
+            "status": ab_test.get("status"),
+            "primary_metric": ab_test.get("primary_metric"),
+            "results": results
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"A/B test results error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error computing A/B test results: {str(e)}")
+
+
+async def startup():
+    await ab_test_service.ensure_indexes()
+    await segment_service.ensure_indexes()
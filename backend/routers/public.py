@@ -0,0 +1,139 @@
+"""
+Public Routes for KUMIA Elite Dashboard
+Unauthenticated endpoints consumed by the UserWebApp
+"""
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+import base64
+import binascii
+import hashlib
+
+from core import db
+from models import MenuItem, RestaurantSettings
+import sync_runtime
+from sync_runtime import firestore_enabled, public_cache
+from public_cache import PUBLIC_CACHE_MAX_AGE_SECONDS
+from fast_json import shape_many
+
+router = APIRouter(prefix="/api")
+
+# PUBLIC APIS FOR USERWEBAPP
+# Served from the pre-rendered public_cache; these renderers only run when
+# the underlying data changes (see the invalidate() calls on write paths)
+async def render_restaurant_info():
+    settings = await db.settings.find_one({})
+    if not settings:
+        settings = RestaurantSettings().dict()
+    
+    return {
+        "name": settings.get("name", "IL MANDORLA Smokehouse"),
+        "description": settings.get("description", "Glutenfree • Carnes ahumadas • Fuego lento • Mucho sabor"),
+        "address": settings.get("address", "Asunción, Paraguay"),
+        "phone": settings.get("phone", "+595 21 123456"),
+        "hours": settings.get("hours", "Lun-Dom: 11:00-22:00"),
+        "cuisine_type": settings.get("cuisine_type", "smokehouse")
+    }
+
+def _without_images(menu_items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Inline base64 images would make the menu megabytes; each one has its own cacheable URL instead
+    public_items = []
+    for item in menu_items:
+        public_item = {name: value for name, value in item.items() if name != "image_base64"}
+        if item.get("image_base64") and item.get("id"):
+            public_item["image_url"] = f"/api/public/menu/{item['id']}/image?v={item.get('version', 0)}"
+        public_items.append(public_item)
+    return public_items
+
+async def render_menu():
+    if firestore_enabled():
+        menu_items = sync_runtime.firebase_service.get_public_menu()
+        if menu_items is not None:
+            return _without_images(menu_items)
+    
+    menu_items = await db.menu_items.find({}).to_list(1000)
+    return _without_images(shape_many(MenuItem, menu_items))
+
+async def render_promotions():
+    if firestore_enabled():
+        promotion_data = sync_runtime.firebase_service.get_public_promotions()
+        if promotion_data and "promotions" in promotion_data:
+            return promotion_data["promotions"]
+    
+    # Mock promotions for now
+    return [
+        {
+            "id": "promo_1",
+            "title": "Bienvenida KUMIA",
+            "description": "30 puntos gratis + bebida de cortesía para nuevos usuarios",
+            "points_reward": 30,
+            "valid_until": (datetime.utcnow() + timedelta(days=30)).isoformat()
+        },
+        {
+            "id": "promo_2", 
+            "title": "Happy Hour BBQ",
+            "description": "20% descuento en todas las carnes ahumadas de 17:00 a 19:00",
+            "discount_percentage": 20,
+            "valid_hours": "17:00-19:00"
+        }
+    ]
+
+public_cache.register("restaurant_info", render_restaurant_info)
+public_cache.register("menu", render_menu)
+public_cache.register("promotions", render_promotions)
+
+@router.get("/public/restaurant-info")
+async def get_public_restaurant_info(request: Request):
+    """Public endpoint for UserWebApp to get restaurant basic info"""
+    return await public_cache.respond("restaurant_info", request)
+
+@router.get("/public/table-availability/changes")
+async def get_public_table_availability_changes(since: int = 0):
+    """Public endpoint for UserWebApp to fetch table availability changes after a version"""
+    if not (sync_runtime.sync_service and firestore_enabled()):
+        return {"version": since, "changes": []}
+    return sync_runtime.sync_service.get_table_availability_changes(since)
+
+@router.get("/public/menu")
+async def get_public_menu(request: Request):
+    """Public endpoint for UserWebApp to get current menu"""
+    return await public_cache.respond("menu", request)
+
+@router.get("/public/menu/{item_id}/image")
+async def get_public_menu_image(item_id: str, request: Request):
+    """Public endpoint for UserWebApp to get a menu item's image (linked from the menu's image_url)"""
+    item = await db.menu_items.find_one({"id": item_id}, {"_id": 0, "image_base64": 1})
+    if not item or not item.get("image_base64"):
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    encoded = item["image_base64"]
+    media_type = "image/jpeg"
+    if encoded.startswith("data:"):
+        # Data URL: data:image/png;base64,....
+        header, _, encoded = encoded.partition(",")
+        media_type = header[5:].split(";")[0] or media_type
+    try:
+        image = base64.b64decode(encoded)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    etag = f'"{hashlib.sha256(image).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={PUBLIC_CACHE_MAX_AGE_SECONDS}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=image, media_type=media_type, headers=headers)
+
+@router.get("/public/promotions")
+async def get_public_promotions(request: Request):
+    """Public endpoint for UserWebApp to get active promotions"""
+    return await public_cache.respond("promotions", request)
+
+
+async def startup():
+    sync_runtime.connect()
+    await public_cache.publish_all()
+
+async def shutdown():
+    await sync_runtime.shutdown()
@@ -0,0 +1,58 @@
+"""
+Search Routes for KUMIA Elite Dashboard
+Full-text search and type-ahead over customers and the menu
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+
+from core import db, get_current_user
+from models import User
+from search_index import SEARCHES, SUGGEST_LIMIT, SearchService
+
+router = APIRouter(prefix="/api")
+
+# Customer and menu search (CRUD keeps the type-ahead index current)
+search_service = SearchService(db)
+
+# Fields returned by full-text search
+RESULT_FIELDS = {
+    "customers": ("id", "name", "email", "phone", "nft_level", "points", "last_visit"),
+    "menu": ("id", "name", "description", "category", "price", "is_active"),
+}
+
+async def startup():
+    await search_service.ensure_indexes()
+    for name in SEARCHES:
+        search_service.schedule_build(name)
+
+def _datasets(dataset: Optional[str]):
+    if dataset is None:
+        return list(SEARCHES)
+    if dataset not in SEARCHES:
+        raise HTTPException(status_code=404, detail=f"Unknown search '{dataset}'; available: {', '.join(SEARCHES)}")
+    return [dataset]
+
+@router.get("/search")
+async def search(
+    q: str = Query(..., min_length=1),
+    dataset: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user)
+):
+    """Full-text search (MongoDB text index), best matches first, e.g. /api/search?q=brisket ahumado"""
+    results = {}
+    for name in _datasets(dataset):
+        projection = {field_name: 1 for field_name in RESULT_FIELDS[name]}
+        results[name] = await search_service.text_search(name, q, limit, projection)
+    return results
+
+@router.get("/search/suggest")
+async def suggest(
+    q: str = Query(..., min_length=1),
+    dataset: Optional[str] = None,
+    limit: int = Query(SUGGEST_LIMIT, ge=1, le=50),
+    current_user: User = Depends(get_current_user)
+):
+    """Type-ahead on names, emails, phones and menu items; tolerates a typo, e.g. /api/search/suggest?q=rodrigues"""
+    return {name: await search_service.suggest(name, q, limit) for name in _datasets(dataset)}
@@ -0,0 +1,263 @@
+"""
+Sync Routes for KUMIA Elite Dashboard
+Tables, reservations and Dashboard → UserWebApp synchronization
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, Header
+from datetime import datetime
+from typing import Optional
+import uuid
+
+from core import db, get_current_user
+from models import User, NewReservationRequest, CustomerActivityTrack, SyncMenuRequest, SyncPromotionRequest
+from availability_index import default_floor_plan
+from menu_publisher import item_hash
+import sync_runtime
+from sync_runtime import ensure_local_availability_day, local_availability, table_assigner, sync_outbox, menu_publisher, notification_outbox, firestore_enabled, availability_for_day
+
+router = APIRouter(prefix="/api")
+
+# TABLES MANAGEMENT
+@router.get("/tables/availability")
+async def get_table_availability(date: str, time: str, guests: int = 1, current_user: User = Depends(get_current_user)):
+    """Get available tables for specific date and time"""
+    if firestore_enabled():
+        return sync_runtime.firebase_service.get_table_availability(date, time, guests)
+    
+    # Fallback: index over MongoDB reservations
+    await ensure_local_availability_day(date)
+    return [{**table, "status": "available"} for table in local_availability.free_tables(date, time, guests)]
+
+@router.get("/tables")
+async def get_all_tables(current_user: User = Depends(get_current_user)):
+    """Get all restaurant tables with current status"""
+    # Return configured tables: 6 tables (2 persons), 12 tables (4 persons), 2 tables (6 persons)
+    return default_floor_plan()
+
+# ENHANCED RESERVATIONS
+@router.post("/reservations/new")
+async def create_new_reservation(reservation: NewReservationRequest, current_user: User = Depends(get_current_user)):
+    """Create new reservation with automatic confirmations"""
+    try:
+        reservation_id = str(uuid.uuid4())
+        date, time = reservation.reservation_date, reservation.reservation_time
+        
+        # Claim the requested table, or let the assignment engine pick the best fit
+        index = await availability_for_day(date)
+        if reservation.table_id:
+            if reservation.table_id not in index.tables_by_id:
+                raise HTTPException(status_code=422, detail=f"Mesa desconocida: {reservation.table_id}")
+            table_ids = [reservation.table_id]
+            if not await table_assigner.claim(index, reservation_id, table_ids, date, time):
+                raise HTTPException(status_code=409, detail="La mesa seleccionada no está disponible en ese horario")
+        else:
+            table_ids = await table_assigner.assign(index, reservation_id, date, time, reservation.guests)
+            if not table_ids:
+                raise HTTPException(status_code=409, detail="No hay mesas disponibles para ese horario")
+        
+        # Prepare reservation data
+        reservation_data = {
+            "id": reservation_id,
+            "customer_name": reservation.customer_name,
+            "customer_email": reservation.customer_email,
+            "whatsapp_phone": reservation.whatsapp_phone,
+            "date": date,
+            "time": time,
+            "guests": reservation.guests,
+            "table_id": table_ids[0],
+            "table_ids": table_ids,
+            "special_notes": reservation.special_notes,
+            "allergies": reservation.allergies,
+            "status": "confirmed",
+            "source": "dashboard",
+            "created_by": current_user.email,
+            "created_at": datetime.utcnow().isoformat()
+        }
+        
+        committed = False
+        confirmations_queued = False
+        
+        async def persist(session):
+            nonlocal committed, confirmations_queued
+            await db.reservations.insert_one(dict(reservation_data), session=session)
+            if session is None:
+                # No transaction: the booking stands from here on
+                committed = True
+                return
+            # Email, WhatsApp and AI confirmations are queued with the booking, not sent inline
+            await notification_outbox.enqueue_reservation_confirmations(reservation_data, session=session)
+            confirmations_queued = True
+        
+        try:
+            # Stored in MongoDB; the outbox relay syncs it to the UserWebApp
+            if firestore_enabled():
+                await sync_outbox.write_with_event(persist, "reservation.create", reservation_data, f"reservation.create:{reservation_id}")
+            else:
+                await persist(None)
+                print(f"✅ Reservation created (fallback): {reservation_data['id']}")
+        except Exception as e:
+            if not committed:
+                await table_assigner.release(index, reservation_id)
+                raise
+            # A committed booking is never reported as failed
+            print(f"⚠️ Reservation {reservation_id} saved but its sync event was not queued: {e}")
+        
+        if confirmations_queued:
+            notification_outbox.wake()
+        else:
+            try:
+                await notification_outbox.enqueue_reservation_confirmations(reservation_data)
+            except Exception as e:
+                print(f"⚠️ Confirmations for reservation {reservation_id} not queued yet, the reconciler will retry: {e}")
+        
+        return {
+            "success": True,
+            "reservation_id": reservation_data["id"],
+            "message": "Reserva creada exitosamente. Confirmaciones en camino por email y WhatsApp.",
+            "reservation": reservation_data
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error creating reservation: {e}")
+        raise HTTPException(status_code=500, detail=f"Error creating reservation: {str(e)}")
+
+@router.post("/reservations/{reservation_id}/cancel")
+async def cancel_reservation(reservation_id: str, current_user: User = Depends(get_current_user)):
+    """Cancel a reservation and release its table"""
+    try:
+        reservation = await db.reservations.find_one({"id": reservation_id}, {"_id": 0, "date": 1, "table_id": 1, "table_ids": 1})
+        if reservation is None and firestore_enabled():
+            # Reservations made before the sync outbox only exist in Firestore
+            reservation = sync_runtime.firebase_service.get_reservation(reservation_id)
+        if reservation is None:
+            raise HTTPException(status_code=404, detail="Reservation not found")
+        
+        async def persist(session):
+            await db.reservations.update_one(
+                {"id": reservation_id},
+                {"$set": {"status": "cancelled", "cancelled_at": datetime.utcnow()}},
+                session=session
+            )
+        
+        if firestore_enabled():
+            cancellation = {
+                "id": reservation_id,
+                "date": reservation.get("date"),
+                "table_ids": reservation.get("table_ids") or [reservation.get("table_id")]
+            }
+            await sync_outbox.write_with_event(persist, "reservation.cancel", cancellation, f"reservation.cancel:{reservation_id}")
+            await table_assigner.release(sync_runtime.firebase_service.availability, reservation_id)
+        else:
+            await persist(None)
+            await table_assigner.release(local_availability, reservation_id)
+        
+        return {"success": True, "reservation_id": reservation_id, "status": "cancelled"}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error cancelling reservation: {e}")
+        raise HTTPException(status_code=500, detail=f"Error cancelling reservation: {str(e)}")
+
+@router.get("/reservations/{reservation_id}/notifications")
+async def get_reservation_notifications(reservation_id: str, current_user: User = Depends(get_current_user)):
+    """Delivery status of a reservation's confirmation messages"""
+    return await notification_outbox.get_status(reservation_id)
+
+# CUSTOMER ACTIVITY TRACKING 
+@router.post("/sync/customer-activity")
+async def track_customer_activity(activity: CustomerActivityTrack):
+    """Track customer activity from UserWebApp for marketing intelligence"""
+    try:
+        if sync_runtime.sync_service:
+            success = sync_runtime.sync_service.sync_user_activity_to_dashboard(activity.dict())
+            if success:
+                return {"success": True, "message": "Activity tracked successfully"}
+        
+        # Fallback: store in MongoDB
+        activity_data = activity.dict()
+        activity_data["timestamp"] = datetime.utcnow()
+        await db.customer_activities.insert_one(activity_data)
+        
+        return {"success": True, "message": "Activity tracked (fallback)"}
+        
+    except Exception as e:
+        print(f"❌ Error tracking customer activity: {e}")
+        raise HTTPException(status_code=500, detail=f"Error tracking activity: {str(e)}")
+
+# MENU SYNCHRONIZATION
+@router.get("/sync/mirror")
+async def get_sync_mirror_status(current_user: User = Depends(get_current_user)):
+    """Versions and health of the in-memory Firestore mirror"""
+    if not firestore_enabled():
+        return {"enabled": False, "collections": {}}
+    return {"enabled": True, "collections": sync_runtime.firebase_service.get_mirror_status()}
+
+@router.get("/sync/outbox")
+async def get_sync_outbox_stats(current_user: User = Depends(get_current_user)):
+    """Backlog and delivery lag of the Dashboard → UserWebApp sync outbox"""
+    return {"relay_running": firestore_enabled(), **(await sync_outbox.get_stats())}
+
+@router.post("/sync/outbox/retry")
+async def retry_failed_sync_events(current_user: User = Depends(get_current_user)):
+    """Requeue sync events that exhausted their delivery attempts"""
+    return {"success": True, "requeued": await sync_outbox.retry_failed()}
+
+@router.post("/sync/menu")
+async def sync_menu_to_userwebapp(request: SyncMenuRequest, current_user: User = Depends(get_current_user)):
+    """Publish menu changes from Dashboard to UserWebApp"""
+    if not firestore_enabled():
+        # Nothing would ever relay the event
+        return {"success": False, "message": "UserWebApp sync is disabled; menu not queued"}
+    try:
+        result = await menu_publisher.publish(request.menu_data.get("items"))
+        message = "Menu queued for UserWebApp sync" if result["published"] else "Menu already up to date"
+        return {"success": True, "message": message, **result}
+        
+    except Exception as e:
+        print(f"❌ Error syncing menu: {e}")
+        raise HTTPException(status_code=500, detail=f"Error syncing menu: {str(e)}")
+
+# PROMOTION SYNCHRONIZATION
+@router.post("/sync/promotions")
+async def sync_promotions_to_userwebapp(
+    request: SyncPromotionRequest,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Sync promotion changes from Dashboard to UserWebApp. Resending the
+    promotions already queued last (or reusing an Idempotency-Key) is a no-op.
+    """
+    if not firestore_enabled():
+        # Nothing would ever relay the event
+        return {"success": False, "message": "UserWebApp sync is disabled; promotions not queued"}
+    try:
+        payload = {"promotion_data": request.promotion_data}
+        if idempotency_key:
+            key = f"promotions.set:{idempotency_key}"
+        else:
+            latest = await db.sync_outbox.find_one({"op": "promotions.set"}, {"seq": 1, "payload": 1}, sort=[("seq", -1)])
+            if latest and latest["payload"] == payload:
+                return {"success": True, "message": "Promotions already queued", "sync_seq": latest["seq"]}
+            # Same content after different promotions is a new event
+            key = f"promotions.set:{item_hash(payload)}:{latest['seq'] if latest else 0}"
+        
+        # Delivered by the outbox relay once Firestore accepts it
+        seq = await sync_outbox.enqueue("promotions.set", payload, key)
+        if seq is None:
+            return {"success": True, "message": "Promotions already queued", "sync_seq": None}
+        return {"success": True, "message": "Promotions queued for UserWebApp sync", "sync_seq": seq}
+        
+    except Exception as e:
+        print(f"❌ Error syncing promotions: {e}")
+        raise HTTPException(status_code=500, detail=f"Error syncing promotions: {str(e)}")
+
+
+async def startup():
+    await sync_runtime.start_workers()
+
+async def shutdown():
+    await sync_runtime.shutdown()
@@ -0,0 +1,388 @@
+"""
+Search Index for KUMIA Elite Dashboard
+MongoDB full-text search plus an in-process token index for typo-tolerant type-ahead
+"""
+
+import asyncio
+import bisect
+import re
+import string
+import unicodedata
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pymongo import TEXT
+
+SUGGEST_LIMIT = 10
+BUILD_BATCH_SIZE = 5000
+# Query words shorter than this only match as prefixes; shorter typos match almost anything
+FUZZY_MIN_LENGTH = 4
+# Tokens one typo away that are looked at per query word
+FUZZY_TOKENS = 5000
+# Documents looked at per pass of a query, so very common words stay fast
+MAX_CANDIDATES = 5000
+# Documents looked at for the best typo matches of a query with several words
+FUZZY_CANDIDATES = 2000
+
+_WORDS = re.compile(r"[a-z0-9]+")
+_NON_DIGITS = re.compile(r"\D+")
+_LETTERS = string.ascii_lowercase
+_ALPHABET = string.ascii_lowercase + string.digits
+
+
+@dataclass(frozen=True)
+class SearchSpec:
+    collection: str
+    # Indexed for type-ahead and returned with each suggestion
+    fields: Tuple[str, ...]
+    # MongoDB text index fields and their weights
+    text_weights: Dict[str, int]
+    text_language: str = "none"
+    # Also indexed as digit strings, so "981 123" finds "+595 981-123 456"
+    phone_fields: Tuple[str, ...] = field(default_factory=tuple)
+
+
+SEARCHES = {
+    "customers": SearchSpec(
+        collection="customers", fields=("name", "email", "phone"),
+        text_weights={"name": 10, "email": 5, "phone": 5}, phone_fields=("phone",),
+    ),
+    "menu": SearchSpec(
+        collection="menu_items", fields=("name", "category"),
+        text_weights={"name": 10, "category": 5, "description": 1}, text_language="spanish",
+    ),
+}
+
+
+def normalize(text: Any) -> str:
+    """Lower case without accents, so "José" and "jose" are the same word"""
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def query_words(query: str) -> List[str]:
+    words = _WORDS.findall(normalize(query))
+    if words and all(word.isdigit() for word in words):
+        # A phone number typed in groups, with or without the trunk 0
+        return ["".join(words).lstrip("0") or "0"]
+    return words
+
+
+# Typo kinds, likeliest first: swapped letters, then a missing or extra letter, then a wrong one
+SWAPPED, MISSING_OR_EXTRA, WRONG = range(3)
+
+
+def typo_variants(word: str) -> Dict[str, int]:
+    """
+    Prefixes a token must start with to be one typo (a missing, extra, wrong
+    or swapped letter) away from `word`, with the kind of typo each one is.
+    A typo in the last letter leaves just `word[:-1]`, which already covers
+    every other ending.
+    """
+    alphabet = _LETTERS if word.isalpha() else _ALPHABET
+    variants = {word[:-1]: WRONG}
+
+    def add(variant: str, kind: int):
+        if variants.get(variant, kind) >= kind:
+            variants[variant] = kind
+
+    for i in range(len(word) - 1):
+        start, rest = word[:i], word[i + 1:]
+        add(start + rest, MISSING_OR_EXTRA)
+        add(start + word[i + 1] + word[i] + word[i + 2:], SWAPPED)
+        for char in alphabet:
+            add(start + char + rest, WRONG)
+            add(start + char + word[i:], MISSING_OR_EXTRA)
+    variants.pop(word, None)
+    return variants
+
+
+class TokenIndex:
+    """
+    Words of the indexed fields (the "tokens") map to the documents that
+    contain them, and a sorted list of the distinct tokens answers prefix
+    queries with a binary search. A typo is handled the same way: every
+    prefix one edit away from the query word is looked up in the sorted
+    list, which is a few hundred binary searches instead of a scan.
+
+    Queries with several words are driven by the word with the fewest
+    matches; the others are checked against each candidate's normalized
+    text. Updates append the new version of a document and tombstone the
+    old one instead of removing it from every posting; a rebuild compacts.
+    """
+
+    def __init__(self, spec: SearchSpec):
+        self.spec = spec
+        self._ids: List[Optional[str]] = []
+        self._values: List[Optional[Tuple[Any, ...]]] = []
+        # " token token ..." per document, for checking the other words of a query
+        self._texts: List[Optional[str]] = []
+        self._numbers: Dict[str, int] = {}
+        # token -> document number, or an array of them once there are several
+        self._postings: Dict[str, Any] = {}
+        self._sorted: List[str] = []
+        self._bulk = False
+        self.tombstones = 0
+
+    def __len__(self):
+        return len(self._numbers)
+
+    # WRITES
+    def document_tokens(self, document: Dict[str, Any]) -> set:
+        tokens = set()
+        for name in self.spec.fields:
+            value = document.get(name)
+            if not value:
+                continue
+            tokens.update(_WORDS.findall(normalize(value)))
+            if name in self.spec.phone_fields:
+                groups = [group for group in _NON_DIGITS.split(str(value)) if group]
+                for start in range(len(groups)):
+                    tokens.add("".join(groups[start:]).lstrip("0"))
+        tokens.discard("")
+        return tokens
+
+    def upsert(self, document: Dict[str, Any]):
+        self.remove(document["id"])
+        number = len(self._ids)
+        tokens = self.document_tokens(document)
+        self._ids.append(document["id"])
+        self._values.append(tuple(document.get(name) for name in self.spec.fields))
+        self._texts.append(" " + " ".join(tokens))
+        self._numbers[document["id"]] = number
+        for token in tokens:
+            posting = self._postings.get(token)
+            if posting is None:
+                self._postings[token] = number
+                if not self._bulk:
+                    bisect.insort(self._sorted, token)
+            elif isinstance(posting, int):
+                self._postings[token] = array("i", (posting, number))
+            else:
+                posting.append(number)
+
+    def remove(self, document_id: str):
+        number = self._numbers.pop(document_id, None)
+        if number is not None:
+            self._ids[number] = self._values[number] = self._texts[number] = None
+            self.tombstones += 1
+
+    def load(self, documents: Iterable[Dict[str, Any]]):
+        """Add many documents at once; the token list is sorted once at the end by finish()"""
+        self._bulk = True
+        for document in documents:
+            self.upsert(document)
+
+    def finish(self):
+        self._sorted = sorted(self._postings)
+        self._bulk = False
+
+    # QUERIES
+    def _documents(self, token: str) -> Iterable[int]:
+        posting = self._postings.get(token)
+        if posting is None:
+            return ()
+        return (posting,) if isinstance(posting, int) else posting
+
+    def _prefix_range(self, prefix: str) -> Tuple[int, int]:
+        start = bisect.bisect_left(self._sorted, prefix)
+        return start, bisect.bisect_left(self._sorted, prefix + "\uffff", start)
+
+    def _tokens(self, ranges: List[Tuple[int, int]]) -> Iterator[str]:
+        for start, end in ranges:
+            for position in range(start, end):
+                yield self._sorted[position]
+
+    def _posting_size(self, token: str) -> int:
+        posting = self._postings.get(token)
+        return 1 if isinstance(posting, int) else len(posting or ())
+
+    def _typo_tokens(self, word: str) -> List[str]:
+        """
+        Up to FUZZY_TOKENS tokens starting one typo away from `word`, less
+        those starting with `word` (exact matches, found already). Likelier
+        typos come first and, within a kind, the tokens in more documents, so
+        "jsoe" reaches "jose" before the "bsoe..." an alphabetical walk finds.
+        """
+        if len(word) < FUZZY_MIN_LENGTH or word.isdigit():
+            return []
+        exact_start, exact_end = self._prefix_range(word)
+        kinds: Dict[str, int] = {}
+        for variant, kind in sorted(typo_variants(word).items(), key=lambda variant: variant[1]):
+            start, end = self._prefix_range(variant)
+            for position in range(start, end):
+                if len(kinds) >= FUZZY_TOKENS:
+                    break
+                if not exact_start <= position < exact_end:
+                    kinds.setdefault(self._sorted[position], kind)
+        return sorted(kinds, key=lambda token: (kinds[token], -self._posting_size(token)))
+
+    def _document_count(self, ranges: List[Tuple[int, int]], stop: int) -> int:
+        count = 0
+        for token in self._tokens(ranges):
+            count += self._posting_size(token)
+            if count > stop:
+                break
+        return count
+
+    def suggest(self, query: str, limit: int = SUGGEST_LIMIT) -> List[Dict[str, Any]]:
+        words = query_words(query)
+        if not words:
+            return []
+        prefixes = {word: [self._prefix_range(word)] for word in words}
+        driver = words[0]
+        if len(words) > 1:
+            # Drive the search by the word matching the fewest documents
+            counts: Dict[str, int] = {}
+            for word in sorted(words, key=lambda word: prefixes[word][0][1] - prefixes[word][0][0]):
+                counts[word] = self._document_count(prefixes[word], min(counts.values(), default=MAX_CANDIDATES))
+            driver = min(words, key=counts.get)
+        others = [word for word in words if word != driver]
+
+        # Score: 2 per word matched as a prefix, 1 per word matched with a typo
+        results: Dict[int, int] = {}
+        for fuzzy in (False, True):
+            if len(results) >= limit:
+                break
+            typos: Dict[str, Optional[set]] = {word: None for word in others}
+            scored_tokens = [(self._tokens(prefixes[driver]), 2)] + ([(self._typo_tokens(driver), 1)] if fuzzy else [])
+            checked = 0
+            for tokens, score in scored_tokens:
+                for token in tokens:
+                    for number in self._documents(token):
+                        checked += 1
+                        text = self._texts[number]
+                        if text is None or number in results:
+                            continue
+                        total = score
+                        for word in others:
+                            if " " + word in text:
+                                total += 2
+                                continue
+                            if fuzzy:
+                                if typos[word] is None:
+                                    typos[word] = set(self._typo_tokens(word))
+                                if typos[word] and not typos[word].isdisjoint(text.split()):
+                                    total += 1
+                                    continue
+                            break
+                        else:
+                            results[number] = total
+                        # Exact matches all score the same, so the first page of them will do;
+                        # typo matches do not, so a few more are looked at
+                        enough = len(results) >= limit and (not fuzzy or not others or checked >= FUZZY_CANDIDATES)
+                        if enough or checked >= MAX_CANDIDATES:
+                            break
+                    else:
+                        continue
+                    break
+                else:
+                    continue
+                break
+
+        best = sorted(results.items(), key=lambda result: -result[1])[:limit]
+        return [
+            {"id": self._ids[number], **dict(zip(self.spec.fields, self._values[number])), "score": score}
+            for number, score in best
+        ]
+
+
+class SearchService:
+    """
+    Full-text search goes to MongoDB text indexes. Type-ahead is answered
+    from a TokenIndex per dataset, built in the background at startup and
+    kept current by the CRUD endpoints; until it is ready, type-ahead falls
+    back to a prefix regex query.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.indexes: Dict[str, TokenIndex] = {}
+        self._builds: Dict[str, asyncio.Task] = {}
+        # Writes made while a build is running, replayed on the new index
+        self._pending: Dict[str, List[Tuple[str, Any]]] = {}
+
+    async def ensure_indexes(self):
+        for name, spec in SEARCHES.items():
+            await self.db[spec.collection].create_index(
+                [(field_name, TEXT) for field_name in spec.text_weights],
+                weights=spec.text_weights, default_language=spec.text_language, name=f"{name}_text_search",
+            )
+
+    # BUILDING
+    def schedule_build(self, name: str) -> asyncio.Task:
+        """(Re)build the dataset's type-ahead index in the background; a build already running is reused"""
+        task = self._builds.get(name)
+        if task is None:
+            task = asyncio.create_task(self.build(name))
+            self._builds[name] = task
+            task.add_done_callback(lambda _: self._builds.pop(name, None))
+        return task
+
+    async def build(self, name: str) -> TokenIndex:
+        spec = SEARCHES[name]
+        index = TokenIndex(spec)
+        self._pending[name] = []
+        try:
+            projection = {"_id": 0, "id": 1, **{field_name: 1 for field_name in spec.fields}}
+            batch: List[Dict[str, Any]] = []
+            async for document in self.db[spec.collection].find({}, projection).batch_size(BUILD_BATCH_SIZE):
+                batch.append(document)
+                if len(batch) >= BUILD_BATCH_SIZE:
+                    await asyncio.to_thread(index.load, batch)
+                    batch = []
+            await asyncio.to_thread(index.load, batch)
+            await asyncio.to_thread(index.finish)
+            for action, value in self._pending[name]:
+                if action == "upsert":
+                    index.upsert(value)
+                else:
+                    index.remove(value)
+            self.indexes[name] = index
+            print(f"✅ Search index for {name} ready ({len(index)} documents)")
+            return index
+        finally:
+            del self._pending[name]
+
+    # KEEPING CURRENT
+    def upsert(self, name: str, document: Dict[str, Any]):
+        if name in self._pending:
+            self._pending[name].append(("upsert", document))
+        index = self.indexes.get(name)
+        if index is not None:
+            index.upsert(document)
+            if index.tombstones > max(1000, len(index) // 4):
+                self.schedule_build(name)
+
+    def remove(self, name: str, document_id: str):
+        if name in self._pending:
+            self._pending[name].append(("remove", document_id))
+        index = self.indexes.get(name)
+        if index is not None:
+            index.remove(document_id)
+
+    # QUERIES
+    async def suggest(self, name: str, query: str, limit: int = SUGGEST_LIMIT) -> List[Dict[str, Any]]:
+        index = self.indexes.get(name)
+        if index is not None:
+            return index.suggest(query, limit)
+
+        spec = SEARCHES[name]
+        words = query.split()
+        if not words:
+            return []
+        pattern = {"$regex": f"^{re.escape(words[0])}", "$options": "i"}
+        projection = {"_id": 0, "id": 1, **{field_name: 1 for field_name in spec.fields}}
+        documents = await self.db[spec.collection].find(
+            {"$or": [{field_name: pattern} for field_name in spec.fields]}, projection
+        ).limit(limit).to_list(limit)
+        return [{"id": document.get("id"), **{f: document.get(f) for f in spec.fields}} for document in documents]
+
+    async def text_search(self, name: str, query: str, limit: int, projection: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Documents matching the words of `query` (stemmed for the menu), best matches first"""
+        score = {"$meta": "textScore"}
+        cursor = self.db[SEARCHES[name].collection].find(
+            {"$text": {"$search": query}}, {**projection, "_id": 0, "score": score}
+        ).sort([("score", score)]).limit(limit)
+        return await cursor.to_list(limit)
@@ -1,5 +1,8 @@
+import argparse
 import asyncio
 import os
+import time
+import unicodedata
 from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timedelta
 import uuid
@@ -268,5 +271,275 @@ async def seed_database():
     
     client.close()
 
+
+# SYNTHETIC DATA AT SCALE
+# Customers per scale; the other collections are sized relative to the customers
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+PER_CUSTOMER = {
+    "feedback": 0.3,
+    "reservations": 0.6,
+    "conversations": 0.8,
+    "customer_activities": 5,
+}
+CAMPAIGNS_PER_10K_CUSTOMERS = 5
+SYNTHETIC_COLLECTIONS = ["customers", *PER_CUSTOMER, "marketing_campaigns"]
+
+FIRST_NAMES = [
+    "Carlos", "María", "Luis", "Ana", "Pedro", "Sofía", "Diego", "Carmen", "Roberto", "Laura", "Fernando", "Patricia",
+    "Javier", "Lucía", "Andrés", "Valentina", "Miguel", "Camila", "Jorge", "Isabel", "Ricardo", "Paula", "Tomás", "Elena",
+]
+LAST_NAMES = [
+    "Mendoza", "González", "Rodríguez", "Martínez", "Sánchez", "López", "Herrera", "Ruiz", "Silva", "Jiménez", "Torres",
+    "Morales", "Benítez", "Acosta", "Romero", "Giménez", "Duarte", "Villalba", "Cabrera", "Ortiz", "Fernández", "Ramírez",
+]
+EMAIL_DOMAINS = ["gmail.com", "hotmail.com", "outlook.com", "yahoo.com", "icloud.com"]
+DISHES = ["Asado de Tira Premium", "Brisket Smokehouse", "Pulled Pork Sandwich", "Alitas Ahumadas", "Costillas Baby Back"]
+FEEDBACK_BY_RATING = {
+    1: ["La comida llegó fría y tardó más de una hora", "Muy mala atención, no volvemos"],
+    2: ["El brisket estaba seco esta vez", "Demasiado ruido y la reserva no estaba lista"],
+    3: ["Comida correcta, pero el servicio fue lento", "Buen sabor, porciones algo pequeñas"],
+    4: ["Muy buen ambiente y la carne ahumada es espectacular", "Servicio rápido y amable. Volveremos pronto"],
+    5: ["Excelente comida y servicio. El asado estaba perfecto!", "El brisket es el mejor que he probado en la ciudad"],
+}
+CHAT_MESSAGES = [
+    "¿Tienen mesa para 4 esta noche?", "¿Cuál es el horario del domingo?", "¿Qué me recomiendan para compartir?",
+    "¿Tienen opciones vegetarianas?", "Quiero cambiar mi reserva", "¿Cuántos puntos tengo?", "¿Hacen delivery?",
+]
+ACTIVITY_TYPES = ["menu_view", "login", "game_play", "order", "feedback", "reservation", "reward_redeem"]
+ACTIVITY_WEIGHTS = [40, 25, 12, 12, 4, 5, 2]
+RESERVATION_TIMES = ["12:00", "13:00", "14:00", "19:00", "20:00", "20:30", "21:00", "22:00"]
+TABLE_CAPACITIES = [2] * 6 + [4] * 12 + [6] * 2  # default floor plan, table_1 .. table_20
+CAMPAIGN_LEVELS = ["todos", "explorador", "destacado", "estrella", "leyenda", "inactivos"]
+CHANNELS = ["whatsapp", "instagram", "facebook", "email"]
+
+
+def customer_id(index: int) -> str:
+    """Stable id of the index-th synthetic customer, so other collections can reference it without a lookup"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"kumia-seed/customer/{index}"))
+
+
+def customer_name(index: int) -> str:
+    return f"{FIRST_NAMES[index % len(FIRST_NAMES)]} {LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]}"
+
+
+def _ascii(text: str) -> str:
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower().replace(" ", ".")
+
+
+def _regular(rng: random.Random, customers: int) -> int:
+    """A customer index skewed towards the low indices, i.e. a few regulars account for most of the traffic"""
+    return int(customers * rng.random() ** 3)
+
+
+def generate_customers(rng: random.Random, count: int, as_of: datetime):
+    for i in range(count):
+        # More recent sign-ups than old ones; about a third has not visited in the last two months
+        first_visit = as_of - timedelta(days=1095 * (1 - rng.random() ** 0.5), seconds=rng.randrange(86400))
+        since_first = as_of - first_visit
+        if rng.random() < 0.35 and since_first > timedelta(days=61):
+            last_visit = first_visit + (since_first - timedelta(days=61)) * rng.random()
+        else:
+            last_visit = as_of - min(since_first, timedelta(days=60)) * rng.random()
+        total_orders = 1 + int(rng.lognormvariate(1.2, 0.9))
+        name = customer_name(i)
+        yield {
+            "id": customer_id(i),
+            "name": name,
+            "email": f"{_ascii(name)}{i}@{rng.choice(EMAIL_DOMAINS)}",
+            "phone": f"+595 9{rng.randrange(10)}{rng.randrange(10)} {i % 1_000_000:06d}",
+            "first_visit": first_visit,
+            "last_visit": last_visit,
+            "birthday": datetime(1950 + rng.randrange(55), rng.randint(1, 12), rng.randint(1, 28)),
+            "anniversary_date": first_visit if rng.random() < 0.3 else None,
+            "nft_level": rng.choices(["bronce", "plata", "oro", "citizen_kumia"], weights=[55, 25, 15, 5])[0],
+            "points": int(rng.lognormvariate(3.6, 0.5)),
+            "referrals": int(rng.expovariate(1.5)),
+            "next_reward": rng.choice(["plata", "oro", "citizen_kumia"]),
+            "preferred_dish": rng.choice(DISHES),
+            "total_orders": total_orders,
+            "total_spent": round(total_orders * max(8.0, rng.gauss(32, 9)), 2),
+            "created_at": first_visit,
+        }
+
+
+def generate_feedback(rng: random.Random, count: int, customers: int, as_of: datetime):
+    for _ in range(count):
+        index = _regular(rng, customers)
+        rating = rng.choices([1, 2, 3, 4, 5], weights=[3, 4, 10, 30, 53])[0]
+        yield {
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "customer_id": customer_id(index),
+            "customer_name": customer_name(index),
+            "rating": rating,
+            "comment": rng.choice(FEEDBACK_BY_RATING[rating]),
+            "created_at": as_of - timedelta(days=365 * rng.random() ** 1.5),
+            "is_approved": rating >= 3 or rng.random() < 0.5,
+        }
+
+
+def generate_reservations(rng: random.Random, count: int, customers: int, as_of: datetime):
+    # Reservations fill the floor plan slot by slot, backwards from 30 days ahead,
+    # so no two active reservations share a table at the same time
+    slots_per_day = len(RESERVATION_TIMES) * len(TABLE_CAPACITIES)
+    last_day = as_of + timedelta(days=30)
+    for i in range(count):
+        day = last_day - timedelta(days=i // slots_per_day)
+        table = i % len(TABLE_CAPACITIES)
+        index = _regular(rng, customers)
+        name = customer_name(index)
+        if day.date() >= as_of.date():
+            status = rng.choices(["confirmed", "cancelled"], weights=[92, 8])[0]
+        else:
+            status = rng.choices(["completed", "cancelled", "no_show"], weights=[85, 10, 5])[0]
+        yield {
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "customer_id": customer_id(index),
+            "customer_name": name,
+            "customer_email": f"{_ascii(name)}{index}@gmail.com",
+            "email": f"{_ascii(name)}{index}@gmail.com",
+            "phone": f"+595 981 {index % 1_000_000:06d}",
+            "whatsapp_phone": f"+595 981 {index % 1_000_000:06d}",
+            "date": day.strftime("%Y-%m-%d"),
+            "time": RESERVATION_TIMES[(i // len(TABLE_CAPACITIES)) % len(RESERVATION_TIMES)],
+            "guests": rng.randint(1, TABLE_CAPACITIES[table]),
+            "table_id": f"table_{table + 1}",
+            "table_ids": [f"table_{table + 1}"],
+            "status": status,
+            "source": rng.choices(["userwebapp", "dashboard", "whatsapp"], weights=[60, 25, 15])[0],
+            "special_notes": rng.choice([None, None, None, "Mesa cerca de la ventana", "Celebración de cumpleaños"]),
+            "created_at": (day - timedelta(days=rng.randrange(14))).isoformat(),
+        }
+
+
+def generate_conversations(rng: random.Random, count: int, customers: int, as_of: datetime, user_id: str):
+    for _ in range(count):
+        message = rng.choice(CHAT_MESSAGES)
+        yield {
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "user_id": user_id,
+            "session_id": f"session_{customer_id(_regular(rng, customers))[:8]}",
+            "channel": rng.choices(CHANNELS[:3] + ["general"], weights=[55, 25, 10, 10])[0],
+            "user_message": message,
+            "ai_response": f"¡Hola! Con gusto te ayudamos: {message.lower()}",
+            "created_at": as_of - timedelta(days=180 * rng.random() ** 2, seconds=rng.randrange(86400)),
+        }
+
+
+def generate_activities(rng: random.Random, count: int, customers: int, as_of: datetime):
+    for _ in range(count):
+        activity_type = rng.choices(ACTIVITY_TYPES, weights=ACTIVITY_WEIGHTS)[0]
+        data = {"source_screen": rng.choice(["home", "menu", "rewards", "games"])}
+        if activity_type == "order":
+            data["amount"] = round(rng.gauss(32, 9), 2)
+        yield {
+            "user_id": customer_id(_regular(rng, customers)),
+            "activity_type": activity_type,
+            "activity_data": data,
+            "source": "userwebapp",
+            "timestamp": as_of - timedelta(days=90 * rng.random() ** 2, seconds=rng.randrange(86400)),
+        }
+
+
+def generate_campaigns(rng: random.Random, count: int, as_of: datetime, user_id: str):
+    for i in range(count):
+        start = as_of - timedelta(days=rng.randrange(365))
+        level = rng.choice(CAMPAIGN_LEVELS)
+        yield {
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "user_id": user_id,
+            "title": f"Campaña {level} #{i + 1}",
+            "description": f"Promoción para el segmento {level}",
+            "target_level": level,
+            "channels": rng.sample(CHANNELS, rng.randint(1, 3)),
+            "start_date": start,
+            "end_date": start + timedelta(days=rng.choice([7, 14, 30])),
+            "status": "completed" if start < as_of - timedelta(days=30) else rng.choice(["active", "paused"]),
+            "campaign_type": "segmented",
+            "created_at": start - timedelta(days=rng.randrange(1, 7)),
+        }
+
+
+async def insert_stream(collection, documents, total: int, batch_size: int):
+    """insert_many in batches; the next batch is generated while the previous one is written"""
+    started, inserted, batch, pending = time.perf_counter(), 0, [], None
+    for document in documents:
+        batch.append(document)
+        if len(batch) < batch_size:
+            continue
+        if pending:
+            inserted += len((await pending).inserted_ids)
+            if inserted % (batch_size * 20) == 0:
+                print(f"   {collection.name}: {inserted:,}/{total:,}")
+        pending, batch = asyncio.ensure_future(collection.insert_many(batch, ordered=False)), []
+    if pending:
+        inserted += len((await pending).inserted_ids)
+    if batch:
+        inserted += len((await collection.insert_many(batch, ordered=False)).inserted_ids)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Added {inserted:,} {collection.name} in {elapsed:.1f}s ({inserted / max(elapsed, 1e-9):,.0f}/s)")
+
+
+async def seed_synthetic(customers: int, seed: int = 42, batch_size: int = 5000, as_of: datetime = None):
+    """
+    Demo data plus `customers` synthetic customers and proportional feedback,
+    reservations, conversations, activities and campaigns. The same seed and
+    as-of day always produce the same documents.
+    """
+    as_of = as_of or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[os.environ.get('DB_NAME', 'restaurant_db')]
+
+    # Dropping is much faster than delete_many on millions of documents
+    for name in SYNTHETIC_COLLECTIONS:
+        await db.drop_collection(name)
+    random.seed(seed)
+    await seed_database()
+
+    admin = await db.users.find_one({"role": "admin"}, {"_id": 0, "id": 1})
+    user_id = admin["id"] if admin else "synthetic-admin"
+    counts = {name: int(customers * ratio) for name, ratio in PER_CUSTOMER.items()}
+    campaigns = max(10, customers * CAMPAIGNS_PER_10K_CUSTOMERS // 10_000)
+    print(f"🌱 Seeding {customers:,} customers (seed {seed}, as of {as_of:%Y-%m-%d}): "
+          + ", ".join(f"{count:,} {name}" for name, count in counts.items()) + f", {campaigns:,} campaigns")
+
+    # One random stream per collection, so resizing one collection leaves the others unchanged
+    def rng(name):
+        return random.Random(f"{seed}:{name}")
+
+    await insert_stream(db.customers, generate_customers(rng("customers"), customers, as_of), customers, batch_size)
+    await insert_stream(db.feedback, generate_feedback(rng("feedback"), counts["feedback"], customers, as_of),
+                        counts["feedback"], batch_size)
+    await insert_stream(db.reservations, generate_reservations(rng("reservations"), counts["reservations"], customers, as_of),
+                        counts["reservations"], batch_size)
+    await insert_stream(db.conversations, generate_conversations(rng("conversations"), counts["conversations"], customers, as_of, user_id),
+                        counts["conversations"], batch_size)
+    await insert_stream(db.customer_activities, generate_activities(rng("customer_activities"), counts["customer_activities"], customers, as_of),
+                        counts["customer_activities"], batch_size)
+    await insert_stream(db.marketing_campaigns, generate_campaigns(rng("marketing_campaigns"), campaigns, as_of, user_id),
+                        campaigns, batch_size)
+
+    client.close()
+
+
+def parse_scale(value: str) -> int:
+    if value.lower() in SCALES:
+        return SCALES[value.lower()]
+    try:
+        return int(value.replace("_", ""))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected one of {', '.join(SCALES)} or a customer count, got {value!r}")
+
+
 if __name__ == "__main__":
-    asyncio.run(seed_database())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Seed the dashboard database with demo or synthetic data")
+    parser.add_argument("--scale", type=parse_scale, help="synthetic customers: 10k, 1m, 10m or a number (default: demo data only)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed of the synthetic data")
+    parser.add_argument("--batch-size", type=int, default=5000, help="documents per insert_many")
+    parser.add_argument("--as-of", type=datetime.fromisoformat, help="day the synthetic data is relative to (default: today)")
+    args = parser.parse_args()
+
+    if args.scale:
+        asyncio.run(seed_synthetic(args.scale, args.seed, args.batch_size, args.as_of))
+    else:
+        asyncio.run(seed_database())
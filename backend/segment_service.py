@@ -0,0 +1,200 @@
+"""
+Segment Service for KUMIA Elite Dashboard
+Audience sizing and materialization for segmented marketing campaigns
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, AsyncIterator
+
+from pymongo import ASCENDING
+
+# KumIA Stars levels, keyed on the customer's accumulated points (stars)
+LEVEL_RANGES = {
+    "descubridor": (0, 36),
+    "explorador": (36, 48),
+    "destacado": (48, 60),
+    "estrella": (60, 75),
+    "leyenda": (75, None),
+}
+
+# Customers without a visit in this window belong to "inactivos"
+INACTIVE_AFTER_DAYS = 60
+
+# Time-based segments drift without writes, so their cached count expires
+CARDINALITY_TTL = timedelta(minutes=15)
+# Level counts are adjusted on every customer write, but writes that bypass the
+# API (shell fixes, other services) or a lost increment would drift them for
+# good; they are recounted this often as a backstop
+LEVEL_CARDINALITY_TTL = timedelta(hours=1)
+
+AUDIENCE_CHUNK_SIZE = 1000
+AUDIENCE_PROJECTION = {"_id": 0, "id": 1, "name": 1, "email": 1, "phone": 1}
+
+
+class SegmentService:
+    def __init__(self, db):
+        self.db = db
+        self.customers = db.customers
+        self.cardinality = db.segment_cardinality
+        self.audiences = db.campaign_audiences
+        self._materializations: Dict[str, asyncio.Task] = {}
+
+    async def ensure_indexes(self):
+        """Create the indexes backing segment counts and audience reads"""
+        await self.customers.create_index([("points", ASCENDING)])
+        await self.customers.create_index([("last_visit", ASCENDING)])
+        await self.audiences.create_index(
+            [("campaign_id", ASCENDING), ("chunk", ASCENDING)], unique=True
+        )
+
+    # SEGMENT DEFINITIONS
+    def segment_filter(self, segment: str) -> Optional[Dict[str, Any]]:
+        """Mongo filter selecting the customers of a segment (None if unknown)"""
+        segment = segment.lower()
+        if segment == "todos":
+            return {}
+        if segment == "inactivos":
+            cutoff = datetime.utcnow() - timedelta(days=INACTIVE_AFTER_DAYS)
+            return {"$or": [{"last_visit": {"$lt": cutoff}}, {"last_visit": None}]}
+        if segment in LEVEL_RANGES:
+            low, high = LEVEL_RANGES[segment]
+            points = {"$gte": low}
+            if high is not None:
+                points["$lt"] = high
+            return {"points": points}
+        return None
+
+    @staticmethod
+    def level_for_points(points: int) -> str:
+        for level, (low, high) in LEVEL_RANGES.items():
+            if points >= low and (high is None or points < high):
+                return level
+        return "descubridor"
+
+    # CARDINALITY TABLE
+    async def get_estimated_reach(self, segment: str) -> int:
+        """Audience size for a segment, served from the cardinality table"""
+        segment = segment.lower()
+        if segment == "todos":
+            # Collection metadata count, O(1) regardless of collection size
+            return await self.customers.estimated_document_count()
+
+        cached = await self.cardinality.find_one({"_id": segment})
+        if cached and not self._is_stale(segment, cached):
+            return max(cached.get("count", 0), 0)
+
+        return await self.refresh_segment(segment)
+
+    async def get_all_counts(self) -> Dict[str, int]:
+        segments = list(LEVEL_RANGES) + ["todos", "inactivos"]
+        counts = await asyncio.gather(*(self.get_estimated_reach(s) for s in segments))
+        return dict(zip(segments, counts))
+
+    async def refresh_segment(self, segment: str) -> int:
+        """Recount a segment using its indexed filter and cache the result"""
+        query = self.segment_filter(segment)
+        if query is None:
+            return 0
+
+        count = await self.customers.count_documents(query)
+        await self.cardinality.update_one(
+            {"_id": segment.lower()},
+            {"$set": {"count": count, "refreshed_at": datetime.utcnow()}},
+            upsert=True,
+        )
+        return count
+
+    def _is_stale(self, segment: str, cached: Dict[str, Any]) -> bool:
+        ttl = CARDINALITY_TTL if segment == "inactivos" else LEVEL_CARDINALITY_TTL
+        refreshed_at = cached.get("refreshed_at")
+        return refreshed_at is None or datetime.utcnow() - refreshed_at > ttl
+
+    async def apply_customer_change(self, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]):
+        """Incrementally adjust level counts when a customer is written"""
+        old_level = self.level_for_points(before.get("points", 0)) if before else None
+        new_level = self.level_for_points(after.get("points", 0)) if after else None
+        if old_level == new_level:
+            return
+
+        # Only adjust counts that were already materialized; a missing entry
+        # will be computed from scratch on first read
+        if old_level:
+            await self.cardinality.update_one({"_id": old_level}, {"$inc": {"count": -1}})
+        if new_level:
+            await self.cardinality.update_one({"_id": new_level}, {"$inc": {"count": 1}})
+
+    async def invalidate_counts(self):
+        """Drop every cached count, e.g. after a bulk import; each is recounted on its next read"""
+        await self.cardinality.delete_many({})
+
+    # CAMPAIGN AUDIENCES
+    def schedule_materialization(self, campaign_id: str, segment: str):
+        """Materialize the campaign audience in the background"""
+        task = asyncio.create_task(self.materialize_audience(campaign_id, segment))
+        self._materializations[campaign_id] = task
+        task.add_done_callback(lambda _: self._materializations.pop(campaign_id, None))
+        return task
+
+    async def materialize_audience(self, campaign_id: str, segment: str) -> int:
+        """Stream the segment members into chunked campaign_audiences docs"""
+        query = self.segment_filter(segment)
+        if query is None:
+            query = {"_id": None}
+
+        await self.audiences.delete_many({"campaign_id": campaign_id})
+
+        chunk_index = 0
+        total = 0
+        members: List[Dict[str, Any]] = []
+        cursor = self.customers.find(query, AUDIENCE_PROJECTION).batch_size(AUDIENCE_CHUNK_SIZE)
+        try:
+            async for customer in cursor:
+                members.append(customer)
+                if len(members) >= AUDIENCE_CHUNK_SIZE:
+                    await self._write_chunk(campaign_id, chunk_index, members)
+                    total += len(members)
+                    chunk_index += 1
+                    members = []
+
+            if members:
+                await self._write_chunk(campaign_id, chunk_index, members)
+                total += len(members)
+                chunk_index += 1
+
+            await self.db.marketing_campaigns.update_one(
+                {"id": campaign_id},
+                {"$set": {
+                    "audience_status": "ready",
+                    "audience_size": total,
+                    "audience_chunks": chunk_index,
+                    "audience_materialized_at": datetime.utcnow(),
+                }},
+            )
+            return total
+
+        except Exception as e:
+            print(f"❌ Error materializing audience for campaign {campaign_id}: {e}")
+            await self.db.marketing_campaigns.update_one(
+                {"id": campaign_id},
+                {"$set": {"audience_status": "failed", "audience_error": str(e)}},
+            )
+            return total
+
+    async def _write_chunk(self, campaign_id: str, chunk_index: int, members: List[Dict[str, Any]]):
+        await self.audiences.insert_one({
+            "campaign_id": campaign_id,
+            "chunk": chunk_index,
+            "size": len(members),
+            "members": members,
+            "created_at": datetime.utcnow(),
+        })
+
+    async def iter_audience(self, campaign_id: str, start_chunk: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate audience chunks in order, for senders and pagination"""
+        cursor = self.audiences.find(
+            {"campaign_id": campaign_id, "chunk": {"$gte": start_chunk}},
+            {"_id": 0},
+        ).sort("chunk", ASCENDING)
+        async for chunk in cursor:
+            yield chunk
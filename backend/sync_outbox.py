@@ -0,0 +1,327 @@
+"""
+Sync Outbox for KUMIA Elite Dashboard
+Transactional outbox and relay worker for Dashboard → UserWebApp (Firestore) sync
+"""
+
+import asyncio
+import os
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from credit_ledger import TRANSACTIONS_UNSUPPORTED_CODES
+
+SYNC_BATCH_SIZE = int(os.environ.get("SYNC_BATCH_SIZE", 50))
+MAX_ATTEMPTS = 8
+BASE_BACKOFF_SECONDS = 1
+MAX_BACKOFF_SECONDS = 300
+IDLE_POLL_SECONDS = 1.0
+
+# A seq that was allocated but is not visible yet (its enqueue has not
+# committed) holds back the events behind it for at most this long; after
+# that it is taken as lost (e.g. a crash between counter and insert)
+SEQ_GAP_TIMEOUT = timedelta(seconds=int(os.environ.get("SYNC_SEQ_GAP_TIMEOUT_SECONDS", 60)))
+
+# Delivery lag samples kept for the metrics window
+LAG_SAMPLES = 500
+
+
+class SyncOutbox:
+    """
+    Sync events are written to sync_outbox in the same Mongo transaction as
+    the Dashboard write they describe, so a change is never committed without
+    its event (or the other way round). Each event gets a monotonically
+    increasing `seq` and a unique idempotency key.
+
+    A single relay task delivers events in `seq` order, in batches, through
+    handlers registered per operation. Handlers must be idempotent (they
+    write deterministic Firestore doc ids), since a batch that fails midway
+    is retried from its first undelivered event. An event that keeps failing
+    blocks the ones behind it until it either succeeds or exhausts its
+    attempts and is parked as "failed".
+
+    Seqs are allocated before the event is inserted, so outside a
+    transaction seq N+1 can become visible before N. The relay keeps a
+    cursor (the next seq it expects) in sync_counters and stops at a gap
+    until the missing event shows up or SEQ_GAP_TIMEOUT passes.
+    """
+
+    def __init__(self, db, batch_size: int = SYNC_BATCH_SIZE, max_attempts: int = MAX_ATTEMPTS):
+        self.db = db
+        self.outbox = db.sync_outbox
+        self.counters = db.sync_counters
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+        self.delivery_listeners: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {}
+        self._transactions_supported: Optional[bool] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._running = False
+        self._lag_samples: deque = deque(maxlen=LAG_SAMPLES)
+        self._delivered = 0
+        self._batches = 0
+        self._last_delivered_seq = 0
+        self._next_seq: Optional[int] = None
+        self._gap: Optional[tuple] = None
+
+    async def ensure_indexes(self):
+        await self.outbox.create_index([("status", ASCENDING), ("seq", ASCENDING)])
+        await self.outbox.create_index([("idempotency_key", ASCENDING)], unique=True)
+        await self.outbox.create_index([("delivered_at", ASCENDING)], expireAfterSeconds=7 * 24 * 3600)
+
+    def register(self, op: str, handler: Callable[[Dict[str, Any]], Any]):
+        """Blocking handler taking the event payload and returning a truthy value on success"""
+        self.handlers[op] = handler
+
+    def on_delivered(self, op: str, listener: Callable[[Dict[str, Any]], Awaitable[Any]]):
+        """Coroutine called with the payload once an event of this op is confirmed delivered"""
+        self.delivery_listeners[op] = listener
+
+    # ENQUEUE
+    async def enqueue(self, op: str, payload: Dict[str, Any], idempotency_key: str, session=None) -> Optional[int]:
+        """Append one event; returns its seq, or None if the key was already queued"""
+        # Checked up front because a duplicate key error would abort a transaction
+        if await self.outbox.find_one({"idempotency_key": idempotency_key}, {"_id": 1}, session=session):
+            return None
+
+        counter = await self.counters.find_one_and_update(
+            {"_id": "sync_outbox"},
+            {"$inc": {"seq": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+            session=session,
+        )
+        try:
+            await self.outbox.insert_one({
+                "seq": counter["seq"],
+                "op": op,
+                "payload": payload,
+                "idempotency_key": idempotency_key,
+                "status": "pending",
+                "attempts": 0,
+                "next_attempt_at": datetime.utcnow(),
+                "created_at": datetime.utcnow(),
+            }, session=session)
+        except DuplicateKeyError:
+            return None
+
+        # Inside a transaction the event is not visible until commit
+        if session is None:
+            self._wakeup.set()
+        return counter["seq"]
+
+    async def write_with_event(self, write: Callable[..., Awaitable[Any]], op: str, payload: Dict[str, Any], idempotency_key: str) -> Any:
+        """Run `write(session)` and enqueue its event atomically"""
+        if self._transactions_supported is not False:
+            try:
+                result = await self._write_in_transaction(write, op, payload, idempotency_key)
+                self._transactions_supported = True
+                self._wakeup.set()
+                return result
+            except OperationFailure as e:
+                if e.code not in TRANSACTIONS_UNSUPPORTED_CODES:
+                    raise
+                self._transactions_supported = False
+                print("⚠️ MongoDB transactions unavailable, enqueueing sync events after the write")
+
+        # Standalone servers: the write is committed first, so a crash in
+        # between can lose the event but never publishes an uncommitted change
+        result = await write(None)
+        await self.enqueue(op, payload, idempotency_key)
+        return result
+
+    async def _write_in_transaction(self, write, op, payload, idempotency_key):
+        async with await self.db.client.start_session() as session:
+            async def run(session):
+                result = await write(session)
+                await self.enqueue(op, payload, idempotency_key, session=session)
+                return result
+            return await session.with_transaction(run)
+
+    # RELAY
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._task = asyncio.create_task(self._relay())
+        print("✅ Sync outbox relay started")
+
+    async def stop(self):
+        self._running = False
+        self._wakeup.set()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _relay(self):
+        while self._running:
+            try:
+                delivered = await self.relay_once()
+                if not delivered:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), IDLE_POLL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Sync relay error: {e}")
+                await asyncio.sleep(IDLE_POLL_SECONDS)
+
+    async def relay_once(self) -> int:
+        """Deliver the next batch in seq order; returns how many were delivered"""
+        batch = await self.outbox.find(
+            {"status": "pending"}
+        ).sort("seq", ASCENDING).limit(self.batch_size).to_list(self.batch_size)
+        if not batch:
+            return 0
+
+        # Ordered delivery: stop at a seq gap, or at the head if it is still backing off
+        now = datetime.utcnow()
+        batch = await self._in_order(batch, now)
+        if not batch or batch[0]["next_attempt_at"] > now:
+            return 0
+
+        delivered, failure = await asyncio.to_thread(self._deliver_batch, batch)
+
+        if delivered:
+            delivered_at = datetime.utcnow()
+            await self.outbox.update_many(
+                {"_id": {"$in": [event["_id"] for event in delivered]}},
+                {"$set": {"status": "delivered", "delivered_at": delivered_at}, "$inc": {"attempts": 1}},
+            )
+            for event in delivered:
+                self._lag_samples.append((delivered_at - event["created_at"]).total_seconds())
+            self._delivered += len(delivered)
+            self._batches += 1
+            self._last_delivered_seq = delivered[-1]["seq"]
+            await self._advance(delivered[-1]["seq"] + 1)
+            await self._notify_delivered(delivered)
+
+        if failure:
+            event, error = failure
+            await self._mark_failed(event, error)
+
+        return len(delivered)
+
+    async def _in_order(self, batch: List[Dict[str, Any]], now: datetime) -> List[Dict[str, Any]]:
+        """The leading events of `batch` with no seq missing before or between them"""
+        if self._next_seq is None:
+            cursor = await self.counters.find_one({"_id": "sync_relay"})
+            # Before the cursor existed, whatever is pending comes next
+            self._next_seq = cursor["next_seq"] if cursor else batch[0]["seq"]
+
+        expected = self._next_seq
+        ready = []
+        for event in batch:
+            # Below the cursor: a parked event requeued by retry_failed
+            if event["seq"] > expected:
+                if ready or not self._gap_expired(expected, now):
+                    break
+                print(f"⚠️ Sync events #{expected}..#{event['seq'] - 1} never appeared; skipping them")
+                expected = event["seq"]
+            ready.append(event)
+            expected = max(expected, event["seq"] + 1)
+        return ready
+
+    def _gap_expired(self, seq: int, now: datetime) -> bool:
+        if self._gap is None or self._gap[0] != seq:
+            self._gap = (seq, now)
+        return now - self._gap[1] >= SEQ_GAP_TIMEOUT
+
+    async def _advance(self, next_seq: int):
+        if next_seq <= (self._next_seq or 0):
+            return
+        self._next_seq = next_seq
+        self._gap = None
+        await self.counters.update_one({"_id": "sync_relay"}, {"$max": {"next_seq": next_seq}}, upsert=True)
+
+    async def _notify_delivered(self, delivered: List[Dict[str, Any]]):
+        for event in delivered:
+            listener = self.delivery_listeners.get(event["op"])
+            if listener is None:
+                continue
+            try:
+                await listener(event["payload"])
+            except Exception as e:
+                print(f"⚠️ Delivery listener for sync event #{event['seq']} ({event['op']}) failed: {e}")
+
+    def _deliver_batch(self, batch: List[Dict[str, Any]]):
+        delivered = []
+        for event in batch:
+            if event["next_attempt_at"] > datetime.utcnow():
+                break
+            handler = self.handlers.get(event["op"])
+            try:
+                if handler is None:
+                    raise LookupError(f"No sync handler for {event['op']}")
+                if not handler(event["payload"]):
+                    raise RuntimeError(f"{event['op']} was rejected by Firestore")
+            except Exception as e:
+                return delivered, (event, str(e))
+            delivered.append(event)
+        return delivered, None
+
+    async def _mark_failed(self, event: Dict[str, Any], error: str):
+        attempts = event["attempts"] + 1
+        final = attempts >= self.max_attempts
+        backoff = timedelta(seconds=min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** (attempts - 1)))
+        await self.outbox.update_one(
+            {"_id": event["_id"]},
+            {
+                "$set": {
+                    "status": "failed" if final else "pending",
+                    "last_error": error,
+                    "next_attempt_at": datetime.utcnow() + backoff,
+                },
+                "$inc": {"attempts": 1},
+            },
+        )
+        print(f"⚠️ Sync event #{event['seq']} ({event['op']}) attempt {attempts} failed: {error}")
+        if final:
+            # Parked; the events behind it go ahead
+            await self._advance(event["seq"] + 1)
+
+    async def is_pending(self, idempotency_key: str) -> bool:
+        """Whether the event queued under this key is still waiting for delivery"""
+        return bool(await self.outbox.find_one({"idempotency_key": idempotency_key, "status": "pending"}, {"_id": 1}))
+
+    async def retry_failed(self) -> int:
+        """Requeue parked events (after fixing whatever made them fail)"""
+        result = await self.outbox.update_many(
+            {"status": "failed"},
+            {"$set": {"status": "pending", "attempts": 0, "next_attempt_at": datetime.utcnow()}},
+        )
+        self._wakeup.set()
+        return result.modified_count
+
+    # METRICS
+    async def get_stats(self) -> Dict[str, Any]:
+        stats = {"pending": 0, "delivered": 0, "failed": 0}
+        async for row in self.outbox.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            stats[row["_id"]] = row["count"]
+
+        oldest = await self.outbox.find_one({"status": "pending"}, sort=[("seq", ASCENDING)])
+        newest = await self.outbox.find_one({}, sort=[("seq", DESCENDING)])
+        samples = sorted(self._lag_samples)
+
+        return {
+            **stats,
+            "head_seq": oldest["seq"] if oldest else None,
+            "last_enqueued_seq": newest["seq"] if newest else 0,
+            "last_delivered_seq": self._last_delivered_seq,
+            "oldest_pending_age_seconds": (datetime.utcnow() - oldest["created_at"]).total_seconds() if oldest else 0.0,
+            "delivery_lag_seconds": {
+                "p50": samples[len(samples) // 2] if samples else None,
+                "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else None,
+                "max": samples[-1] if samples else None,
+            },
+            "delivered_since_start": self._delivered,
+            "batches_since_start": self._batches,
+        }
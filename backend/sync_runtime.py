@@ -0,0 +1,157 @@
+"""
+Sync Runtime for KUMIA Elite Dashboard
+Firebase services, sync and notification outboxes and table availability shared by the sync and public routers
+"""
+
+import os
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict
+
+from core import db
+from availability_index import AvailabilityIndex, INACTIVE_STATUSES, default_floor_plan
+from table_assignment import TableAssigner
+from menu_publisher import MenuPublisher
+from sync_outbox import SyncOutbox
+from public_cache import PublicResponseCache
+from request_metrics import instrument
+from notification_outbox import NotificationOutbox, SyncServiceTransport, RESERVATION_CHANNELS, stub_transports
+
+# Firebase services are connected by init_firebase_services() at startup
+firebase_service = None
+sync_service = None
+_listening = False
+_workers_started = False
+
+# Availability index over MongoDB reservations, used when Firestore is not connected
+local_availability = AvailabilityIndex(default_floor_plan())
+table_assigner = TableAssigner(db)
+
+# Days kept in the local index; the least recently used are dropped and reloaded on demand
+LOCAL_AVAILABILITY_DAYS = int(os.environ.get("LOCAL_AVAILABILITY_DAYS", 62))
+_local_days: "OrderedDict[str, None]" = OrderedDict()
+_day_loads: Dict[str, asyncio.Future] = {}
+
+# Dashboard → Firestore writes go through the sync outbox and its relay
+sync_outbox = SyncOutbox(db)
+
+# Menu CRUD schedules a debounced, diff-based publication
+menu_publisher = MenuPublisher(db, firebase_service, sync_outbox)
+
+# Public UserWebApp responses, pre-rendered and re-rendered when their data changes
+public_cache = PublicResponseCache()
+
+# Reservation confirmations are delivered out-of-band by the notification outbox
+notification_outbox = NotificationOutbox(
+    db,
+    stub_transports(),
+    workers=int(os.environ.get("NOTIFICATION_WORKERS", 4))
+)
+
+def init_firebase_services():
+    """Import and connect Firebase only when credentials are configured"""
+    global firebase_service, sync_service
+    if firebase_service is not None:
+        return
+    if not os.environ.get("FIREBASE_PRIVATE_KEY"):
+        print("⚠️ Firebase credentials not configured - UserWebApp sync disabled")
+        return
+    
+    try:
+        from firebase_admin_config import get_firebase_service
+        from sync_service import get_sync_service
+        print("✅ Firebase services loaded successfully")
+    except ImportError as e:
+        print(f"⚠️ Firebase services not available: {e}")
+        return
+    
+    # Firestore calls are blocking; time them per request
+    firebase, sync = get_firebase_service(), get_sync_service()
+    firebase_service = instrument(firebase, "firestore", firebase.FIRESTORE_METHODS)
+    sync_service = instrument(sync, "firestore", sync.FIRESTORE_METHODS)
+    sync_service.register_outbox_handlers(sync_outbox)
+    menu_publisher.firebase = firebase_service
+    firebase_service.on_public_change = public_cache.invalidate
+    notification_outbox.transports = {channel: SyncServiceTransport(sync_service, channel) for channel in RESERVATION_CHANNELS}
+
+def firestore_enabled() -> bool:
+    return bool(firebase_service and firebase_service.db)
+
+async def ensure_local_availability_day(date: str):
+    """Load a day's MongoDB reservations into the local index once; concurrent callers share the load"""
+    if local_availability.has_day(date):
+        _local_days[date] = None
+        _local_days.move_to_end(date)
+        return
+    load = _day_loads.get(date)
+    if load is None:
+        load = _day_loads[date] = asyncio.ensure_future(_load_local_day(date))
+        load.add_done_callback(lambda _: _day_loads.pop(date, None))
+    await asyncio.shield(load)
+
+def _day_query(date: str) -> Dict:
+    # Dashboard edits stored the date as a datetime before it was kept as YYYY-MM-DD
+    try:
+        day = datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        return {"date": date}
+    return {"$or": [{"date": date}, {"date": {"$gte": day, "$lt": day + timedelta(days=1)}}]}
+
+async def _load_local_day(date: str):
+    # Bookings and cancellations made while the query runs are kept over its results
+    local_availability.begin_load(date)
+    reservations = await db.reservations.find(
+        {**_day_query(date), "status": {"$nin": list(INACTIVE_STATUSES)}},
+        {"_id": 0, "id": 1, "table_id": 1, "table_ids": 1, "date": 1, "time": 1, "status": 1, "duration_minutes": 1}
+    ).to_list(None)
+    local_availability.load_day(date, [{**reservation, "date": date} for reservation in reservations])
+
+    _local_days[date] = None
+    while len(_local_days) > LOCAL_AVAILABILITY_DAYS:
+        evicted, _ = _local_days.popitem(last=False)
+        local_availability.drop_day(evicted)
+
+async def availability_for_day(date: str) -> AvailabilityIndex:
+    if firestore_enabled():
+        return firebase_service.get_day_availability(date)
+    await ensure_local_availability_day(date)
+    return local_availability
+
+# LIFECYCLE
+def connect():
+    """Connect Firebase and start the Firestore mirror (enough for public reads)"""
+    global _listening
+    init_firebase_services()
+    if firestore_enabled() and not _listening:
+        firebase_service.setup_realtime_listeners()
+        _listening = True
+
+async def start_workers():
+    """Start the outbox workers used by the Dashboard write paths"""
+    global _workers_started
+    if _workers_started:
+        return
+    _workers_started = True
+    connect()
+    await db.reservations.create_index("date")
+    await table_assigner.ensure_indexes()
+    await notification_outbox.ensure_indexes()
+    notification_outbox.start()
+    await sync_outbox.ensure_indexes()
+    if firestore_enabled():
+        sync_outbox.start()
+
+async def shutdown():
+    global _listening, _workers_started
+    if _workers_started:
+        await notification_outbox.stop()
+        if firestore_enabled():
+            await menu_publisher.flush()
+        await sync_outbox.stop()
+        if sync_service:
+            sync_service.table_publisher.flush()
+        _workers_started = False
+    if _listening:
+        firebase_service.stop_realtime_listeners()
+        _listening = False
@@ -3,14 +3,128 @@ Sync Service for KUMIA Elite Dashboard
 Handles real-time synchronization between Dashboard and UserWebApp
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Set, Iterable
 from datetime import datetime, timedelta
 import json
+import os
+import threading
+from firebase_admin import firestore
 from firebase_admin_config import get_firebase_service
 
+# Reservations landing within this window are published together
+TABLE_PUBLISH_WINDOW_SECONDS = float(os.environ.get("TABLE_PUBLISH_WINDOW_SECONDS", 0.5))
+
+class TableAvailabilityPublisher:
+    """
+    Publishes table availability to the UserWebApp as deltas.
+    
+    Layout under public/table_availability:
+    - the root doc holds the current `version`
+    - days/{date} holds `tables.{table_id}` = booked slot start times
+    - changes/{version} lists the (date, table) pairs patched by that version,
+      so clients can fetch only what changed since the version they hold
+    """
+    
+    def __init__(self, firebase, window_seconds: float = TABLE_PUBLISH_WINDOW_SECONDS):
+        self.firebase = firebase
+        self.window_seconds = window_seconds
+        self._pending: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+    
+    def mark_changed(self, date: str, table_ids: Iterable[str]):
+        """Queue tables for publication, coalescing bursts into one publish"""
+        with self._lock:
+            self._pending.setdefault(date, set()).update(table_ids)
+            if self._timer is None:
+                self._timer = threading.Timer(self.window_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+    
+    def flush(self) -> Optional[int]:
+        """Publish every pending change as one new version"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        
+        if not pending or not self.firebase.db:
+            return None
+        
+        try:
+            day_patches = {}
+            for date, table_ids in pending.items():
+                index = self.firebase.get_day_availability(date)
+                day_patches[date] = {table_id: index.booked_times(date, table_id) for table_id in table_ids}
+            
+            version = self._publish(day_patches)
+            print(f"✅ Table availability v{version} published ({sum(len(p) for p in day_patches.values())} tables)")
+            return version
+            
+        except Exception as e:
+            print(f"❌ Error publishing table availability: {e}")
+            # Requeue so the next window retries these tables
+            for date, table_ids in pending.items():
+                self.mark_changed(date, table_ids)
+            return None
+    
+    def _publish(self, day_patches: Dict[str, Dict[str, List[str]]]) -> int:
+        db = self.firebase.db
+        root_ref = db.collection('public').document('table_availability')
+        
+        @firestore.transactional
+        def publish(transaction):
+            snapshot = root_ref.get(transaction=transaction)
+            version = ((snapshot.to_dict() or {}).get('version') or 0) + 1 if snapshot.exists else 1
+            now = datetime.now().isoformat()
+            
+            for date, tables in day_patches.items():
+                transaction.set(
+                    root_ref.collection('days').document(date),
+                    {'date': date, 'tables': tables, 'version': version, 'last_updated': now},
+                    merge=True
+                )
+            
+            transaction.set(root_ref.collection('changes').document(f"{version:012d}"), {
+                'version': version,
+                'changes': [
+                    {'date': date, 'table_id': table_id, 'booked_times': booked_times}
+                    for date, tables in day_patches.items()
+                    for table_id, booked_times in tables.items()
+                ],
+                'published_at': now
+            })
+            transaction.set(root_ref, {'version': version, 'last_updated': now}, merge=True)
+            return version
+        
+        return publish(db.transaction())
+    
+    def get_changes_since(self, since_version: int, limit: int = 500) -> Dict[str, Any]:
+        """Changes published after `since_version`, oldest first"""
+        if not self.firebase.db:
+            return {'version': since_version, 'changes': []}
+        
+        root_ref = self.firebase.db.collection('public').document('table_availability')
+        snapshot = root_ref.get()
+        current = (snapshot.to_dict() or {}).get('version', 0) if snapshot.exists else 0
+        
+        versions = root_ref.collection('changes').where('version', '>', since_version).order_by('version').limit(limit).get()
+        changes = [doc.to_dict() for doc in versions]
+        
+        return {
+            'version': changes[-1]['version'] if changes else max(current, since_version),
+            'current_version': current,
+            'changes': changes
+        }
+
 class KumiaSyncService:
+    # Methods writing or reading Firestore themselves; the rest delegate to the Firebase service
+    FIRESTORE_METHODS = ('sync_user_activity_to_dashboard', 'sync_promotion_changes', 'get_table_availability_changes')
+    
     def __init__(self):
         self.firebase = get_firebase_service()
+        self.table_publisher = TableAvailabilityPublisher(self.firebase)
         
     # USERWEBAPP → DASHBOARD SYNC
     def sync_user_activity_to_dashboard(self, activity_data: Dict[str, Any]) -> bool:
@@ -92,18 +206,20 @@ class KumiaSyncService:
             return False
     
     # RESERVATION SYSTEM SYNC
-    def create_reservation_from_dashboard(self, reservation_data: Dict[str, Any]) -> Optional[str]:
+    def create_reservation_from_dashboard(self, reservation_data: Dict[str, Any], send_confirmations: bool = True) -> Optional[str]:
         """Create reservation from Dashboard and sync to UserWebApp"""
         try:
             # Create reservation
             reservation_id = self.firebase.create_reservation(reservation_data)
             
             if reservation_id:
-                # Trigger confirmations
-                self._trigger_reservation_confirmations(reservation_data, reservation_id)
+                # Trigger confirmations (skipped when the notification outbox delivers them)
+                if send_confirmations:
+                    self._trigger_reservation_confirmations(reservation_data, reservation_id)
                 
-                # Sync table availability
-                self._sync_table_availability()
+                # Publish the tables this booking touched
+                table_ids = reservation_data.get('table_ids') or [reservation_data.get('table_id')]
+                self.table_publisher.mark_changed(reservation_data.get('date'), [t for t in table_ids if t])
                 
             return reservation_id
             
@@ -126,6 +242,15 @@ class KumiaSyncService:
         except Exception as e:
             print(f"❌ Error triggering confirmations: {e}")
     
+    def send_confirmation(self, channel: str, reservation_data: Dict[str, Any], reservation_id: str):
+        """Send a single confirmation channel (used by the notification outbox)"""
+        senders = {
+            'email': self._send_email_confirmation,
+            'whatsapp': self._send_whatsapp_confirmation,
+            'ai_conversation': self._trigger_ai_conversation
+        }
+        senders[channel](reservation_data, reservation_id)
+    
     def _send_email_confirmation(self, reservation_data: Dict[str, Any], reservation_id: str):
         """Send email confirmation (mock implementation)"""
         customer_email = reservation_data.get('customer_email')
@@ -209,26 +334,37 @@ Mientras esperas tu visita, ¿te gustaría:
 ESTADO: Conversación IA iniciada - Cliente puede responder
 """)
     
-    def _sync_table_availability(self):
-        """Sync table availability to UserWebApp"""
+    def cancel_reservation_from_dashboard(self, reservation_id: str, date: Optional[str] = None, table_ids: Optional[List[str]] = None) -> bool:
+        """Cancel reservation and publish the freed tables"""
+        if not (date and table_ids):
+            index = self.firebase.availability
+            booking = index.get_booking(reservation_id) if index else None
+            if booking:
+                date, table_ids, _ = booking
+        
+        if not self.firebase.cancel_reservation(reservation_id):
+            return False
+        
+        if date and table_ids:
+            self.table_publisher.mark_changed(date, [t for t in table_ids if t])
+        return True
+    
+    def register_outbox_handlers(self, outbox):
+        """Firestore writes performed by the sync outbox relay"""
+        outbox.register("reservation.create", lambda payload: self.create_reservation_from_dashboard(payload, send_confirmations=False))
+        outbox.register("reservation.cancel", lambda payload: self.cancel_reservation_from_dashboard(payload["id"], payload.get("date"), payload.get("table_ids")))
+        outbox.register("promotions.set", lambda payload: self.sync_promotion_changes(payload["promotion_data"]))
+        outbox.register("menu.delta", lambda payload: self.firebase.publish_menu_delta(
+            {item["id"]: item for item in payload["upserts"]}, payload["removals"], payload["manifest"]
+        ))
+    
+    def get_table_availability_changes(self, since_version: int) -> Dict[str, Any]:
+        """Table availability deltas for the UserWebApp"""
         try:
-            if not self.firebase.db:
-                return
-            
-            # Get current table states
-            tables_ref = self.firebase.db.collection('operations').document('tables').collection('restaurant_tables')
-            tables = [{'id': doc.id, **doc.to_dict()} for doc in tables_ref.get()]
-            
-            # Update public availability
-            self.firebase.db.collection('public').document('table_availability').set({
-                'tables': tables,
-                'last_updated': datetime.now().isoformat()
-            })
-            
-            print("✅ Table availability synced")
-            
+            return self.table_publisher.get_changes_since(since_version)
         except Exception as e:
-            print(f"❌ Error syncing table availability: {e}")
+            print(f"❌ Error reading table availability changes: {e}")
+            return {'version': since_version, 'changes': []}
     
     # MARKETING INTELLIGENCE METHODS
     def get_customer_journey_analytics(self, user_id: str) -> Dict[str, Any]:
@@ -354,9 +490,12 @@ ESTADO: Conversación IA iniciada - Cliente puede responder
         
         return recommendations
 
-# Initialize global sync service
-sync_service = KumiaSyncService()
+# Global sync service, created on first use so importing this module stays cheap
+sync_service: Optional[KumiaSyncService] = None
 
 # Export for use in other modules
 def get_sync_service():
-    return sync_service
\ No newline at end of file
+    global sync_service
+    if sync_service is None:
+        sync_service = KumiaSyncService()
+    return sync_service
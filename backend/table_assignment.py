@@ -0,0 +1,189 @@
+"""
+Table Assignment Engine for KUMIA Elite Dashboard
+Best-fit table selection with adjacent-table combinations and atomic claims
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from availability_index import AvailabilityIndex, INACTIVE_STATUSES
+
+MAX_COMBINED_TABLES = 3
+COMBINATION_PENALTY = 2  # seats-equivalent cost of pushing one more table together
+
+
+def reservation_slot(reservation: Dict[str, Any]) -> Optional[Tuple[Tuple[str, ...], str, str, Optional[int]]]:
+    """(table_ids, date, time, duration_minutes) a reservation holds, None if it holds no table"""
+    if reservation.get("status") in INACTIVE_STATUSES:
+        return None
+    table_ids = tuple(reservation.get("table_ids") or [reservation.get("table_id")])
+    date, time = reservation.get("date"), reservation.get("time")
+    # Dashboard edits stored the date as a datetime before it was kept as YYYY-MM-DD
+    if isinstance(date, datetime):
+        date = date.strftime("%Y-%m-%d")
+    if not (all(table_ids) and date and time):
+        return None
+    return table_ids, date, time, reservation.get("duration_minutes")
+
+
+class TableAssigner:
+    """
+    Candidates are ranked by (wasted seats, stranded slots, table count).
+    Stranded slots are free gaps next to the booking too short to seat
+    another party, i.e. the fragmentation a booking would leave behind.
+
+    A claim is first taken in the in-process index (check-and-set under its
+    lock) and then persisted as one table_claims doc per table slot. The
+    unique _id on those docs makes the claim atomic across workers.
+    """
+
+    def __init__(self, db, max_combined: int = MAX_COMBINED_TABLES):
+        self.claims = db.table_claims
+        self.max_combined = max_combined
+
+    async def ensure_indexes(self):
+        await self.claims.create_index([("reservation_id", ASCENDING)])
+        await self.claims.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+
+    # CANDIDATE SELECTION
+    def candidates(self, index: AvailabilityIndex, date: str, time: str, guests: int, duration_minutes: Optional[int] = None) -> List[Tuple[str, ...]]:
+        """Free tables or adjacent table runs seating the party, best first"""
+        mask = index.window_mask(time, duration_minutes)
+        free = [table for table in index.tables if not (index.day_bitmap(date, table["id"]) & mask)]
+
+        scored = []
+        for table in free:
+            if table["capacity"] >= guests:
+                score = (table["capacity"] - guests, self._stranded_slots(index, date, table["id"], mask), 1, table["number"])
+                scored.append((score, (table["id"],)))
+
+        if not scored:
+            for run in self._adjacent_runs(free):
+                capacity = sum(table["capacity"] for table in run)
+                if capacity < guests:
+                    continue
+                stranded = sum(self._stranded_slots(index, date, table["id"], mask) for table in run)
+                waste = capacity - guests + COMBINATION_PENALTY * (len(run) - 1)
+                scored.append(((waste, stranded, len(run), run[0]["number"]), tuple(table["id"] for table in run)))
+
+        scored.sort(key=lambda candidate: candidate[0])
+        return [table_ids for _, table_ids in scored]
+
+    def _adjacent_runs(self, free_tables: List[Dict[str, Any]]) -> Iterable[List[Dict[str, Any]]]:
+        # Tables are adjacent when they share a location and their numbers are consecutive
+        ordered = sorted(free_tables, key=lambda table: (table.get("location", ""), table["number"]))
+        for start in range(len(ordered)):
+            run = [ordered[start]]
+            for table in ordered[start + 1:]:
+                previous = run[-1]
+                if len(run) >= self.max_combined or table.get("location") != previous.get("location") or table["number"] != previous["number"] + 1:
+                    break
+                run.append(table)
+                yield list(run)
+
+    @staticmethod
+    def _stranded_slots(index: AvailabilityIndex, date: str, table_id: str, mask: int) -> int:
+        """Free slots left on either side of the window that are too short to book"""
+        bitmap = index.day_bitmap(date, table_id)
+        if not bitmap:
+            return 0
+
+        min_slots = -(-index.dining_minutes // index.slot_minutes)
+        start = (mask & -mask).bit_length() - 1
+        end = mask.bit_length()
+        stranded = 0
+
+        before = 0
+        slot = start - 1
+        while slot >= 0 and not (bitmap >> slot & 1) and before < min_slots:
+            before += 1
+            slot -= 1
+        if 0 < before < min_slots and slot >= 0:
+            stranded += before
+
+        after = 0
+        slot = end
+        while slot < index.slots_per_day and not (bitmap >> slot & 1) and after < min_slots:
+            after += 1
+            slot += 1
+        if 0 < after < min_slots and slot < index.slots_per_day:
+            stranded += after
+
+        return stranded
+
+    # CLAIMS
+    async def assign(self, index: AvailabilityIndex, reservation_id: str, date: str, time: str, guests: int, duration_minutes: Optional[int] = None) -> Optional[List[str]]:
+        """Pick and atomically claim the best free table(s); None if fully booked"""
+        for table_ids in self.candidates(index, date, time, guests, duration_minutes):
+            if await self.claim(index, reservation_id, table_ids, date, time, duration_minutes):
+                return list(table_ids)
+        return None
+
+    async def claim(self, index: AvailabilityIndex, reservation_id: str, table_ids: Iterable[str], date: str, time: str, duration_minutes: Optional[int] = None) -> bool:
+        """Claim the tables' slots; False if taken or not on the floor plan. Raises ValueError for a bad date or time"""
+        table_ids = tuple(table_ids)
+        # Validated before anything is booked
+        expires_at = datetime.strptime(date, "%Y-%m-%d") + timedelta(days=2)
+        datetime.strptime(time, "%H:%M")
+        if not table_ids or any(table_id not in index.tables_by_id for table_id in table_ids):
+            return False
+        if not index.try_book(reservation_id, table_ids, date, time, duration_minutes):
+            return False
+
+        try:
+            mask = index.window_mask(time, duration_minutes)
+            claims = [
+                {
+                    "_id": f"{date}:{table_id}:{slot}",
+                    "reservation_id": reservation_id,
+                    "created_at": datetime.utcnow(),
+                    "expires_at": expires_at,
+                }
+                for table_id in table_ids
+                for slot in range(index.slots_per_day) if mask >> slot & 1
+            ]
+            await self.claims.insert_many(claims, ordered=True)
+            return True
+        except (BulkWriteError, DuplicateKeyError):
+            # Another worker holds one of these slots
+            await self._undo(index, reservation_id)
+            return False
+        except BaseException:
+            await self._undo(index, reservation_id)
+            raise
+
+    async def move(self, index: AvailabilityIndex, reservation_id: str, table_ids: Iterable[str], date: str, time: str, duration_minutes: Optional[int] = None) -> bool:
+        """Re-claim a reservation's slots at a new date, time or tables; False, keeping the old claim, if taken"""
+        booking = index.get_booking(reservation_id)
+        previous_claims = await self.claims.find({"reservation_id": reservation_id}).to_list(None)
+        await self.release(index, reservation_id)
+        try:
+            if await self.claim(index, reservation_id, table_ids, date, time, duration_minutes):
+                return True
+        except BaseException:
+            await self._restore(index, reservation_id, booking, previous_claims)
+            raise
+        await self._restore(index, reservation_id, booking, previous_claims)
+        return False
+
+    async def _restore(self, index: AvailabilityIndex, reservation_id: str, booking, previous_claims: List[Dict[str, Any]]):
+        if booking:
+            index.restore(reservation_id, *booking)
+        if previous_claims:
+            try:
+                await self.claims.insert_many(previous_claims, ordered=False)
+            except BulkWriteError:
+                # A slot was taken while released; the unique _id keeps whoever got it
+                print(f"⚠️ Reservation {reservation_id} lost part of its previous table claim")
+
+    async def _undo(self, index: AvailabilityIndex, reservation_id: str):
+        index.remove_reservation(reservation_id)
+        await self.claims.delete_many({"reservation_id": reservation_id})
+
+    async def release(self, index: Optional[AvailabilityIndex], reservation_id: str):
+        await self.claims.delete_many({"reservation_id": reservation_id})
+        if index:
+            index.remove_reservation(reservation_id)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the table availability index
+Loads a month of dense bookings and times availability queries, table
+assignment decisions and incremental updates
+"""
+
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from availability_index import AvailabilityIndex, default_floor_plan  # noqa: E402
+from table_assignment import TableAssigner  # noqa: E402
+
+DAYS = 30
+SERVICE_START, SERVICE_END = 12 * 60, 23 * 60
+QUERIES = 100_000
+SEED = 42
+
+
+def generate_month(index: AvailabilityIndex, rng: random.Random):
+    """Pack every table back-to-back with 90 minute bookings, every day"""
+    reservations = []
+    start_day = date(2025, 1, 1)
+    for offset in range(DAYS):
+        day = (start_day + timedelta(days=offset)).isoformat()
+        for table in index.tables:
+            minute = SERVICE_START + rng.choice([0, 15, 30])
+            while minute + index.dining_minutes <= SERVICE_END:
+                reservations.append({
+                    "id": f"res_{len(reservations)}",
+                    "table_id": table["id"],
+                    "date": day,
+                    "time": f"{minute // 60:02d}:{minute % 60:02d}",
+                    "guests": table["capacity"],
+                    "status": "confirmed",
+                })
+                minute += index.dining_minutes + rng.choice([0, 15, 30])
+    return reservations
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    rng = random.Random(SEED)
+    index = AvailabilityIndex(default_floor_plan())
+    reservations = generate_month(index, rng)
+
+    started = time.perf_counter()
+    for reservation in reservations:
+        index.add_reservation(reservation)
+    build_seconds = time.perf_counter() - started
+
+    days = sorted({reservation["date"] for reservation in reservations})
+    queries = [
+        (rng.choice(days), f"{rng.randint(12, 21):02d}:{rng.choice(['00', '15', '30', '45'])}", rng.randint(1, 6))
+        for _ in range(QUERIES)
+    ]
+
+    samples = []
+    free_found = 0
+    for day, slot, guests in queries:
+        started = time.perf_counter_ns()
+        free = index.free_tables(day, slot, guests)
+        samples.append(time.perf_counter_ns() - started)
+        free_found += len(free)
+
+    # Best-fit assignment decisions (candidate ranking, without the Mongo claim)
+    assigner = TableAssigner(SimpleNamespace(table_claims=None))
+    assign_samples = []
+    for day, slot, guests in queries[:20_000]:
+        started = time.perf_counter_ns()
+        assigner.candidates(index, day, slot, guests * 2)
+        assign_samples.append(time.perf_counter_ns() - started)
+
+    # Cancel and re-book a sample of reservations to time incremental updates
+    update_samples = []
+    for reservation in rng.sample(reservations, min(len(reservations), 3_000)):
+        started = time.perf_counter_ns()
+        index.remove_reservation(reservation["id"])
+        index.add_reservation(reservation)
+        update_samples.append(time.perf_counter_ns() - started)
+
+    # Sanity check: a 19:30 booking must collide with a 19:00 one on the same table
+    check = AvailabilityIndex(default_floor_plan())
+    check.add_reservation({"id": "a", "table_id": "table_1", "date": "2025-02-01", "time": "19:00"})
+    assert not check.add_reservation({"id": "b", "table_id": "table_1", "date": "2025-02-01", "time": "19:30"})
+    assert all(table["id"] != "table_1" for table in check.free_tables("2025-02-01", "19:30"))
+
+    print("📊 AVAILABILITY INDEX BENCHMARK")
+    print(f"Reservations indexed: {len(reservations)} over {DAYS} days, {len(index.tables)} tables")
+    print(f"Build time: {build_seconds * 1000:.1f} ms ({build_seconds / len(reservations) * 1e6:.2f} µs/booking)")
+    print(
+        f"free_tables(): mean {statistics.mean(samples) / 1000:.2f} µs, "
+        f"p50 {percentile(samples, 50) / 1000:.2f} µs, p99 {percentile(samples, 99) / 1000:.2f} µs "
+        f"({QUERIES} queries, {free_found / QUERIES:.2f} free tables/query)"
+    )
+    print(
+        f"assignment decision: mean {statistics.mean(assign_samples) / 1000:.2f} µs, "
+        f"p99 {percentile(assign_samples, 99) / 1000:.2f} µs (parties of 2-12)"
+    )
+    print(
+        f"cancel + re-book: mean {statistics.mean(update_samples) / 1000:.2f} µs, "
+        f"p99 {percentile(update_samples, 99) / 1000:.2f} µs"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for the backend API
+Boots the app in-process against mongomock-motor on its own store thread (or a
+local mongod with --mongo-url) with a fake LLM and Firebase sync disabled,
+drives seeded mixed traffic from concurrent virtual users and reports
+throughput and p50/p95/p99 per route (median of repeated passes), optionally
+compared against a saved baseline
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import types
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Tuple
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARKS_DIR.parent / "backend"))
+
+DEFAULT_BASELINE = BENCHMARKS_DIR / "baselines" / "load_mongomock.json"
+SEED = 42
+# Runs are only compared against a baseline recorded with the same settings
+COMPARABLE_CONFIG = ("backend", "users", "requests", "customers", "llm_latency_ms", "repeats")
+# p95 growth below this is scheduling noise on millisecond routes, whatever the tolerance
+P95_NOISE_MS = 5
+ADMIN = {"id": "bench-admin", "email": "bench@kumia.local", "name": "Bench Admin", "role": "admin"}
+
+
+# FAKE PROVIDERS
+def install_fake_llm(latency_seconds: float):
+    """Stand-in for emergentintegrations.llm.chat with a fixed response latency"""
+
+    class UserMessage:
+        def __init__(self, text: str):
+            self.text = text
+
+    class LlmChat:
+        def __init__(self, api_key=None, session_id=None, system_message=None):
+            self.session_id = session_id
+
+        def with_model(self, provider, model):
+            return self
+
+        def with_max_tokens(self, max_tokens):
+            return self
+
+        async def send_message(self, message):
+            await asyncio.sleep(latency_seconds)
+            return f"Respuesta simulada a: {message.text[:40]}"
+
+    package = types.ModuleType("emergentintegrations")
+    llm = types.ModuleType("emergentintegrations.llm")
+    chat = types.ModuleType("emergentintegrations.llm.chat")
+    chat.LlmChat, chat.UserMessage = LlmChat, UserMessage
+    package.llm, llm.chat = llm, chat
+    sys.modules.update({"emergentintegrations": package, "emergentintegrations.llm": llm, "emergentintegrations.llm.chat": chat})
+
+
+def configure_environment(args):
+    """Must run before the backend is imported"""
+    os.environ["DB_NAME"] = args.db_name
+    os.environ["FIREBASE_PRIVATE_KEY"] = ""  # sync disabled: Mongo fallbacks and stub notification transports
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    install_fake_llm(args.llm_latency_ms / 1000)
+
+    if args.mongo_url:
+        os.environ["MONGO_URL"] = args.mongo_url
+        return "mongod"
+
+    try:
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("❌ mongomock-motor is not installed; pip install mongomock-motor or pass --mongo-url")
+    run_mongomock_off_loop()
+    motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+    os.environ["MONGO_URL"] = "mongodb://mongomock"
+    return "mongomock"
+
+
+def run_mongomock_off_loop():
+    """Run mongomock-motor's calls on one store thread, the way a mongod works outside the app's event loop
+
+    mongomock-motor's coroutines do all their work synchronously, so on the app's loop every query
+    also stalls the other requests and the load generator; the latencies then measure the queue
+    behind the slowest query instead of the routes.
+    """
+    import mongomock_motor
+    from concurrent.futures import ThreadPoolExecutor
+
+    # mongomock is not thread-safe: one thread, like a single-connection server
+    store = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mongomock")
+
+    async def on_store(function, *args):
+        return await asyncio.get_running_loop().run_in_executor(store, function, *args)
+
+    def finish(coroutine):
+        # The wrapped coroutines never await, so they complete on their first step
+        try:
+            coroutine.send(None)
+        except StopIteration as done:
+            return done.value
+        raise RuntimeError("mongomock-motor coroutine suspended")
+
+    def off_loop(method):
+        async def call(self, *args, **kwargs):
+            # Created on the store thread, so a call cancelled before it runs leaves no coroutine behind
+            return await on_store(lambda: finish(method(self, *args, **kwargs)))
+        return call
+
+    class Results:
+        """Fetches all of a query's results in one store call on first use, like one large Motor batch"""
+
+        def __init__(self, fetch):
+            self._fetch, self._results = fetch, None
+
+        async def _iterator(self):
+            if self._results is None:
+                self._results = iter(await on_store(lambda: list(self._fetch())))
+            return self._results
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            try:
+                return next(await self._iterator())
+            except StopIteration:
+                raise StopAsyncIteration()
+
+        next = __anext__
+
+        async def to_list(self, length=None):
+            results = list(await self._iterator())
+            return results if length is None else results[:length]
+
+    for cls in (mongomock_motor.AsyncMongoMockCollection, mongomock_motor.AsyncMongoMockDatabase):
+        for name in dir(cls):
+            if asyncio.iscoroutinefunction(getattr(cls, name)):
+                setattr(cls, name, off_loop(getattr(cls, name)))
+
+    # Cursors: find() keeps its chaining methods and runs the query once, on the store thread
+    cursor = mongomock_motor.AsyncCursor
+
+    async def cursor_next(self):
+        if "_results" not in self.__dict__:
+            self._results = Results(lambda: self.__dict__["_AsyncCursor__cursor"])
+        return await self._results.__anext__()
+
+    async def cursor_to_list(self, length=None):
+        return [document async for document in self][:length]
+
+    cursor.next = cursor.__anext__ = cursor_next
+    cursor.to_list = cursor_to_list
+    cursor.distinct = off_loop(cursor.distinct)
+
+    # aggregate() runs its pipeline when first iterated, as Motor's does
+    def lazy_aggregate(source):
+        def aggregate(self, *args, **kwargs):
+            return Results(lambda: self.__dict__[source].aggregate(*args, **kwargs))
+        return aggregate
+
+    mongomock_motor.AsyncMongoMockCollection.aggregate = lazy_aggregate("_AsyncMongoMockCollection__collection")
+    mongomock_motor.AsyncMongoMockDatabase.aggregate = lazy_aggregate("_AsyncMongoMockDatabase__database")
+
+
+# DATA
+async def seed(db, rng: random.Random, customers: int):
+    await db.users.insert_one(dict(ADMIN))
+    now = datetime.utcnow()
+    await db.customers.insert_many([{
+        "id": f"customer_{i}",
+        "name": f"Cliente {i}",
+        "email": f"cliente{i}@example.com",
+        "phone": f"+595 981 {i:06d}",
+        "first_visit": now - timedelta(days=rng.randint(0, 720)),
+        "last_visit": now - timedelta(days=rng.randint(0, 60)),
+        "nft_level": rng.choice(["bronce", "plata", "oro", "citizen_kumia"]),
+        "points": rng.randint(0, 5000),
+        "total_orders": rng.randint(1, 80),
+        "total_spent": round(rng.uniform(10, 4000), 2),
+        "created_at": now - timedelta(days=rng.randint(0, 720)),
+    } for i in range(customers)])
+    await db.menu_items.insert_many([{
+        "id": f"item_{i}",
+        "name": f"Plato {i}",
+        "description": "Carne ahumada a fuego lento con guarnición de temporada",
+        "price": rng.choice([45000, 65000, 85000, 120000]),
+        "category": rng.choice(["carnes", "entradas", "postres", "bebidas"]),
+        "is_available": True,
+    } for i in range(40)])
+    await db.feedback.insert_many([{
+        "id": f"feedback_{i}",
+        "customer_id": f"customer_{rng.randrange(customers)}",
+        "customer_name": "Cliente",
+        "rating": rng.choices([1, 2, 3, 4, 5], weights=[1, 1, 3, 8, 12])[0],
+        "comment": "Muy buena atención",
+        "created_at": now - timedelta(days=rng.randint(0, 90)),
+    } for i in range(customers // 3)])
+
+
+# TRAFFIC
+@dataclass
+class Scenario:
+    route: str
+    weight: int
+    call: Callable
+    # Statuses that are a correct answer under load (e.g. a full time slot)
+    ok_statuses: Tuple[int, ...] = (200,)
+
+
+def _reservation_slot(rng: random.Random) -> Tuple[str, str]:
+    day = (datetime.utcnow() + timedelta(days=rng.randint(1, 60))).strftime("%Y-%m-%d")
+    return day, f"{rng.randint(12, 21):02d}:{rng.choice(['00', '30'])}"
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario("GET /api/public/menu", 35, lambda c, rng, h: c.get("/api/public/menu")),
+    Scenario("POST /api/sync/customer-activity", 25, lambda c, rng, h: c.post("/api/sync/customer-activity", json={
+        "user_id": f"customer_{rng.randrange(1000)}",
+        "activity_type": rng.choice(["menu_view", "login", "game_play", "order"]),
+        "activity_data": {"source_screen": "home"},
+    })),
+    Scenario("GET /api/dashboard/metrics", 15, lambda c, rng, h: c.get("/api/dashboard/metrics", headers=h)),
+    Scenario("GET /api/tables/availability", 10, lambda c, rng, h: c.get("/api/tables/availability", headers=h, params=dict(
+        zip(("date", "time"), _reservation_slot(rng)), guests=rng.randint(1, 6)))),
+    Scenario("GET /api/analytics/customers", 5, lambda c, rng, h: c.get("/api/analytics/customers", headers=h)),
+    Scenario("POST /api/ai/chat", 5, lambda c, rng, h: c.post("/api/ai/chat", headers=h, json={
+        "message": rng.choice(["¿Qué recomiendan hoy?", "Horarios del fin de semana", "¿Tienen opciones sin gluten?"]),
+        "session_id": f"bench_{rng.randrange(50)}",
+        "channel": rng.choice(["whatsapp", "instagram", "general"]),
+    })),
+    Scenario("POST /api/reservations/new", 5, lambda c, rng, h: c.post("/api/reservations/new", headers=h, json=dict(
+        zip(("reservation_date", "reservation_time"), _reservation_slot(rng)),
+        customer_name="Cliente Bench", customer_email="bench@example.com",
+        whatsapp_phone="+595 981 000000", guests=rng.randint(1, 6),
+    )), ok_statuses=(200, 409)),
+]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def drive(client, headers, users: int, total_requests: int, rng_seed: int):
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    weights = [scenario.weight for scenario in SCENARIOS]
+    remaining = total_requests
+
+    async def virtual_user(user: int):
+        nonlocal remaining
+        rng = random.Random(rng_seed + user)
+        while remaining > 0:
+            remaining -= 1
+            scenario = rng.choices(SCENARIOS, weights)[0]
+            started = time.perf_counter()
+            response = await scenario.call(client, rng, headers)
+            latencies[scenario.route].append(time.perf_counter() - started)
+            if response.status_code not in scenario.ok_statuses:
+                errors[scenario.route] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user(user) for user in range(users)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def run(args, backend: str):
+    import httpx
+    import server
+    from core import db, create_access_token
+
+    app = server.app
+    async with app.router.lifespan_context(app):
+        await seed(db, random.Random(SEED), args.customers)
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': ADMIN['email']})}"}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+            # Warm-up pass (lazy imports, first renders), not reported
+            await drive(client, headers, args.users, min(200, args.requests), SEED + 10_000)
+            passes = [summarize(*await drive(client, headers, args.users, args.requests, SEED)) for _ in range(args.repeats)]
+
+    return {
+        "config": {
+            "backend": backend, "users": args.users, "requests": args.requests, "customers": args.customers,
+            "llm_latency_ms": args.llm_latency_ms, "repeats": args.repeats,
+            "python": platform.python_version(), "machine": platform.machine(),
+            "recorded_at": datetime.utcnow().isoformat(timespec="seconds"),
+        },
+        **median_pass(passes),
+    }
+
+
+def summarize(latencies: Dict[str, List[float]], errors: Dict[str, int], wall: float) -> Dict[str, Any]:
+    routes = {}
+    for route, samples in sorted(latencies.items()):
+        routes[route] = {
+            "requests": len(samples),
+            "errors": errors.get(route, 0),
+            "rps": round(len(samples) / wall, 1),
+            "p50_ms": round(percentile(samples, 50) * 1000, 2),
+            "p95_ms": round(percentile(samples, 95) * 1000, 2),
+            "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        }
+    everything = [sample for samples in latencies.values() for sample in samples]
+    return {
+        "total": {
+            "requests": len(everything), "errors": sum(errors.values()), "rps": round(len(everything) / wall, 1),
+            "p50_ms": round(percentile(everything, 50) * 1000, 2),
+            "p95_ms": round(percentile(everything, 95) * 1000, 2),
+            "p99_ms": round(percentile(everything, 99) * 1000, 2),
+        },
+        "routes": routes,
+    }
+
+
+def median_pass(passes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Per-route median of each statistic over the measured passes (errors: the worst pass)
+
+    A route with a few dozen requests per pass has its p95 among its few slowest requests,
+    so a single pass on a busy machine is too noisy to gate on.
+    """
+    def combine(stats: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {key: max(s[key] for s in stats) if key == "errors" else statistics.median_low(s[key] for s in stats)
+                for key in stats[0]}
+
+    routes = sorted({route for run in passes for route in run["routes"]})
+    return {
+        "total": combine([run["total"] for run in passes]),
+        "routes": {route: combine([run["routes"][route] for run in passes if route in run["routes"]]) for route in routes},
+    }
+
+
+# REPORTING
+def print_report(results: Dict[str, Any]):
+    config, total = results["config"], results["total"]
+    print("📊 LOAD BENCHMARK")
+    print(f"Backend: {config['backend']}, users: {config['users']}, requests: {config['requests']}, "
+          f"customers: {config['customers']}, fake LLM latency: {config['llm_latency_ms']:.0f} ms")
+    print(f"{'route':38} {'reqs':>6} {'err':>4} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, stats in list(results["routes"].items()) + [("TOTAL", total)]:
+        print(f"{route:38} {stats['requests']:6} {stats['errors']:4} {stats['rps']:8.1f} "
+              f"{stats['p50_ms']:8.1f} {stats['p95_ms']:8.1f} {stats['p99_ms']:8.1f}")
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Routes whose p95 grew or throughput dropped by more than the tolerance"""
+    regressions = []
+    for route, stats in list(results["routes"].items()) + [("TOTAL", results["total"])]:
+        before = baseline["total"] if route == "TOTAL" else baseline["routes"].get(route)
+        if not before:
+            continue
+        if stats["p95_ms"] > max(before["p95_ms"] * (1 + tolerance), before["p95_ms"] + P95_NOISE_MS):
+            regressions.append(f"{route}: p95 {before['p95_ms']:.1f} → {stats['p95_ms']:.1f} ms")
+        if route == "TOTAL" and stats["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{route}: throughput {before['rps']:.1f} → {stats['rps']:.1f} req/s")
+        if stats["errors"] > before["errors"]:
+            regressions.append(f"{route}: errors {before['errors']} → {stats['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    parser.add_argument("--requests", type=int, default=1500, help="requests in the measured run")
+    parser.add_argument("--customers", type=int, default=1000, help="customers seeded before the run")
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--repeats", type=int, default=3, help="measured passes; each statistic is their median")
+    parser.add_argument("--mongo-url", help="run against this mongod instead of mongomock-motor")
+    parser.add_argument("--db-name", default=f"load_benchmark_{uuid.uuid4().hex[:8]}")
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    parser.add_argument("--save-baseline", action="store_true", help=f"save the results as the baseline ({DEFAULT_BASELINE.name})")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="baseline to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed p95/throughput regression (0.3 = 30%%)")
+    args = parser.parse_args()
+
+    backend = configure_environment(args)
+    results = asyncio.run(run(args, backend))
+    print_report(results)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"💾 Baseline saved to {args.baseline}")
+        return
+
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        changed = [key for key in COMPARABLE_CONFIG if baseline["config"].get(key) != results["config"][key]]
+        if changed:
+            print(f"⚠️ Baseline was recorded with a different {', '.join(changed)}; skipping comparison")
+            return
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ Regressions against {args.baseline.name}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"✅ No regressions against {args.baseline.name} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark for list endpoint serialization
+Serializes 10k customer documents the way FastAPI did before (validate into
+models, re-validate through response_model, jsonable_encoder, json.dumps) and
+through the fast path (shaped dicts + orjson), and checks both match
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from bson import ObjectId  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from models import Customer  # noqa: E402
+from fast_json import FastJSONResponse, shape_many  # noqa: E402
+
+SEED = 42
+LEVELS = ["bronce", "plata", "oro", "citizen_kumia"]
+DISHES = ["Brisket ahumado", "Costillas BBQ", "Pulled pork", "Chorizo artesanal", None]
+
+
+def generate_customers(count: int, rng: random.Random):
+    """Documents shaped like db.customers, including Mongo's _id"""
+    now = datetime(2025, 1, 1)
+    customers = []
+    for i in range(count):
+        first_visit = now - timedelta(days=rng.randint(0, 720))
+        customers.append({
+            "_id": ObjectId(),
+            "id": f"customer_{i}",
+            "name": f"Cliente {i}",
+            "email": f"cliente{i}@example.com",
+            "phone": f"+595 981 {i:06d}",
+            "first_visit": first_visit,
+            "last_visit": first_visit + timedelta(days=rng.randint(0, 60)),
+            "birthday": None,
+            "anniversary_date": None,
+            "nft_level": rng.choice(LEVELS),
+            "points": rng.randint(0, 5000),
+            "referrals": rng.randint(0, 12),
+            "next_reward": None,
+            "preferred_dish": rng.choice(DISHES),
+            "total_orders": rng.randint(1, 80),
+            "total_spent": round(rng.uniform(10, 4000), 2),
+            "created_at": first_visit,
+        })
+    return customers
+
+
+async def baseline(customers, field):
+    """`[Customer(**c) ...]` returned with response_model=List[Customer]"""
+    content = [Customer(**customer) for customer in customers]
+    validated = await serialize_response(field=field, response_content=content)
+    return JSONResponse(validated).body
+
+
+async def fast_path(customers, field):
+    return FastJSONResponse(shape_many(Customer, customers)).body
+
+
+async def timed(func, customers, field, runs: int):
+    samples, body = [], b""
+    for _ in range(runs):
+        started = time.perf_counter()
+        body = await func(customers, field)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--customers", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    customers = generate_customers(args.customers, random.Random(SEED))
+    field = create_response_field(name="response", type_=List[Customer])
+
+    base_samples, base_body = asyncio.run(timed(baseline, customers, field, args.runs))
+    fast_samples, fast_body = asyncio.run(timed(fast_path, customers, field, args.runs))
+
+    if json.loads(base_body) != json.loads(fast_body):
+        sys.exit("❌ Fast path output differs from the validated response")
+
+    base_median, fast_median = statistics.median(base_samples), statistics.median(fast_samples)
+    print("📊 SERIALIZATION BENCHMARK")
+    print(f"Customers: {args.customers}, runs: {args.runs}, body: {len(fast_body) / 1024:.0f} KiB")
+    print(f"Validated (Customer(**c) + response_model + json): median {base_median:.1f} ms, min {min(base_samples):.1f} ms")
+    print(f"Fast path (shaped dicts + orjson):                median {fast_median:.1f} ms, min {min(fast_samples):.1f} ms")
+    print(f"Speedup: {base_median / fast_median:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark for backend cold start
+Imports server.py in fresh interpreters under `-X importtime` and reports the
+import cost, the slowest modules, and any heavy dependency loaded at import
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# Loaded lazily on first use or at startup; importing server must not pull them in
+HEAVY_MODULES = ("cv2", "numpy", "PIL", "emergentintegrations", "authlib", "firebase_admin", "google.cloud.firestore")
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+SNIPPET = "import server; server.create_app()"
+
+
+def run_once():
+    env = {
+        **os.environ,
+        "MONGO_URL": os.environ.get("MONGO_URL", "mongodb://localhost:27017"),
+        "DB_NAME": os.environ.get("DB_NAME", "startup_benchmark"),
+    }
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SNIPPET],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        sys.exit(f"❌ Importing server failed:\n{result.stderr[-2000:]}")
+
+    # Children are printed before their parent, one indent level deeper
+    modules, direct, pending = {}, [], []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        depth = len(indent) // 2
+        modules[name] = (int(self_us), int(cumulative_us))
+        if depth == 1:
+            pending.append((name, int(cumulative_us)))
+        elif depth == 0:
+            if name == "server":
+                direct = pending
+            pending = []
+    return wall, modules, direct
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, help="fail if the median server import exceeds this")
+    args = parser.parse_args()
+
+    walls, server_times, modules, direct = [], [], {}, []
+    for _ in range(args.runs):
+        wall, modules, direct = run_once()
+        walls.append(wall)
+        server_times.append(modules.get("server", (0, 0))[1] / 1000)
+
+    heavy = sorted(name for name in modules if name.split(".")[0] in HEAVY_MODULES or name in HEAVY_MODULES)
+    top_level = sorted(direct, key=lambda item: item[1], reverse=True)
+
+    print("📊 STARTUP BENCHMARK")
+    print(f"Runs: {args.runs}, modules imported: {len(modules)}")
+    print(f"import server + create_app(): median {statistics.median(server_times):.1f} ms, min {min(server_times):.1f} ms")
+    print(f"Interpreter wall time: median {statistics.median(walls) * 1000:.1f} ms")
+    print("Slowest imports made by server (cumulative, last run):")
+    for name, cumulative in top_level[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    print(f"Heavy modules loaded at import: {', '.join(heavy) if heavy else 'none'}")
+
+    failed = bool(heavy)
+    if args.budget_ms and statistics.median(server_times) > args.budget_ms:
+        print(f"❌ Median import time exceeds budget of {args.budget_ms:.0f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Concurrent runner for the backend test scripts
+Runs every test_* method of the *_test.py / test_*.py scripts as an independent group,
+several at a time, over one shared login and connection pool, and reports per-test and
+per-endpoint timings
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import inspect
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+import types
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+import requests
+
+ROOT = Path(__file__).resolve().parent
+DEFAULT_BASE_URL = os.environ.get("BACKEND_URL", "http://localhost:8001/api")
+LOGIN = {"email": "admin@ilmandorla.com", "password": "admin123"}
+ID_SEGMENT = re.compile(r"^([0-9a-f]{8}-[0-9a-f-]{27}|[0-9a-f]{16,}|\d+)$", re.IGNORECASE)
+
+# Per worker thread: the running test's name and its captured output
+_local = threading.local()
+
+
+class _ThreadOutput(io.TextIOBase):
+    """sys.stdout replacement that buffers each test's prints so concurrent tests do not interleave"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        buffer = getattr(_local, "output", None)
+        return (buffer or self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+@dataclass
+class RequestTiming:
+    test: str
+    method: str
+    endpoint: str
+    status: Optional[int]
+    ms: float
+
+
+@dataclass
+class TestResult:
+    script: str
+    test: str
+    status: str  # passed, failed, error
+    seconds: float
+    requests: int = 0
+    request_ms: float = 0.0
+    slowest_request: Optional[str] = None
+    failures: List[str] = field(default_factory=list)
+    output: str = ""
+
+
+def endpoint_of(url: str, base_url: str) -> str:
+    """The request path with ids replaced, e.g. /api/menu/{id}"""
+    path = httpx.URL(url).path
+    base_path = httpx.URL(base_url).path.rstrip("/")
+    prefix = base_path.rsplit("/", 1)[0] if base_path.endswith("/api") else base_path
+    path = path[len(prefix):] if prefix and path.startswith(prefix) else path
+    return "/".join("{id}" if ID_SEGMENT.match(segment) else segment for segment in path.split("/"))
+
+
+class SharedSession:
+    """
+    The subset of requests.Session the scripts use, backed by the runner's
+    shared httpx client. Headers are per session, the connection pool is not.
+    """
+
+    def __init__(self, runner: "TestRunner", headers: Optional[Dict[str, str]] = None):
+        self.runner = runner
+        self.headers = dict(headers or {})
+
+    def request(self, method: str, url: str, **kwargs):
+        if "allow_redirects" in kwargs:
+            kwargs["follow_redirects"] = kwargs.pop("allow_redirects")
+        if isinstance(kwargs.get("data"), (str, bytes)):
+            kwargs["content"] = kwargs.pop("data")
+        kwargs["headers"] = {**self.headers, **(kwargs.get("headers") or {})}
+
+        started, status = time.perf_counter(), None
+        try:
+            try:
+                response = self.runner.client.request(method.upper(), url, **kwargs)
+            except (httpx.ReadError, httpx.WriteError, httpx.RemoteProtocolError):
+                # A pooled keep-alive connection the server closed (e.g. after an unhandled 500); retry once on a fresh one
+                response = self.runner.client.request(method.upper(), url, **kwargs)
+            status = response.status_code
+            return response
+        except httpx.HTTPError as e:
+            # The scripts expect requests' exceptions
+            raise requests.exceptions.RequestException(str(e)) from e
+        finally:
+            self.runner.timings.append(RequestTiming(
+                test=getattr(_local, "test", "setup"), method=method.upper(), endpoint=endpoint_of(url, self.runner.base_url),
+                status=status, ms=(time.perf_counter() - started) * 1000,
+            ))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+
+@dataclass
+class TestGroup:
+    script: str
+    name: str
+    run: Callable[[], Any]
+    # Tester instance whose log_test results decide the outcome, if any
+    tester: Any = None
+
+
+class TestRunner:
+    def __init__(self, base_url: str, parallel: int, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.parallel = parallel
+        self.client = httpx.Client(timeout=timeout, limits=httpx.Limits(max_connections=parallel, max_keepalive_connections=parallel))
+        self.timings: List[RequestTiming] = []
+        self.token: Optional[str] = None
+
+    # DISCOVERY
+    def _requests_shim(self):
+        """Stands in for the requests module inside the scripts"""
+        shim = types.SimpleNamespace(exceptions=requests.exceptions, Session=lambda: SharedSession(self))
+        for method in ("request", "get", "post", "put", "patch", "delete"):
+            shim.__dict__[method] = getattr(SharedSession(self), method)
+        return shim
+
+    def load(self, path: Path) -> List[TestGroup]:
+        spec = importlib.util.spec_from_file_location(f"backend_tests.{path.stem}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.requests = self._requests_shim()
+        module.BACKEND_URL = self.base_url
+
+        groups = []
+        for name, obj in inspect.getmembers(module):
+            if inspect.isfunction(obj) and name.startswith("test_") and obj.__module__ == module.__name__:
+                groups.append(TestGroup(path.name, name, obj))
+            elif inspect.isclass(obj) and obj.__module__ == module.__name__ and name.endswith("Tester"):
+                for method, _ in sorted(inspect.getmembers(obj, inspect.isfunction), key=lambda m: m[1].__code__.co_firstlineno):
+                    if method.startswith("test_"):
+                        groups.append(self._method_group(path.name, obj, method))
+        return groups
+
+    def _method_group(self, script: str, cls, method: str) -> TestGroup:
+        tester = cls()
+        tester.base_url = self.base_url
+        # Testers tracking an auth_token expect an earlier authenticate step; the others log in themselves
+        if self.token and hasattr(tester, "auth_token"):
+            tester.auth_token = self.token
+            tester.session.headers["Authorization"] = f"Bearer {self.token}"
+        return TestGroup(script, f"{cls.__name__}.{method}", getattr(tester, method), tester)
+
+    # RUNNING
+    def login(self) -> bool:
+        response = SharedSession(self).post(f"{self.base_url}/auth/login", json=LOGIN)
+        if response.status_code == 200:
+            self.token = response.json()["access_token"]
+        return bool(self.token)
+
+    def _run_group(self, group: TestGroup) -> TestResult:
+        _local.test, _local.output = f"{group.script}::{group.name}", io.StringIO()
+        started = time.perf_counter()
+        failures, status = [], "passed"
+        try:
+            outcome = group.run()
+            if outcome is False:
+                failures.append("returned False")
+        except Exception as e:
+            status = "error"
+            failures.append(f"{type(e).__name__}: {e}")
+        results = getattr(group.tester, "test_results", None) or {}
+        failures += [f"{name}: {result.get('details', '')}" for name, result in results.items() if not result.get("success")]
+        if failures and status == "passed":
+            status = "failed"
+
+        result = TestResult(group.script, group.name, status, time.perf_counter() - started,
+                            failures=failures, output=_local.output.getvalue())
+        _local.test, _local.output = None, None
+        return result
+
+    async def run(self, groups: List[TestGroup], on_result: Callable[[TestResult], None]) -> List[TestResult]:
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=self.parallel, thread_name_prefix="backend-test") as pool:
+            async def run_one(group):
+                result = await loop.run_in_executor(pool, self._run_group, group)
+                on_result(result)
+                return result
+
+            return await asyncio.gather(*(run_one(group) for group in groups))
+
+    # REPORTING
+    def endpoint_report(self) -> List[Dict[str, Any]]:
+        by_endpoint = defaultdict(list)
+        for timing in self.timings:
+            by_endpoint[(timing.method, timing.endpoint)].append(timing.ms)
+        report = []
+        for (method, endpoint), samples in by_endpoint.items():
+            samples.sort()
+            report.append({
+                "method": method, "endpoint": endpoint, "calls": len(samples),
+                "total_ms": round(sum(samples), 1), "p50_ms": round(samples[len(samples) // 2], 1),
+                "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1), "max_ms": round(samples[-1], 1),
+            })
+        return sorted(report, key=lambda row: row["p95_ms"], reverse=True)
+
+    def attach_requests(self, results: List[TestResult]):
+        by_test = defaultdict(list)
+        for timing in self.timings:
+            by_test[timing.test].append(timing)
+        for result in results:
+            timings = by_test.get(f"{result.script}::{result.test}", [])
+            result.requests = len(timings)
+            result.request_ms = round(sum(timing.ms for timing in timings), 1)
+            if timings:
+                slowest = max(timings, key=lambda timing: timing.ms)
+                result.slowest_request = f"{slowest.method} {slowest.endpoint} ({slowest.ms:.0f} ms, HTTP {slowest.status})"
+
+
+def discover(patterns: List[str]) -> List[Path]:
+    scripts = sorted({path for pattern in patterns for path in ROOT.glob(pattern)})
+    return [path for path in scripts if path.resolve() != Path(__file__).resolve()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("scripts", nargs="*", default=["*_test.py", "test_*.py"], help="script names or globs in the repo root")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="backend API root (default: $BACKEND_URL or %(default)s)")
+    parser.add_argument("-j", "--parallel", type=int, default=8, help="test groups running at once")
+    parser.add_argument("-k", dest="keyword", help="only run tests whose name contains this")
+    parser.add_argument("--timeout", type=float, default=60, help="per-request timeout in seconds")
+    parser.add_argument("--report", type=Path, default=Path("backend_test_timings.json"), help="JSON timing report")
+    parser.add_argument("--top", type=int, default=10, help="slowest endpoints and tests to print")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print the output of passing tests too")
+    args = parser.parse_args()
+
+    runner = TestRunner(args.base_url, args.parallel, args.timeout)
+    print(f"🚀 Backend tests against {runner.base_url} ({args.parallel} at a time)")
+    if not runner.login():
+        print("⚠️ Shared login failed; tests needing authentication will fail")
+
+    groups = [group for path in discover(args.scripts) for group in runner.load(path)]
+    if args.keyword:
+        groups = [group for group in groups if args.keyword in f"{group.script}::{group.name}"]
+    print(f"Running {len(groups)} tests from {len({group.script for group in groups})} scripts")
+
+    def on_result(result: TestResult):
+        icon = {"passed": "✅", "failed": "❌", "error": "💥"}[result.status]
+        print(f"{icon} {result.script}::{result.test} ({result.seconds:.2f}s)")
+        if result.status != "passed" or args.verbose:
+            print("".join(f"   {line}\n" for line in result.output.rstrip().splitlines()), end="")
+            for failure in result.failures:
+                print(f"   ↳ {failure[:300]}")
+
+    real_stdout, sys.stdout = sys.stdout, _ThreadOutput(sys.stdout)
+    started = time.perf_counter()
+    try:
+        results = asyncio.run(runner.run(groups, on_result))
+    finally:
+        sys.stdout = real_stdout
+        runner.client.close()
+    wall = time.perf_counter() - started
+
+    runner.attach_requests(results)
+    endpoints = runner.endpoint_report()
+    counts = {status: sum(result.status == status for result in results) for status in ("passed", "failed", "error")}
+    serial = sum(result.seconds for result in results)
+
+    print("=" * 60)
+    print("🐢 SLOWEST ENDPOINTS (p95)")
+    for row in endpoints[:args.top]:
+        print(f"{row['method']:6} {row['endpoint']:45} {row['calls']:4} calls  p50 {row['p50_ms']:8.1f} ms  "
+              f"p95 {row['p95_ms']:8.1f} ms  max {row['max_ms']:8.1f} ms")
+    print("🐢 SLOWEST TESTS")
+    for result in sorted(results, key=lambda result: result.seconds, reverse=True)[:args.top]:
+        print(f"{result.seconds:7.2f}s  {result.script}::{result.test}  ({result.requests} requests; slowest {result.slowest_request})")
+    print("=" * 60)
+    print(f"📋 {counts['passed']} passed, {counts['failed']} failed, {counts['error']} errors in {wall:.1f}s "
+          f"({serial:.1f}s of test time, {serial / max(wall, 1e-9):.1f}x from running concurrently)")
+
+    args.report.write_text(json.dumps({
+        "base_url": runner.base_url, "parallel": args.parallel, "wall_seconds": round(wall, 2), "summary": counts,
+        "tests": [{**asdict(result), "seconds": round(result.seconds, 3)} for result in results],
+        "endpoints": endpoints,
+    }, indent=2, ensure_ascii=False))
+    print(f"💾 Timing report written to {args.report}")
+    sys.exit(0 if counts["failed"] == counts["error"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
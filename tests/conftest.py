@@ -0,0 +1,145 @@
+"""
+Shared fixtures for the backend tests
+The app runs in-process against the MongoDB at TEST_MONGO_URL, in a throwaway database
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Set before the backend reads its environment; never the .env database
+os.environ["MONGO_URL"] = os.environ.get("TEST_MONGO_URL", "mongodb://localhost:27017")
+os.environ["DB_NAME"] = os.environ.get("TEST_DB_NAME", "kumia_test")
+os.environ["FIREBASE_PRIVATE_KEY"] = ""  # never sync test data to the UserWebApp
+
+QUERY_REPORT = pytest.StashKey[dict]()
+
+TEST_USER = {"id": "test-admin", "email": "admin@test.kumia", "name": "Test Admin", "role": "admin"}
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "mongo: needs a MongoDB server (TEST_MONGO_URL, or a mongod on PATH)")
+
+
+def pytest_collection_modifyitems(config, items):
+    # mongomock fires no command events, so these run against a real server; -m "not mongo" leaves them out
+    for item in items:
+        if "mongo" in item.fixturenames:
+            item.add_marker(pytest.mark.mongo)
+
+
+def _ping(mongo_client) -> bool:
+    from pymongo.errors import PyMongoError
+
+    try:
+        mongo_client.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+def _start_mongod(url: str):
+    """A throwaway mongod on the default URL's port, when none is running and mongod is installed"""
+    binary = shutil.which("mongod")
+    address = urlsplit(url)
+    if binary is None or "TEST_MONGO_URL" in os.environ or address.hostname not in ("localhost", "127.0.0.1"):
+        return None, None
+    dbpath = tempfile.mkdtemp(prefix="kumia-test-mongod-")
+    process = subprocess.Popen(
+        [binary, "--dbpath", dbpath, "--port", str(address.port or 27017), "--bind_ip", "127.0.0.1"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return process, dbpath
+
+
+def _stop_mongod(process, dbpath):
+    if process is None:
+        return
+    process.terminate()
+    process.wait()
+    shutil.rmtree(dbpath, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def mongo():
+    from pymongo import MongoClient
+
+    url = os.environ["MONGO_URL"]
+    mongo_client = MongoClient(url, serverSelectionTimeoutMS=1500)
+    mongod, dbpath = None, None
+    if not _ping(mongo_client):
+        mongod, dbpath = _start_mongod(url)
+        deadline = time.monotonic() + 30
+        while mongod and mongod.poll() is None and not _ping(mongo_client) and time.monotonic() < deadline:
+            time.sleep(0.2)
+        if not (mongod and _ping(mongo_client)):
+            _stop_mongod(mongod, dbpath)
+            pytest.fail(
+                f"MongoDB not reachable at {url}: start a mongod (or put one on PATH), set TEST_MONGO_URL, "
+                f"or leave these tests out with -m 'not mongo'", pytrace=False,
+            )
+    mongo_client.drop_database(os.environ["DB_NAME"])
+    yield mongo_client[os.environ["DB_NAME"]]
+    mongo_client.drop_database(os.environ["DB_NAME"])
+    mongo_client.close()
+    _stop_mongod(mongod, dbpath)
+
+
+@pytest.fixture(scope="session")
+def client(mongo):
+    from fastapi.testclient import TestClient
+    import server
+
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def auth_headers(mongo):
+    from core import create_access_token
+
+    mongo.users.insert_one(dict(TEST_USER))
+    return {"Authorization": f"Bearer {create_access_token({'sub': TEST_USER['email']})}"}
+
+
+@pytest.fixture
+def query_budget(request):
+    """The query monitor, reset so it only reports this test's requests"""
+    from query_monitor import query_monitor
+
+    query_monitor.reset()
+    yield query_monitor
+    request.config.stash.setdefault(QUERY_REPORT, {}).update(query_monitor.report())
+
+
+@pytest.fixture
+def no_loop_blocking(client):
+    """Fails the test if the app's event loop is blocked longer than LOOP_BLOCK_TEST_MS"""
+    from loop_watchdog import LoopWatchdog
+
+    watchdog = LoopWatchdog(threshold_ms=float(os.environ.get("LOOP_BLOCK_TEST_MS", 50)))
+    client.portal.call(watchdog.start)
+    yield watchdog
+    client.portal.call(watchdog.stop)
+    if watchdog.stalls:
+        pytest.fail("\n".join(stall.describe() for stall in watchdog.stalls), pytrace=False)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    report = config.stash.get(QUERY_REPORT, {})
+    if not report:
+        return
+    terminalreporter.section("MongoDB round trips per endpoint")
+    for (method, route), queries in sorted(report.items(), key=lambda item: item[1]["max_queries"], reverse=True):
+        collections = ", ".join(f"{name}={count}" for name, count in sorted(queries["max_per_collection"].items()))
+        terminalreporter.write_line(f"{method:6} {route:40} {queries['max_queries']:3}  ({collections})")
@@ -0,0 +1,128 @@
+"""
+Credit ledger checks
+Holds, settlements, releases, idempotent purchases and amount validation, on an in-memory MongoDB
+"""
+
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from mongomock_motor import AsyncMongoMockClient
+
+from credit_ledger import CreditLedger, InsufficientCreditsError, InvalidCreditAmountError, INITIAL_CREDIT_GRANT
+
+USER = "ledger-user"
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+@pytest.fixture
+def ledger():
+    ledger = CreditLedger(AsyncMongoMockClient()["ledger_test"])
+    # mongomock has no sessions; this is the path standalone mongod servers take
+    ledger._transactions_supported = False
+    run(ledger.ensure_indexes())
+    return ledger
+
+
+def balance(ledger):
+    return run(ledger.get_balance(USER))
+
+
+def assert_books_balance(ledger):
+    """Every transaction's legs sum to zero and the cached balance matches the ledger"""
+    async def totals():
+        transactions, accounts = {}, {}
+        async for entry in ledger.ledger.find({"user_id": USER}):
+            transactions[entry["transaction_id"]] = round(transactions.get(entry["transaction_id"], 0) + entry["amount"], 2)
+            accounts[entry["account"]] = round(accounts.get(entry["account"], 0) + entry["amount"], 2)
+        return transactions, accounts
+
+    transactions, accounts = run(totals())
+    assert all(total == 0 for total in transactions.values()), transactions
+    current = balance(ledger)
+    assert accounts.get(f"user:{USER}:available", 0) == current["current_balance"]
+    assert accounts.get(f"user:{USER}:reserved", 0) == current["reserved"]
+
+
+def test_new_account_gets_the_initial_grant(ledger):
+    assert balance(ledger)["current_balance"] == INITIAL_CREDIT_GRANT
+    assert balance(ledger)["current_balance"] == INITIAL_CREDIT_GRANT
+    assert_books_balance(ledger)
+
+
+def test_failed_grant_is_retried(ledger, monkeypatch):
+    post = ledger._post
+
+    async def failing_post(*args, **kwargs):
+        raise RuntimeError("write failed")
+
+    monkeypatch.setattr(ledger, "_post", failing_post)
+    with pytest.raises(RuntimeError):
+        run(ledger.get_balance(USER))
+    monkeypatch.setattr(ledger, "_post", post)
+
+    assert balance(ledger)["current_balance"] == INITIAL_CREDIT_GRANT
+    assert_books_balance(ledger)
+
+
+def test_reserve_then_settle_charges_only_what_was_used(ledger):
+    reservation_id = run(ledger.reserve(USER, 100, "job"))
+    assert balance(ledger)["current_balance"] == INITIAL_CREDIT_GRANT - 100
+    assert balance(ledger)["reserved"] == 100
+
+    assert run(ledger.settle(reservation_id, 40))
+    assert not run(ledger.settle(reservation_id, 40))
+    assert balance(ledger)["current_balance"] == INITIAL_CREDIT_GRANT - 40
+    assert balance(ledger)["reserved"] == 0
+    assert_books_balance(ledger)
+
+
+def test_release_returns_the_hold_once(ledger):
+    reservation_id = run(ledger.reserve(USER, 250.5, "job"))
+    assert run(ledger.release(reservation_id))
+    assert not run(ledger.release(reservation_id))
+    assert not run(ledger.settle(reservation_id))
+    assert balance(ledger)["current_balance"] == INITIAL_CREDIT_GRANT
+    assert balance(ledger)["reserved"] == 0
+    assert_books_balance(ledger)
+
+
+def test_reserve_beyond_balance_is_refused(ledger):
+    with pytest.raises(InsufficientCreditsError):
+        run(ledger.reserve(USER, INITIAL_CREDIT_GRANT + 1, "job"))
+    assert balance(ledger)["current_balance"] == INITIAL_CREDIT_GRANT
+    assert_books_balance(ledger)
+
+
+def test_purchase_with_the_same_key_applies_once(ledger):
+    _, replayed = run(ledger.purchase(USER, 500, "purchase-1", "key-1"))
+    assert not replayed
+    after, replayed = run(ledger.purchase(USER, 500, "purchase-2", "key-1"))
+    assert replayed
+    assert after["current_balance"] == INITIAL_CREDIT_GRANT + 500
+    assert_books_balance(ledger)
+
+
+@pytest.mark.parametrize("amount", [-500, 0, float("nan")])
+def test_non_positive_amounts_are_rejected(ledger, amount):
+    with pytest.raises(InvalidCreditAmountError):
+        run(ledger.reserve(USER, amount, "job"))
+    with pytest.raises(InvalidCreditAmountError):
+        run(ledger.purchase(USER, amount, "purchase"))
+    assert balance(ledger)["current_balance"] == INITIAL_CREDIT_GRANT
+    assert_books_balance(ledger)
+
+
+def test_generation_requests_are_bounded():
+    from routers.content_factory import VideoGenerationRequest, ImageGenerationRequest
+
+    for duration in (-100, 0, 10_000):
+        with pytest.raises(ValidationError):
+            VideoGenerationRequest(prompt="brisket", duration=duration)
+    for count in (-1, 0, 1_000):
+        with pytest.raises(ValidationError):
+            ImageGenerationRequest(prompt="brisket", count=count)
@@ -0,0 +1,42 @@
+"""
+Event loop blocking checks
+Routes must not run blocking work (sync Firestore, bcrypt, image encoding) on the event loop
+"""
+
+import time
+
+import pytest
+
+NON_BLOCKING_ROUTES = [
+    ("GET", "/api/customers"),
+    ("GET", "/api/menu"),
+    ("GET", "/api/dashboard/metrics"),
+    ("GET", "/api/analytics/customers"),
+    ("GET", "/api/public/menu"),
+    ("GET", "/api/public/restaurant-info"),
+    ("GET", "/metrics"),
+]
+
+
+@pytest.mark.parametrize("endpoint", NON_BLOCKING_ROUTES, ids=lambda endpoint: " ".join(endpoint))
+def test_route_does_not_block_loop(endpoint, client, auth_headers, no_loop_blocking):
+    method, route = endpoint
+    response = client.request(method, route, headers=auth_headers)
+    assert response.status_code < 400, response.text
+
+
+def test_watchdog_captures_blocking_call(client):
+    from loop_watchdog import LoopWatchdog
+
+    async def block_the_loop():
+        time.sleep(0.3)
+
+    watchdog = LoopWatchdog(threshold_ms=100)
+    client.portal.call(watchdog.start)
+    client.portal.call(block_the_loop)
+    client.portal.call(watchdog.stop)
+
+    assert len(watchdog.stalls) == 1
+    stall = watchdog.stalls[0]
+    assert stall.duration_ms >= 250
+    assert "block_the_loop" in "".join(stall.stack)
@@ -0,0 +1,84 @@
+"""
+Menu publisher checks
+Deltas are diffed against the manifest the sync relay confirmed, on an in-memory MongoDB
+"""
+
+import asyncio
+import types
+
+import pytest
+
+from mongomock_motor import AsyncMongoMockClient
+
+from menu_publisher import MenuPublisher
+from sync_outbox import SyncOutbox
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def item(item_id, price=45000):
+    return {"id": item_id, "name": f"Plato {item_id}", "price": price}
+
+
+@pytest.fixture
+def menu():
+    db = AsyncMongoMockClient()["menu_test"]
+    outbox = SyncOutbox(db, max_attempts=1)
+    # mongomock has no sessions; this is the path standalone mongod servers take
+    outbox._transactions_supported = False
+    run(outbox.ensure_indexes())
+    firestore = types.SimpleNamespace(db=object(), deltas=[], accept=True)
+
+    def publish_menu_delta(payload):
+        firestore.deltas.append(payload)
+        return firestore.accept
+
+    outbox.register("menu.delta", publish_menu_delta)
+    return types.SimpleNamespace(publisher=MenuPublisher(db, firestore, outbox), outbox=outbox, firestore=firestore)
+
+
+def publish(menu, items):
+    async def publish_and_relay():
+        result = await menu.publisher.publish(items)
+        await menu.outbox.relay_once()
+        return result
+    return run(publish_and_relay())
+
+
+def test_delivered_manifest_is_the_next_diff_base(menu):
+    publish(menu, [item("a"), item("b")])
+    assert run(menu.publisher.get_status())["version"] == 1
+
+    assert not publish(menu, [item("a"), item("b")])["published"]
+    publish(menu, [item("a", 65000), item("b")])
+    assert [entry["id"] for entry in menu.firestore.deltas[-1]["upserts"]] == ["a"]
+
+
+def test_failed_delivery_is_not_the_diff_base(menu):
+    menu.firestore.accept = False
+    publish(menu, [item("a"), item("b")])
+    assert run(menu.publisher.get_status())["version"] == 0
+
+    # Same menu again: the parked delta never reached Firestore, so it is queued anew
+    menu.firestore.accept = True
+    result = publish(menu, [item("a"), item("b")])
+    assert result["published"] and result["changed"] == 2
+    assert run(menu.publisher.get_status())["version"] == result["version"]
+
+
+def test_items_a_failed_delta_may_have_written_are_removed(menu):
+    menu.firestore.accept = False
+    publish(menu, [item("a"), item("b")])
+
+    menu.firestore.accept = True
+    publish(menu, [item("a")])
+    assert menu.firestore.deltas[-1]["removals"] == ["b"]
+    assert run(menu.publisher.get_status())["queued_version"] is None
+
+
+def test_pending_delta_with_the_same_menu_is_not_queued_twice(menu):
+    run(menu.publisher.publish([item("a")]))
+    assert not run(menu.publisher.publish([item("a")]))["published"]
+    assert run(menu.publisher.publish([item("a", 65000)]))["version"] == 2
@@ -0,0 +1,33 @@
+"""
+Notification outbox checks
+Leasing under per-channel rate limits, on an in-memory MongoDB
+"""
+
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from notification_outbox import NotificationOutbox, stub_transports
+
+
+def test_throttled_channel_does_not_hold_the_workers():
+    async def scenario():
+        transports = stub_transports()
+        outbox = NotificationOutbox(
+            AsyncMongoMockClient()["outbox_test"], transports, workers=2,
+            rate_limits={"whatsapp": 1.0, "email": 50.0, "ai_conversation": 50.0},
+        )
+        for number in range(10):
+            await outbox.enqueue("reservation_confirmation", f"reservation_{number}", {"customer_name": "Ana"}, ["whatsapp", "email"])
+
+        outbox.start()
+        await asyncio.sleep(0.5)
+        # Only the intents that got a token are leased; the rest wait as pending
+        sending = await outbox.outbox.count_documents({"status": "sending"})
+        await outbox.stop()
+        return transports, sending
+
+    transports, sending = asyncio.run(scenario())
+    assert len(transports["email"].sent) == 10
+    assert len(transports["whatsapp"].sent) == 1
+    assert sending == 0
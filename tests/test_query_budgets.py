@@ -0,0 +1,46 @@
+"""
+Query budgets for the API endpoints
+Fails when an endpoint makes more MongoDB round trips than its budget; lower a
+budget when an endpoint gets cheaper so it cannot silently regress again
+"""
+
+import pytest
+
+# Max MongoDB round trips per request (authentication's user lookup included)
+QUERY_BUDGETS = {
+    ("GET", "/api/dashboard/metrics"): 16,
+    ("GET", "/api/customers"): 2,
+    ("GET", "/api/menu"): 2,
+    ("GET", "/api/reservations"): 2,
+    ("GET", "/api/feedback"): 2,
+    ("GET", "/api/analytics/customers"): 2,
+    ("GET", "/api/analytics/feedback"): 2,
+    ("GET", "/api/marketing/segments"): 19,
+    ("GET", "/api/public/menu"): 1,
+    ("GET", "/api/public/restaurant-info"): 1,
+    ("POST", "/api/customers"): 3,
+    ("POST", "/api/menu"): 2,
+    ("POST", "/api/reservations/new"): 5,
+}
+
+REQUESTS = {
+    ("POST", "/api/customers"): {"json": {"name": "Cliente Test", "email": "cliente@test.kumia", "phone": "+595 981 000000"}},
+    ("POST", "/api/menu"): {"json": {"name": "Brisket", "description": "Ahumado 12 horas", "price": 95000, "category": "carnes"}},
+    ("POST", "/api/reservations/new"): {"json": {
+        "customer_name": "Cliente Test", "customer_email": "cliente@test.kumia", "whatsapp_phone": "+595 981 000000",
+        "reservation_date": "2030-01-15", "reservation_time": "20:00", "guests": 2,
+    }},
+}
+
+
+@pytest.mark.parametrize("endpoint", list(QUERY_BUDGETS), ids=lambda endpoint: " ".join(endpoint))
+def test_query_budget(endpoint, client, auth_headers, query_budget):
+    method, route = endpoint
+    response = client.request(method, route, headers=auth_headers, **REQUESTS.get(endpoint, {}))
+    assert response.status_code < 400, response.text
+
+    queries = query_budget.report()[endpoint]
+    budget = QUERY_BUDGETS[endpoint]
+    assert queries["max_queries"] <= budget, (
+        f"{method} {route} made {queries['max_queries']} MongoDB round trips, budget is {budget}: {queries['max_per_collection']}"
+    )
@@ -0,0 +1,34 @@
+"""
+Type-ahead checks
+Prefix and typo matching of the in-process token index
+"""
+
+from search_index import SEARCHES, TokenIndex
+
+
+def index_of(names):
+    index = TokenIndex(SEARCHES["customers"])
+    index.load({"id": f"customer_{number}", "name": name} for number, name in enumerate(names))
+    index.finish()
+    return index
+
+
+def names(suggestions):
+    return [suggestion["name"] for suggestion in suggestions]
+
+
+def test_prefix_matches_ignore_case_and_accents():
+    index = index_of(["José Pérez", "Josefina Gómez", "Ana Ruiz"])
+    assert sorted(names(index.suggest("jose"))) == ["Josefina Gómez", "José Pérez"]
+    assert names(index.suggest("PÉR")) == ["José Pérez"]
+
+
+def test_likelier_typos_are_ranked_before_the_limit():
+    # Alphabetically "bsoe..." comes first and used to fill every slot
+    index = index_of([f"Bsoemann {number}" for number in range(20)] + ["José Pérez"])
+    assert names(index.suggest("jsoe", limit=5))[0] == "José Pérez"
+
+
+def test_typos_in_more_documents_come_first():
+    index = index_of(["Marta Rey"] * 3 + ["Marca Gil"])
+    assert names(index.suggest("marxa", limit=1)) == ["Marta Rey"]
@@ -0,0 +1,50 @@
+"""
+Segment count checks
+Cached audience sizes, incremental level counts and their expiry, on an in-memory MongoDB
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from mongomock_motor import AsyncMongoMockClient
+
+import segment_service
+from segment_service import SegmentService
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def customer(number, points):
+    return {"id": f"customer_{number}", "points": points, "last_visit": datetime.utcnow()}
+
+
+@pytest.fixture
+def segments():
+    service = SegmentService(AsyncMongoMockClient()["segments_test"])
+    run(service.customers.insert_many([customer(number, 65) for number in range(3)]))
+    return service
+
+
+def test_customer_writes_adjust_level_counts(segments):
+    assert run(segments.get_estimated_reach("estrella")) == 3
+
+    before, after = customer(0, 65), customer(0, 80)
+    run(segments.customers.replace_one({"id": "customer_0"}, after))
+    run(segments.apply_customer_change(before, after))
+    assert run(segments.get_estimated_reach("estrella")) == 2
+    assert run(segments.get_estimated_reach("leyenda")) == 1
+
+
+def test_level_counts_are_recounted_after_their_ttl(segments, monkeypatch):
+    assert run(segments.get_estimated_reach("estrella")) == 3
+
+    # Written without apply_customer_change, e.g. from the mongo shell
+    run(segments.customers.insert_one(customer(3, 70)))
+    assert run(segments.get_estimated_reach("estrella")) == 3
+
+    monkeypatch.setattr(segment_service, "LEVEL_CARDINALITY_TTL", segment_service.LEVEL_CARDINALITY_TTL * 0)
+    assert run(segments.get_estimated_reach("estrella")) == 4